@@ -34,6 +34,49 @@ d. Specify if the dealer limit is soft.  By Default, it's not.
 """
 __version__ = '0.0.1'
 
-from blackjack import BlackJack
+import importlib
+import sys
 
-__all__ = ['BlackJack']
+# The modules import each other relative to the package (from .blackjack import BlackJack), and by name when they are
+# run from this directory instead (python simulation.py), where they are not in a package.
+
+# Module of each name the package exports.  Modules are imported on first use of one of their names, so importing
+# the package to play a few rounds doesn't pay for the simulators, strategy tables or NumPy.
+_EXPORTS = {
+    'BlackJack': 'blackjack',
+    'RuleSet': 'rules',
+    'Shoe': 'shoe',
+    'Simulator': 'simulation',
+    'play_game': 'simulation',
+    'run_parallel': 'simulation',
+    'what_if': 'simulation',
+    'basic_strategy': 'strategy',
+    'round_ev': 'exact',
+    'simulate_bankroll': 'bankroll',
+    'HistoryReader': 'history',
+    'HistoryWriter': 'history',
+    'ResultColumns': 'results',
+    'ResultsWriter': 'results',
+    'aggregate': 'results',
+    'read_results': 'results',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    """Returns the exported name, importing its module the first time (Python 3.7 and later)"""
+    if name not in _EXPORTS:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+    value = getattr(importlib.import_module('.' + _EXPORTS[name], __name__), name)
+    globals()[name] = value  # Later lookups don't come back here
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
+
+
+if sys.version_info < (3, 7):  # No module __getattr__, import everything now
+    for _name in _EXPORTS:
+        __getattr__(_name)
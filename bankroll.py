@@ -0,0 +1,301 @@
+#!/usr/bin/env python
+"""
+Bankroll sessions: the risk of ruin, session lengths and final bankrolls of long sessions of BlackJack.
+
+A Session starts with a bankroll and plays rounds with a player policy, betting what its betting policy says, until
+it is ruined (less than the minimum wager left), reaches its stop loss or win goal, or has played max_rounds.  As in
+play_blackjack.py, a round can't put more than the bankroll at stake: the bankroll caps the wager and the max wager
+that splits and double downs are limited by, as well as the table's max_wager.
+
+The rounds are played by the Simulator, one Simulator kept across all the sessions of a batch.  Results are kept as
+streaming statistics (counts of the values at a fixed resolution, and running sums), so memory stays the same
+whatever the number of sessions, and batches run in parallel merge into one BankrollResult.
+
+Run from command line: python bankroll.py [sessions] [bankroll] [max rounds]
+"""
+from __future__ import print_function, division
+import math
+import random
+import sys
+import time
+try:
+    from .simulation import Simulator, _map_shards, mimic_dealer, shard_seed
+except (ImportError, ValueError):
+    from simulation import Simulator, _map_shards, mimic_dealer, shard_seed
+
+OUTCOMES = ('ruined', 'stop_loss', 'win_goal', 'max_rounds')  # How a session ends
+QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+
+class Distribution(object):
+    """Values counted at a resolution, with their running sums for the mean and standard deviation.
+    Memory depends on the range of the values, not their number, and distributions of batches merge.
+    """
+
+    def __init__(self, resolution=1):
+        self.resolution = resolution
+        self.counts = {}  # Count of the values by value / resolution, rounded
+        self.count = 0
+        self.total = 0.0
+        self.total_squared = 0.0
+
+    def add(self, value):
+        """Returns None.  Counts a value"""
+        key = int(round(value / self.resolution))
+        self.counts[key] = self.counts.get(key, 0) + 1
+        self.count += 1
+        self.total += value
+        self.total_squared += value * value
+
+    def merge(self, other):
+        """Returns self after adding the values of another Distribution of the same resolution"""
+        if other.resolution != self.resolution:
+            raise ValueError('Distributions of resolution %r and %r do not merge' % (self.resolution,
+                                                                                     other.resolution))
+        for key, count in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.total_squared += other.total_squared
+        return self
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def std(self):
+        """Sample standard deviation of the values"""
+        if self.count < 2:
+            return 0.0
+        return math.sqrt(max(self.total_squared - self.count * self.mean ** 2, 0.0) / (self.count - 1))
+
+    @property
+    def min(self):
+        return min(self.counts) * self.resolution if self.counts else None
+
+    @property
+    def max(self):
+        return max(self.counts) * self.resolution if self.counts else None
+
+    def quantile(self, fraction):
+        """Returns the value below which fraction of the values fall (nearest rank), to the resolution"""
+        if not self.count:
+            return None
+        rank = max(int(math.ceil(fraction * self.count)), 1)
+        seen = 0
+        for key in sorted(self.counts):
+            seen += self.counts[key]
+            if seen >= rank:
+                return key * self.resolution
+        return max(self.counts) * self.resolution
+
+    def quantiles(self, fractions=QUANTILES):
+        """Returns {fraction: quantile} for the fractions"""
+        return dict((fraction, self.quantile(fraction)) for fraction in fractions)
+
+
+class FlatBet(object):
+    """Betting policy: the same wager every round"""
+
+    def __init__(self, wager=1):
+        self.wager = wager
+
+    def __call__(self, session):
+        return self.wager
+
+
+class Martingale(object):
+    """Betting policy: doubles the wager after each loss, back to the base wager after a win, up to max_bet"""
+
+    def __init__(self, base=1, max_bet=None):
+        self.base = base
+        self.max_bet = max_bet
+
+    def __call__(self, session):
+        if not session.rounds or session.last_earned > 0:
+            return self.base
+        wager = session.wager * 2 if session.last_earned < 0 else session.wager
+        return wager if self.max_bet is None else min(wager, self.max_bet)
+
+
+class ProportionalBet(object):
+    """Betting policy: a fraction of the bankroll, in whole units, at least min_wager"""
+
+    def __init__(self, fraction=0.02, min_wager=1):
+        self.fraction = fraction
+        self.min_wager = min_wager
+
+    def __call__(self, session):
+        return max(int(session.bankroll * self.fraction), self.min_wager)
+
+
+class Session(object):
+    """A bankroll played round after round until it's over.  Passed to Simulator.run, which asks it for the wager of
+    every round (bet) and tells it the wager earned (settle).  outcome is how it ended, one of OUTCOMES.
+    """
+
+    def __init__(self, bankroll=100, betting=None, max_wager=None, min_wager=1, stop_loss=None, win_goal=None,
+                 max_rounds=1000):
+        """Returns None.  betting is called with the session and returns the wager of the round, by default a
+        FlatBet of min_wager.  max_wager is the table's limit on the wagers of a round, None for no limit but the
+        bankroll.  The session stops once stop_loss is lost or win_goal is won, when given.
+        """
+        self.start = self.bankroll = bankroll
+        self.betting = betting if betting is not None else FlatBet(min_wager)
+        self.max_wager = max_wager
+        self.min_wager = min_wager
+        self.stop_loss = stop_loss
+        self.win_goal = win_goal
+        self.max_rounds = max_rounds
+        self.rounds = 0
+        self.wager = 0  # Wager of the last round
+        self.last_earned = 0.0
+        self.low = bankroll  # Lowest bankroll reached
+        self.outcome = None
+        if bankroll < min_wager:
+            self.outcome = 'ruined'
+        elif max_rounds < 1:
+            self.outcome = 'max_rounds'
+
+    def bet(self):
+        """Returns (wager, max wager) of the next round, both capped by the bankroll"""
+        limit = self.bankroll if self.max_wager is None else min(self.max_wager, self.bankroll)
+        self.wager = min(max(self.betting(self), self.min_wager), limit)
+        return self.wager, limit
+
+    def settle(self, earned):
+        """Returns True when the session is over after a round with the wager earned"""
+        self.rounds += 1
+        self.bankroll += earned
+        self.last_earned = earned
+        if self.bankroll < self.low:
+            self.low = self.bankroll
+        if self.bankroll < self.min_wager:
+            self.outcome = 'ruined'
+        elif self.stop_loss is not None and self.bankroll <= self.start - self.stop_loss:
+            self.outcome = 'stop_loss'
+        elif self.win_goal is not None and self.bankroll >= self.start + self.win_goal:
+            self.outcome = 'win_goal'
+        elif self.rounds >= self.max_rounds:
+            self.outcome = 'max_rounds'
+        return self.outcome is not None
+
+
+class BankrollResult(object):
+    """Results of many sessions: how they ended, and the distributions of their length, final and lowest bankroll"""
+
+    def __init__(self, resolution=0.01):
+        self.sessions = 0
+        self.outcomes = dict((outcome, 0) for outcome in OUTCOMES)
+        self.lengths = Distribution(1)  # Rounds played per session
+        self.bankrolls = Distribution(resolution)  # Final bankroll
+        self.lows = Distribution(resolution)  # Lowest bankroll
+        self.elapsed = 0.0
+
+    def add(self, session):
+        """Returns None.  Counts a finished Session"""
+        self.sessions += 1
+        self.outcomes[session.outcome] += 1
+        self.lengths.add(session.rounds)
+        self.bankrolls.add(session.bankroll)
+        self.lows.add(session.low)
+
+    @property
+    def risk_of_ruin(self):
+        """Fraction of the sessions that ended ruined"""
+        return self.outcomes['ruined'] / self.sessions if self.sessions else 0.0
+
+    @property
+    def ruin_std_error(self):
+        """Standard error of the risk of ruin estimate"""
+        if not self.sessions:
+            return 0.0
+        return math.sqrt(self.risk_of_ruin * (1 - self.risk_of_ruin) / self.sessions)
+
+    @property
+    def rounds(self):
+        return int(self.lengths.total)
+
+    @property
+    def rounds_per_second(self):
+        return self.rounds / self.elapsed if self.elapsed else 0.0
+
+    def merge(self, other):
+        """Returns self after adding the sessions of another BankrollResult"""
+        self.sessions += other.sessions
+        for outcome in OUTCOMES:
+            self.outcomes[outcome] += other.outcomes[outcome]
+        self.lengths.merge(other.lengths)
+        self.bankrolls.merge(other.bankrolls)
+        self.lows.merge(other.lows)
+        self.elapsed += other.elapsed
+        return self
+
+    def __repr__(self):
+        return '<BankrollResult sessions=%d risk_of_ruin=%.5f mean_rounds=%.1f mean_bankroll=%.2f %s>' % (
+            self.sessions, self.risk_of_ruin, self.lengths.mean, self.bankrolls.mean,
+            ' '.join('%s=%d' % (outcome, self.outcomes[outcome]) for outcome in OUTCOMES))
+
+
+def simulate_bankroll(sessions, policy=mimic_dealer, betting=None, bankroll=100, max_wager=None, min_wager=1,
+                      stop_loss=None, win_goal=None, max_rounds=1000, rng=None, **rules):
+    """Returns BankrollResult of sessions played one after the other from one Simulator.
+    betting, bankroll, max_wager, min_wager, stop_loss, win_goal and max_rounds configure each Session (see
+    Session).  rules are the other Simulator arguments, for the rules and the shoe.
+    """
+    simulator = Simulator(rng=rng, **rules)
+    result = BankrollResult()
+    start = time.time()
+    for _ in range(sessions):
+        session = Session(bankroll, betting, max_wager, min_wager, stop_loss, win_goal, max_rounds)
+        if session.outcome is None:
+            simulator.run(max_rounds, policy, session)
+        result.add(session)
+    result.elapsed = time.time() - start
+    return result
+
+
+def _run_batch(args):
+    """Returns BankrollResult of one batch of sessions.  Runs in a worker process"""
+    seed, batch, sessions, policy, settings = args
+    return simulate_bankroll(sessions, policy, rng=random.Random(shard_seed(seed, batch)), **settings)
+
+
+def run_bankroll_parallel(sessions, policy=mimic_dealer, workers=None, seed=0, batch_sessions=10000, **settings):
+    """Returns BankrollResult of sessions played in batches across a pool of worker processes.
+    Each batch of batch_sessions has its own Simulator seeded from (seed, batch) as in simulation.run_parallel, so
+    the same seed gives the same results whatever the number of workers.  settings are the simulate_bankroll
+    arguments.  policy and betting need to be picklable.
+    """
+    batches = []
+    for batch, start in enumerate(range(0, sessions, batch_sessions)):
+        batches.append((seed, batch, min(batch_sessions, sessions - start), policy, settings))
+    start = time.time()
+    result = BankrollResult()
+    for batch_result in _map_shards(_run_batch, batches, workers):
+        result.merge(batch_result)
+    result.elapsed = time.time() - start  # Wall clock time, not the sum over the workers
+    return result
+
+
+def format_result(result):
+    """Returns the BankrollResult as text: how the sessions ended, and quantiles of their length and bankroll"""
+    lines = ['%d sessions, %d rounds (%.0f rounds/sec)' % (result.sessions, result.rounds, result.rounds_per_second),
+             'Risk of ruin: %.4f +- %.4f' % (result.risk_of_ruin, result.ruin_std_error),
+             'Outcomes: ' + ', '.join('%s %d' % (outcome, result.outcomes[outcome]) for outcome in OUTCOMES),
+             '%-16s %10s %10s %s' % ('', 'mean', 'std', '  '.join('p%-7g' % (100 * q) for q in QUANTILES))]
+    for name, distribution in (('rounds', result.lengths), ('final bankroll', result.bankrolls),
+                               ('lowest bankroll', result.lows)):
+        quantiles = distribution.quantiles()
+        lines.append('%-16s %10.2f %10.2f %s' % (name, distribution.mean, distribution.std,
+                                                 '  '.join('%-8g' % quantiles[q] for q in QUANTILES)))
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    sessions = int(sys.argv[1]) if len(sys.argv) >= 2 else 10000
+    start_bankroll = int(sys.argv[2]) if len(sys.argv) >= 3 else 100
+    rounds = int(sys.argv[3]) if len(sys.argv) >= 4 else 1000
+    print(format_result(run_bankroll_parallel(sessions, bankroll=start_bankroll, max_rounds=rounds, max_wager=10,
+                                              decks=6)))
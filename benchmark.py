@@ -0,0 +1,319 @@
+#!/usr/bin/env python
+"""
+Benchmarks of the game hot paths, to catch performance regressions.
+
+Run from command line: python benchmark.py [--number N] [--seed S] [--only name,name] [--json FILE] [--compare FILE]
+                       python benchmark.py --startup
+
+Each benchmark times one operation under a fixed random seed: building a BlackJack game, the hand value, hit, the
+Dealer loop of stand, split, double down, a snapshot/restore branch, full rounds and Simulator rounds.  The state an
+operation needs (a freshly dealt game for hit, say) is prepared before the timing starts.  Reports are:
+
+* ops/sec: operations per second over a run of number operations timed as a whole
+* p50/p90/p99: latency of single operations, in microseconds, from timing them one at a time
+* peak memory: the most memory allocated while running the operations, measured in a separate run with
+  tracemalloc (Python 3), as timing under tracemalloc is much slower
+
+--json writes the results, with the Python version and platform, so runs can be compared with --compare.
+
+--startup measures what a short-lived process pays: the time to import the package and get BlackJack, and then to
+play a first round, each the best of a few fresh interpreters.  It fails when either is over STARTUP_BUDGET or when
+importing the package loaded one of LAZY_MODULES, which are only to be imported when they are used.
+"""
+from __future__ import print_function, division
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import time
+import timeit
+try:
+    from .blackjack import BlackJack
+    from .shoe import Shoe
+    from .simulation import Simulator, mimic_dealer, play_game
+except (ImportError, ValueError):
+    from blackjack import BlackJack
+    from shoe import Shoe
+    from simulation import Simulator, mimic_dealer, play_game
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2, peak memory is not reported
+    tracemalloc = None
+
+timer = timeit.default_timer
+STARTUP_BUDGET = {'import_ms': 50.0, 'first_round_ms': 10.0}
+LAZY_MODULES = ('numpy', 'multiprocessing', 'json', 'simulation', 'strategy', 'dealer', 'exact', 'bankroll',
+                'results')
+CLI_LAZY_MODULES = LAZY_MODULES + ('history',)  # Not for an interactive game without a history file
+STRATEGY_LAZY_MODULES = ('numpy', 'multiprocessing', 'simulation', 'exact', 'bankroll', 'results')  # Not for strategy
+
+# Run in a fresh interpreter by run_startup.  json is imported after the modules loaded are listed, as it's one of them.
+# The command line game and then the strategy module are imported last, to list what each loads on its own.  A module counts in or out of the package
+_STARTUP_CODE = '''
+import importlib
+import sys
+import timeit
+sys.path.insert(0, %(path)r)
+start = timeit.default_timer()
+import %(package)s as package
+BlackJack = package.BlackJack
+imported = timeit.default_timer()
+game = BlackJack()
+while game.players[0].active and game.player_hand_value() < 17:
+    game.hit(0)
+if game.players[0].active:
+    game.stand(0)
+finished = timeit.default_timer()
+def loaded(names):
+    return [name for name in names if name in sys.modules or '%(package)s.' + name in sys.modules]
+loaded_modules = loaded(%(lazy_modules)r)
+importlib.import_module(%(cli)r)
+cli_loaded = loaded(%(cli_lazy_modules)r)
+importlib.import_module(%(strategy)r)
+strategy_loaded = loaded(%(strategy_lazy_modules)r)
+import json
+print(json.dumps({'import_ms': (imported - start) * 1e3, 'first_round_ms': (finished - imported) * 1e3,
+                  'loaded': loaded_modules, 'cli_loaded': cli_loaded, 'strategy_loaded': strategy_loaded}))
+'''
+
+
+def _active_game(**rules):
+    """Returns a dealt game that's still in play, not a BlackJack"""
+    game = BlackJack(**rules)
+    while not game.players[0].active:
+        game = BlackJack(**rules)
+    return game
+
+
+def _dealer_below_min_game():
+    """Returns a dealt game in play where the Dealer still has to draw"""
+    game = _active_game()
+    while game.dealer_hand_value() >= game.dealer_min:
+        game = _active_game()
+    return game
+
+
+def _branch(game):
+    """Returns None.  Plays a hit and a stand from a snapshot of the game and rewinds it"""
+    snapshot = game.snapshot()
+    game.hit(0)
+    game.stand(0)
+    game.restore(snapshot)
+
+
+class Benchmark(object):
+    """An operation to time.  setup() returns the argument of one call of run(), prepared before the timing.
+    With shared set, setup() is called once and its result is the argument of every call.
+    """
+
+    def __init__(self, name, run, setup=None, ops_per_call=1, shared=False):
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.ops_per_call = ops_per_call  # Operations done by one call of run
+        self.shared = shared
+
+
+BENCHMARKS = [
+    Benchmark('construct', lambda _: BlackJack()),
+    Benchmark('hand_value', lambda game: game._get_hand_value(game.players[0].hand), _active_game),
+    Benchmark('hand_value_list', lambda game: game._get_hand_value(list(game.players[0].hand)), _active_game),
+    Benchmark('hit', lambda game: game.hit(0), _active_game),
+    Benchmark('stand', lambda game: game.stand(0), _dealer_below_min_game),
+    Benchmark('split', lambda game: game.split(), lambda: _active_game(max_wager=2)),
+    Benchmark('double_down', lambda game: game.double_down(0), lambda: _active_game(max_wager=2)),
+    Benchmark('snapshot_restore', lambda game: _branch(game), _active_game),
+    Benchmark('round', lambda shoe: play_game(BlackJack(shoe=shoe), mimic_dealer), lambda: Shoe(decks=6),
+              shared=True),
+    Benchmark('simulator_round', lambda simulator: simulator.run(1000), lambda: Simulator(decks=6), ops_per_call=1000,
+              shared=True),
+]
+
+
+def percentile(samples, fraction):
+    """Returns the value below which fraction of the sorted samples fall (nearest rank)"""
+    if not samples:
+        return 0.0
+    index = min(int(round(fraction * (len(samples) - 1))), len(samples) - 1)
+    return samples[index]
+
+
+def _arguments(benchmark, calls, seed):
+    """Returns the arguments of calls calls of the benchmark, prepared from seed"""
+    random.seed(seed)
+    if benchmark.setup is None:
+        return [None] * calls
+    if benchmark.shared:
+        return [benchmark.setup()] * calls
+    return [benchmark.setup() for _ in range(calls)]
+
+
+def run_benchmark(benchmark, number=10000, seed=0):
+    """Returns a dict of the results of one benchmark: ops_per_sec, latency percentiles in microseconds and
+    peak_memory in bytes (None without tracemalloc)
+    """
+    calls = max(number // benchmark.ops_per_call, 1)
+    run = benchmark.run
+    # Throughput, the calls timed as a whole
+    arguments = _arguments(benchmark, calls, seed)
+    random.seed(seed)
+    start = timer()
+    for argument in arguments:
+        run(argument)
+    elapsed = timer() - start
+    # Latency, each call timed on its own
+    arguments = _arguments(benchmark, calls, seed)
+    random.seed(seed)
+    latencies = []
+    for argument in arguments:
+        call_start = timer()
+        run(argument)
+        latencies.append((timer() - call_start) * 1e6 / benchmark.ops_per_call)
+    latencies.sort()
+    # Peak memory of running the calls, not of preparing them
+    peak_memory = None
+    if tracemalloc is not None:
+        arguments = _arguments(benchmark, calls, seed)
+        random.seed(seed)
+        tracemalloc.start()
+        try:
+            for argument in arguments:
+                run(argument)
+            peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return {
+        'ops': calls * benchmark.ops_per_call,
+        'ops_per_sec': calls * benchmark.ops_per_call / elapsed if elapsed else 0.0,
+        'p50_us': percentile(latencies, 0.5),
+        'p90_us': percentile(latencies, 0.9),
+        'p99_us': percentile(latencies, 0.99),
+        'peak_memory': peak_memory,
+    }
+
+
+def run_benchmarks(number=10000, seed=0, only=None):
+    """Returns the results of the benchmarks (all, or the names in only) with the run's settings and environment"""
+    names = [benchmark.name for benchmark in BENCHMARKS]
+    for name in only or ():
+        if name not in names:
+            raise ValueError('Unknown benchmark: %r, choose from %s' % (name, ', '.join(names)))
+    results = {}
+    for benchmark in BENCHMARKS:
+        if only and benchmark.name not in only:
+            continue
+        results[benchmark.name] = run_benchmark(benchmark, number, seed)
+    return {
+        'number': number,
+        'seed': seed,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'benchmarks': results,
+    }
+
+
+def format_results(run, baseline=None):
+    """Returns the results as a text table.  With a baseline run, also shows the change in ops/sec"""
+    lines = ['%-16s %12s %9s %9s %9s %12s%s' % ('benchmark', 'ops/sec', 'p50 us', 'p90 us', 'p99 us', 'peak KiB',
+                                                 '  vs baseline' if baseline else '')]
+    for name in [benchmark.name for benchmark in BENCHMARKS]:
+        if name not in run['benchmarks']:
+            continue
+        result = run['benchmarks'][name]
+        peak = '%.1f' % (result['peak_memory'] / 1024) if result['peak_memory'] is not None else '-'
+        line = '%-16s %12.0f %9.2f %9.2f %9.2f %12s' % (name, result['ops_per_sec'], result['p50_us'],
+                                                        result['p90_us'], result['p99_us'], peak)
+        if baseline:
+            old = baseline['benchmarks'].get(name)
+            if old and old['ops_per_sec']:
+                line += '  %+11.1f%%' % (100.0 * (result['ops_per_sec'] / old['ops_per_sec'] - 1))
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def run_startup(runs=5):
+    """Returns the best import_ms and first_round_ms of runs fresh interpreters, the LAZY_MODULES they loaded, and the
+    CLI_LAZY_MODULES and STRATEGY_LAZY_MODULES that importing play_blackjack and then strategy loaded.
+    The package is imported by the name of this directory (card_games in a checkout), else blackjack is imported.
+    """
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    package = os.path.basename(package_dir)
+    if re.match(r'^[A-Za-z_][A-Za-z0-9_]*$', package):
+        path = os.path.dirname(package_dir)
+        prefix = package + '.'
+    else:
+        package, path, prefix = 'blackjack', package_dir, ''
+    code = _STARTUP_CODE % {'path': path, 'package': package, 'lazy_modules': LAZY_MODULES,
+                            'cli': prefix + 'play_blackjack', 'cli_lazy_modules': CLI_LAZY_MODULES,
+                            'strategy': prefix + 'strategy', 'strategy_lazy_modules': STRATEGY_LAZY_MODULES}
+    samples = [json.loads(subprocess.check_output([sys.executable, '-c', code]).decode('utf-8')) for _ in range(runs)]
+    return {
+        'package': package,
+        'import_ms': min(sample['import_ms'] for sample in samples),
+        'first_round_ms': min(sample['first_round_ms'] for sample in samples),
+        'loaded': sorted(set(name for sample in samples for name in sample['loaded'])),
+        'cli_loaded': sorted(set(name for sample in samples for name in sample['cli_loaded'])),
+        'strategy_loaded': sorted(set(name for sample in samples for name in sample['strategy_loaded'])),
+    }
+
+
+def check_startup(result, budget=STARTUP_BUDGET):
+    """Returns the problems with a run_startup result: times over budget and modules loaded that should be lazy"""
+    problems = ['%s %.2f is over the budget of %.2f' % (name, result[name], limit)
+                for name, limit in sorted(budget.items()) if result[name] > limit]
+    if result['loaded']:
+        problems.append('importing %s loaded %s' % (result['package'], ', '.join(result['loaded'])))
+    if result['cli_loaded']:
+        problems.append('importing play_blackjack loaded %s' % ', '.join(result['cli_loaded']))
+    if result['strategy_loaded']:
+        problems.append('importing strategy loaded %s' % ', '.join(result['strategy_loaded']))
+    return problems
+
+
+def format_startup(result, budget=STARTUP_BUDGET):
+    """Returns the run_startup result as text, with the budget"""
+    return '\n'.join('%-16s %9.2f ms  (budget %.2f ms)' % (name, result[name], budget[name])
+                     for name in ('import_ms', 'first_round_ms'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the BlackJack hot paths')
+    parser.add_argument('--number', type=int, default=10000, help='operations per benchmark')
+    parser.add_argument('--seed', type=int, default=0, help='random seed')
+    parser.add_argument('--only', help='comma separated benchmarks to run')
+    parser.add_argument('--json', help='write the results as JSON to this file, - for stdout')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--startup', action='store_true', help='check the import and first round time budget')
+    args = parser.parse_args(argv)
+    if args.startup:
+        result = run_startup()
+        print(format_startup(result))
+        problems = check_startup(result)
+        if problems:
+            sys.exit('\n'.join(problems))
+        return result
+    run = run_benchmarks(args.number, args.seed, args.only.split(',') if args.only else None)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+    if args.json == '-':
+        json.dump(run, sys.stdout, indent=2, sort_keys=True)
+        print()
+    else:
+        print(format_results(run, baseline))
+        if args.json:
+            with open(args.json, 'w') as json_file:
+                json.dump(run, json_file, indent=2, sort_keys=True)
+    return run
+
+
+if __name__ == '__main__':
+    main()
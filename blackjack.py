@@ -3,122 +3,394 @@
 A package to wrap the rules of BlackJack.
 """
 from __future__ import print_function
-import random
+try:
+    from .cards import CARD_SUITS, CARD_VALUES, FACE_VALUES
+    from .hand import Hand, hand_value
+    from .rules import INSURANCE_PAYOUT, INSURANCE_WAGER, RuleSet
+    from .shoe import Shoe, EVERY_ROUND
+except (ImportError, ValueError):
+    from cards import CARD_SUITS, CARD_VALUES, FACE_VALUES
+    from hand import Hand, hand_value
+    from rules import INSURANCE_PAYOUT, INSURANCE_WAGER, RuleSet
+    from shoe import Shoe, EVERY_ROUND
+
+# Player actions, named after the BlackJack methods that play them
+HIT = 'hit'
+STAND = 'stand'
+DOUBLE_DOWN = 'double_down'
+SPLIT = 'split'
+SURRENDER = 'surrender'
+INSURANCE = 'insurance'
+DEALER = -1  # Owner of the Dealer's cards, Player hands are owned by their hand_idx
+SNAPSHOT_SHOE_CARDS = 64  # A snapshot copies a shoe this short, as a branch could run it out and reshuffle it
+
+
+def hand_result(player_value, player_cards, dealer_value, dealer_cards):
+    """Returns the result of a finished Player hand against the finished Dealer hand, from their values and number of
+    cards: 'blackjack', 'won', 'lost', 'bust' or 'push'
+    """
+    # When Player has Blackjack in 2 cards and dealer doesn't
+    if player_value == 21 and player_cards == 2 and (dealer_value != 21 or dealer_cards > 2):
+        return 'blackjack'
+    # When Both Player and Dealer values are equal or both are Bust, then "Push".
+    elif player_value == dealer_value or (player_value > 21 and dealer_value > 21):
+        return 'push'
+    # When Only Player is Bust, then "Bust". You lost the wager
+    elif player_value > 21:
+        return 'bust'
+    # When Only Dealer is Bust, or Player has higher number than Dealer, then "Won".  You won the wager
+    elif dealer_value > 21 or player_value > dealer_value:
+        return 'won'
+    # When both Player and delaer are not bust and Player has lower number than Dealer
+    return 'lost'
+
+
+class Player(object):
+    """A hand played by the Player with its wager and result.
+    Fields can also be read and set as player['hand'], player['wager'] etc, like the dict it replaces.
+    """
+    __slots__ = ('hand', 'wager', 'active', 'allow_dd', 'result')
+
+    def __init__(self, wager, allow_dd):
+        self.hand = Hand()
+        self.wager = wager
+        self.active = True
+        self.allow_dd = allow_dd
+        self.result = None
+
+    def reset(self, wager, allow_dd):
+        """Returns None.  Empties the hand for a new hand with wager, as a new Player(wager, allow_dd) would be"""
+        self.hand.clear()
+        self.wager = wager
+        self.active = True
+        self.allow_dd = allow_dd
+        self.result = None
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def keys(self):
+        return list(self.__slots__)
+
+    def __repr__(self):
+        return repr(dict((key, getattr(self, key)) for key in self.__slots__))
+
+
+class RoundHistory(object):
+    """Cards dealt, as (owner, card), and actions played, as (action, hand_idx), in the order they happened.
+    Also keeps the opening wager and rules that change during the round.
+    """
+    __slots__ = ('wager', 'allow_split', 'allow_dd', 'cards', 'actions')
+
+    def __init__(self, wager, allow_split, allow_dd):
+        self.wager = wager
+        self.allow_split = allow_split
+        self.allow_dd = allow_dd
+        self.cards = []
+        self.actions = []
+
+    def card(self, owner, card):
+        self.cards.append((owner, card))
+
+    def action(self, action, hand_idx):
+        self.actions.append((action, hand_idx))
+
+
+class Snapshot(object):
+    """State of a BlackJack game to rewind to with BlackJack.restore.
+    Only the hands and counters are kept, a few bytes each: the cards drawn after the snapshot are in the game's
+    draw log and go back on the shoe on restore, so the shoe is not copied (unless it's nearly out, see
+    SNAPSHOT_SHOE_CARDS).
+    """
+    __slots__ = ('draws', 'players', 'dealer_cards', 'dealer_hard', 'dealer_aces', 'dealer_value', 'wager_earned',
+                 'insurance_wager', 'shoe_left', 'shoe_cards', 'reshuffles', 'counter', 'history')
 
 
 class BlackJack(object):
     """Contains all the logic to Play BlackJack"""
+    card_suits = CARD_SUITS
+    card_faces = FACE_VALUES  # Card value by face
 
-    def __init__(self, wager=1, max_wager=1, dealer_min=17, allow_soft_limit=True, allow_split=True, allow_dd=True, allow_dd_after_split=True):
-        """Returns None.  Initiailizes the Game with rules, wager limits and draws the initial set of two cards for player and dealer"""
+    def __init__(self, wager=1, max_wager=1, dealer_min=17, allow_soft_limit=True, allow_split=True, allow_dd=True, allow_dd_after_split=True, shoe=None, rng=None, shuffler=None, record=False, lazy_dealer=False, rules=None):
+        """Returns None.  Initiailizes the Game with rules, wager limits and draws the initial set of two cards for player and dealer
+        Pass a Shoe to keep dealing from the same shoe across rounds.  By default, each game gets a freshly shuffled deck.
+        rng is the random.Random instance that shuffles that deck, by default the random module, or pass a shuffler
+        (see shufflers.py) to deal stacked or recorded decks.
+        With record set, the cards dealt and the actions played are kept in self.history for history.HistoryWriter.
+        With lazy_dealer set, the Dealer draws only once every Player hand is finished, as at a casino table, and
+        all the hands are settled together then.  By default the Dealer also draws on each hit and each hand is
+        settled when it stands.
+        rules, a rules.RuleSet, gives the rules instead of the rule arguments (dealer_min to allow_dd_after_split),
+        and also has the BlackJack payout, the Dealer hitting soft 17, the decks of the default shoe, re-splits up to
+        max_hands, surrender and insurance.
+        """
+        if rules is None:
+            rules = RuleSet(dealer_min=dealer_min, allow_soft_limit=allow_soft_limit, allow_split=allow_split,
+                            allow_dd=allow_dd, allow_dd_after_split=allow_dd_after_split)
+        self.rules = rules
         self.max_wager = max_wager
-        self.dealer_min = dealer_min
-        self.allow_soft_limit = allow_soft_limit
-        self.allow_split = allow_split
-        self.allow_dd_after_split = allow_dd_after_split  # Allow Double Down after Split
-        self.card_suits = ['Spade', 'Heart', 'Diamond', 'Club']
-        self.card_faces = {str(numb): numb for numb in range(2, 11)}
-        for face in ('jack', 'king', 'queen'):
-            self.card_faces[face] = 10
-        self.card_faces['ace'] = 11
+        self.dealer_min = rules.dealer_min
+        self.allow_soft_limit = rules.allow_soft_limit
+        self.allow_split = rules.allow_split
+        self.allow_dd_after_split = rules.allow_dd_after_split  # Allow Double Down after Split
+        self.lazy_dealer = lazy_dealer
         # Set the player hand, Dealer hand
         self.players = []  # Assume One Player Hand (No Split)
-        self.players.append(self._init_player(wager, allow_dd))
-        self.dealer_hand = []
+        self.players.append(self._init_player(wager, rules.allow_dd))
+        self.dealer_hand = Hand()
+        self.dealer_value = None  # Final Dealer hand value, once resolved with lazy_dealer
         self.wager_earned = 0
-        self.card_deck = [(face, suit) for suit in self.card_suits for face in self.card_faces.keys()]
-        random.shuffle(self.card_deck)  # Shuffle the card deck
+        self.insurance_wager = 0  # Insurance taken, settled as soon as it's taken
+        self.draws = None  # Cards drawn since the first snapshot, to put back on restore
+        self._spare_players = None  # Split hands rewound by restore, reused by the next split instead of new ones
+        self.history = RoundHistory(wager, rules.allow_split, rules.allow_dd) if record else None
+        if shoe is None:
+            shoe = Shoe(rules.decks, reshuffle=EVERY_ROUND, rng=rng, shuffler=shuffler)
+        self.shoe = shoe
+        self.shoe.start_round()  # Shuffles the shoe if the cut card has come out
+        self.card_deck = self.shoe.cards  # Cards left in the shoe, as ints (see cards.py)
         # Draw two cards for Player and Dealer
-        self.players[0]['hand'].append(self._pick_card())
-        self.players[0]['hand'].append(self._pick_card())
-        self.dealer_hand.append(self._pick_card())
-        self.dealer_hand.append(self._pick_card())
+        self.players[0].hand.add(self._pick_card(0))
+        self.players[0].hand.add(self._pick_card(0))
+        self.dealer_hand.add(self._pick_card())
+        self.dealer_hand.add(self._pick_card())
         self.verify_blackjack()  # Verify if hand has hit a blackjack
         return None
 
+    @classmethod
+    def instrument(cls, timings=False):
+        """Returns the instrumentation.Instrumentation of the process, enabled.  It counts cards drawn, hand
+        evaluations, Dealer draws, reshuffles, splits and double downs, and with timings set also times hit, stand
+        and building a game.  Call its disable() to stop, there is no cost while it's disabled.
+        """
+        try:  # Imported here as instrumentation imports this module
+            from .instrumentation import INSTRUMENTATION
+        except (ImportError, ValueError):
+            from instrumentation import INSTRUMENTATION
+        return INSTRUMENTATION.enable(timings)
+
     def _init_player(self, wager, allow_dd):
         """Initializes Player Hand"""
-        player = {
-            'hand': [],
-            'wager': wager,
-            'active': True,
-            'allow_dd': allow_dd,
-            'result': None
-        }
-        return player
+        return Player(wager, allow_dd)
 
     def _face_value(self, face_numb):
         '''Returns card value for the card. Card needs to be of format (face, suit)'''
         return self.card_faces[face_numb]
 
-    def _pick_card(self):
-        '''Draws a Card from the Deck and return the card'''
-        return self.card_deck.pop()
+    def _pick_card(self, owner=DEALER):
+        '''Draws a Card from the Shoe and return the card.  owner is the hand_idx the card is for, or DEALER'''
+        card = self.shoe.draw()
+        if self.history is not None:
+            self.history.card(owner, card)
+        if self.draws is not None:
+            self.draws.append(card)
+        return card
+
+    def snapshot(self):
+        """Returns a Snapshot of the game to rewind to with restore, to try out actions against the cards actually
+        left in the shoe.  Snapshots nest: restoring one also rewinds any taken after it.
+        """
+        if self.draws is None:
+            self.draws = bytearray()
+        snapshot = Snapshot()
+        snapshot.draws = len(self.draws)
+        snapshot.players = [(player, bytes(player.hand.cards), player.hand.hard, player.hand.aces, player.wager,
+                             player.active, player.allow_dd, player.result) for player in self.players]
+        dealer_hand = self.dealer_hand
+        snapshot.dealer_cards = len(dealer_hand.cards)
+        snapshot.dealer_hard = dealer_hand.hard
+        snapshot.dealer_aces = dealer_hand.aces
+        snapshot.dealer_value = self.dealer_value
+        snapshot.wager_earned = self.wager_earned
+        snapshot.insurance_wager = self.insurance_wager
+        shoe = self.shoe
+        snapshot.shoe_left = len(shoe.cards)
+        snapshot.reshuffles = shoe.reshuffles
+        snapshot.shoe_cards = snapshot.counter = None
+        if len(shoe.cards) <= SNAPSHOT_SHOE_CARDS:
+            snapshot.shoe_cards = bytes(shoe.cards)
+            counter = shoe.counter
+            if counter is not None:  # A reshuffle replaces the counter's sums, keep the ones of this shoe
+                snapshot.counter = (counter.initial, counter.total, counter.bottom_counts)
+        snapshot.history = None
+        if self.history is not None:
+            snapshot.history = (len(self.history.cards), len(self.history.actions))
+        return snapshot
+
+    def restore(self, snapshot):
+        """Returns None.  Rewinds the game to the snapshot: the cards drawn since go back on top of the shoe, in
+        order, and the hands, wagers and results are as they were.  Costs the changes since, not the shoe.
+        """
+        shoe = self.shoe
+        drawn = self.draws[snapshot.draws:]
+        if shoe.reshuffles != snapshot.reshuffles:
+            if snapshot.shoe_cards is None:
+                raise ValueError('The shoe was reshuffled since the snapshot')
+            shoe.cards[:] = snapshot.shoe_cards
+            shoe.reshuffles = snapshot.reshuffles
+            if snapshot.counter is not None:
+                shoe.counter.initial, shoe.counter.total, shoe.counter.bottom_counts = snapshot.counter
+        else:
+            drawn.reverse()
+            shoe.cards += drawn
+        del self.draws[snapshot.draws:]
+        if len(self.players) > len(snapshot.players):  # Hands split since, kept for the splits of the next branch
+            if self._spare_players is None:
+                self._spare_players = []
+            self._spare_players += self.players[len(snapshot.players):]
+            del self.players[len(snapshot.players):]
+        for player, cards, hard, aces, wager, active, allow_dd, result in snapshot.players:
+            hand = player.hand
+            hand.cards[:] = cards
+            hand.hard = hard
+            hand.aces = aces
+            player.wager = wager
+            player.active = active
+            player.allow_dd = allow_dd
+            player.result = result
+        dealer_hand = self.dealer_hand
+        del dealer_hand.cards[snapshot.dealer_cards:]
+        dealer_hand.hard = snapshot.dealer_hard
+        dealer_hand.aces = snapshot.dealer_aces
+        self.dealer_value = snapshot.dealer_value
+        self.wager_earned = snapshot.wager_earned
+        self.insurance_wager = snapshot.insurance_wager
+        if snapshot.history is not None:
+            del self.history.cards[snapshot.history[0]:]
+            del self.history.actions[snapshot.history[1]:]
+        return None
 
     def _get_hand_value(self, hand, allow_soft_limit=True):
         """Returns hand value.
         If allow_soft_limit is set, Ace is calculated with 1 or 11, which ever is favorable to reach 21
         """
-        hand_values = [0]
-        for face, suit in hand:
-            card_value = self._face_value(face)
-            hand_values = [value + card_value for value in hand_values]
-            if face == 'ace' and allow_soft_limit:
-                hand_values_ace = [value - 10 for value in hand_values if value < 21]
-                hand_values += hand_values_ace
-        # Get the higehst value that's 21 or less.  If none found, get the bust value
-        hand_values.sort(reverse=True)  # Highest number First
-        for value in hand_values:
-            hand_value = value
-            if hand_value <= 21:  # Found the highest number <= 21
-                break
-        return hand_value
+        if isinstance(hand, Hand):  # Hands of the game keep their hard total and Aces as cards are added
+            return hand.value(allow_soft_limit)
+        aces = sum(1 for face, suit in hand if face == 'ace')
+        hard = sum(self._face_value(face) for face, suit in hand) - 10 * aces
+        return hand_value(hard, aces, allow_soft_limit)
 
     def get_dealer_upcard(self):
         """Returns the first Dealer Card as Dealer Up Card"""
         return self.dealer_hand[0]
 
-    def split(self):
-        '''Splits the hand into two hands when 2 x wager is less than max and splits allowed'''
-        if self.allow_split and len(self.players) == 1 and self.players[0]['active'] and self.max_wager >= (self.players[0]['wager'] * 2):
-            if self.allow_dd_after_split and self.players[0]['allow_dd']:
-                allow_dd = True
-            else:
-                self.players[0]['allow_dd'] = False
-            player2 = self._init_player(self.players[0]['wager'], allow_dd)
-            player2['hand'].append(self.players[0]['hand'].pop())  # Pop Player1 Hand and assign the card to player2
-            self.players.append(player2)  # Add Split hand to the Player
-            # Pick one more card for both Hands
-            self.players[0]['hand'].append(self._pick_card())
-            self.players[1]['hand'].append(self._pick_card())
-            res = True
+    def wager_at_stake(self):
+        """Returns the wagers of every hand and the insurance, which max_wager limits"""
+        wager = self.insurance_wager
+        for player in self.players:
+            wager += player.wager
+        return wager
+
+    def can_split(self, hand_idx=0):
+        """Returns True when the hand can be split now: its first two cards are still in play, the round has fewer
+        than max_hands hands, and max_wager covers the wager of one more hand
+        """
+        player = self.players[hand_idx]
+        return self.allow_split and player.active and len(player.hand) == 2 and \
+            len(self.players) < self.rules.max_hands and self.max_wager >= self.wager_at_stake() + player.wager
+
+    def split(self, hand_idx=0):
+        '''Returns True if the hand was split into two hands, the new hand played last, else returns False'''
+        if self.history is not None:
+            self.history.action(SPLIT, hand_idx)
+        if not self.can_split(hand_idx):
+            return False
+        player = self.players[hand_idx]
+        if not self.allow_dd_after_split:
+            player.allow_dd = False
+        split_idx = len(self.players)
+        if self._spare_players:  # A hand split in a branch rewound by restore
+            split_player = self._spare_players.pop()
+            split_player.reset(player.wager, player.allow_dd)
+        else:
+            split_player = self._init_player(player.wager, player.allow_dd)
+        split_player.hand.append(player.hand.pop())  # The second card starts the split hand
+        self.players.append(split_player)
+        # Pick one more card for both Hands
+        player.hand.add(self._pick_card(hand_idx))
+        split_player.hand.add(self._pick_card(split_idx))
+        return True
+
+    def dealer_blackjack(self):
+        """Returns True when the Dealer's first two cards make 21"""
+        cards = self.dealer_hand.cards
+        return CARD_VALUES[cards[0]] + CARD_VALUES[cards[1]] == 21
+
+    def can_surrender(self):
+        """Returns True when the opening hand can be surrendered: its first two cards are still in play, unsplit"""
+        player = self.players[0]
+        return self.rules.allow_surrender and len(self.players) == 1 and player.active and len(player.hand) == 2
+
+    def surrender(self, hand_idx=0):
+        '''Returns True if the opening hand was surrendered for half its wager else returns False.
+        Late surrender: against a Dealer BlackJack the hand is lost as usual.  The Dealer draws no more cards.
+        '''
+        if self.history is not None:
+            self.history.action(SURRENDER, hand_idx)
+        if hand_idx != 0 or not self.can_surrender():
+            return False
+        player = self.players[0]
+        player.result = 'lost' if self.dealer_blackjack() else 'surrender'
+        self.wager_earned += self.rules.payouts[player.result] * player.wager
+        player.active = False
+        return True
+
+    def can_insure(self):
+        """Returns True when insurance can be taken: the up card is an Ace, the opening hand is still in play with its
+        first two cards, and max_wager covers the insurance, half the opening wager
+        """
+        player = self.players[0]
+        return self.rules.allow_insurance and not self.insurance_wager and len(self.players) == 1 and \
+            player.active and len(player.hand) == 2 and CARD_VALUES[self.dealer_hand.cards[0]] == 11 and \
+            self.max_wager >= self.wager_at_stake() + player.wager * INSURANCE_WAGER
+
+    def insurance(self, hand_idx=0):
+        '''Returns True if insurance was taken else returns False.
+        Insurance is half the opening wager and pays 2 to 1 when the Dealer has a BlackJack, settled straight away.
+        '''
+        if self.history is not None:
+            self.history.action(INSURANCE, hand_idx)
+        if hand_idx != 0 or not self.can_insure():
+            return False
+        self.insurance_wager = self.players[0].wager * INSURANCE_WAGER
+        if self.dealer_blackjack():
+            self.wager_earned += INSURANCE_PAYOUT * self.insurance_wager
         else:
-            res = False
-        self.allow_split = False  # No more split allowed
-        return res
+            self.wager_earned -= self.insurance_wager
+        return True
 
     def double_down(self, hand_idx=0):
         '''Returns True if double down was successful else returns False'''
-        wager_required = 0
-        for player in self.players:
-            wager_required += player['wager']
-        wager_required += self.players[hand_idx]['wager']  # Add the wager for current hand again (Double)
+        if self.history is not None:
+            self.history.action(DOUBLE_DOWN, hand_idx)
+        wager_required = self.wager_at_stake()
+        wager_required += self.players[hand_idx].wager  # Add the wager for current hand again (Double)
         player = self.players[hand_idx]
-        if player['allow_dd'] and player['active']:
+        if player.allow_dd and player.active:
             if self.max_wager >= wager_required:
-                player['wager'] = player['wager'] * 2
+                player.wager = player.wager * 2
             else:
-                player['wager'] = self.max_wager  # Double down what ever is remaining
-            self.hit(hand_idx)
-            self.stand(hand_idx)
+                player.wager = self.max_wager  # Double down what ever is remaining
+            self._hit(hand_idx)
+            self._stand(hand_idx)
             return True
         else:
             return False
 
     def verify_blackjack(self, hand_idx=0):
         '''Returns True when Player has hit a BlackJack and issues computes game result (via Stand) Else Returns False'''
-        if self.player_hand_value(hand_idx) == 21 and len(self.players[hand_idx]['hand']) == 2:
-            self.stand(hand_idx)
+        if self.player_hand_value(hand_idx) == 21 and len(self.players[hand_idx].hand) == 2:
+            self._stand(hand_idx)
             return True
         else:
             return False
@@ -134,63 +406,91 @@ class BlackJack(object):
         """Picks a card at random for the player hand.
         Dealer picks card until the minimum is reached.  At that point, dealer stops.
         """
+        if self.history is not None:
+            self.history.action(HIT, hand_idx)
+        self._hit(hand_idx)
+
+    def _hit(self, hand_idx):
+        """Returns None.  Plays a hit, also as part of a double down"""
         player = self.players[hand_idx]
-        if player['active']:
-            player['hand'].append(self._pick_card())
-        if self.dealer_hand_value() < self.dealer_min:
-            self.dealer_hand.append(self._pick_card())
+        if player.active:
+            player.hand.add(self._pick_card(hand_idx))
+        if not self.lazy_dealer and self._dealer_draws():
+            self.dealer_hand.add(self._pick_card())
         if self.is_bust(hand_idx):
-            self.stand(hand_idx)  # Force Stand and compute game result
-        # Turn Off Split and Double Down after the first hit
-        if player['allow_dd']:  # Don't allow double down after the first hit
-            player['allow_dd'] = False
-        if self.allow_split:  # Don't allow split after the first hit
-            self.allow_split = False
+            self._stand(hand_idx)  # Force Stand and compute game result
+        # Turn Off Double Down after the first hit, the third card rules out a split
+        if player.allow_dd:  # Don't allow double down after the first hit
+            player.allow_dd = False
+
+    def _dealer_draws(self):
+        """Returns True while the Dealer has to draw: below the minimum, or on a soft 17 if the Dealer hits it"""
+        return self.rules.dealer_draws[self.dealer_hand.aces][self.dealer_hand.hard]
 
     def player_hand_value(self, hand_idx=0):
         """Returns Player Hand Value"""
-        return self._get_hand_value(self.players[hand_idx]['hand'])
+        return self.players[hand_idx].hand.value()
 
     def dealer_hand_value(self):
         """Returns Dealer Hand Value"""
-        return self._get_hand_value(self.dealer_hand, allow_soft_limit=self.allow_soft_limit)
+        if self.dealer_value is not None:
+            return self.dealer_value
+        return self.dealer_hand.value(self.allow_soft_limit)
+
+    def running_count(self):
+        """Returns the running count of the shoe, None unless the shoe has a counting.CardCounter"""
+        return self.shoe.running_count()
+
+    def true_count(self):
+        """Returns the true count of the shoe, None unless the shoe has a counting.CardCounter"""
+        return self.shoe.true_count()
 
     def stand(self, hand_idx=0):
         """Returns None.  Computes the Game Result and Wager Earned.
         Game for the hand is over once a Stand is called.
         """
-        dealer_value = self.dealer_hand_value()
+        if self.history is not None:
+            self.history.action(STAND, hand_idx)
+        self._stand(hand_idx)
+
+    def _stand(self, hand_idx):
+        """Returns None.  Plays a stand, also when forced by a bust, a double down or a BlackJack"""
+        if self.lazy_dealer:
+            return self._finish_hand(hand_idx)
         # Dealer has to hit until it's atleast Dealer Min (Default 17)
-        while dealer_value < self.dealer_min:
-            self.dealer_hand.append(self._pick_card())
-            dealer_value = self.dealer_hand_value()
+        while self._dealer_draws():
+            self.dealer_hand.add(self._pick_card())
+        dealer_value = self.dealer_hand_value()
         #Compute Player Hand value
         player = self.players[hand_idx]
         player_value = self.player_hand_value(hand_idx)
-        if player['active']:
-            # When Player has Blackjack in 2 cards and dealer doesn't
-            if player_value == 21 and len(player['hand']) == 2 and \
-                    (dealer_value != 21 or (dealer_value == 21 and len(self.dealer_hand) > 2)):
-                    player['result'] = 'blackjack'
-                    self.wager_earned += 1.5 * player['wager']
-            # When Both Player and Dealer values are equal or both are Bust, then "Push".
-            elif player_value == dealer_value or (player_value > 21 and dealer_value > 21):
-                player['result'] = 'push'
-            # When Only Player is Bust, then "Bust". You lost the wager
-            elif player_value > 21:
-                player['result'] = 'bust'
-                self.wager_earned -= player['wager']
-            # When Only Dealer is Bust, then "Won".  You won the wager
-            elif dealer_value > 21:
-                player['result'] = 'won'
-                self.wager_earned += player['wager']
-            # When both Player and delaer are not bust and Player has higher number than Dealer
-            elif player_value > dealer_value:
-                player['result'] = 'won'
-                self.wager_earned += player['wager']
-            # When both Player and delaer are not bust and Player has lower number than Dealer
-            elif dealer_value > player_value:
-                player['result'] = 'lost'
-                self.wager_earned -= player['wager']
-            player['active'] = False  # Set Player Hand Active to False after a Stand
+        if player.active:
+            player.result = hand_result(player_value, len(player.hand), dealer_value, len(self.dealer_hand))
+            self.wager_earned += self.rules.payouts[player.result] * player.wager
+            player.active = False  # Set Player Hand Active to False after a Stand
+        return None
+
+    def _finish_hand(self, hand_idx):
+        """Returns None.  With lazy_dealer, ends the hand and settles the round once every hand has ended"""
+        player = self.players[hand_idx]
+        if not player.active:
+            return None
+        player.active = False
+        for player in self.players:
+            if player.active:
+                return None
+        self._settle()
+        return None
+
+    def _settle(self):
+        """Returns None.  Draws the Dealer hand to the minimum, once, and settles every Player hand against it"""
+        # Dealer has to hit until it's atleast Dealer Min (Default 17)
+        while self._dealer_draws():
+            self.dealer_hand.add(self._pick_card())
+        dealer_value = self.dealer_value = self.dealer_hand.value(self.allow_soft_limit)
+        dealer_cards = len(self.dealer_hand)
+        payouts = self.rules.payouts
+        for player in self.players:
+            player.result = hand_result(player.hand.value(), len(player.hand), dealer_value, dealer_cards)
+            self.wager_earned += payouts[player.result] * player.wager
         return None
@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+"""
+Compact card encoding.
+
+A card is a small int: suit index * 13 + face index, so one deck is 0..51 and a shoe or a hand fits in a bytearray.
+The lookup tables below are indexed by the card, and give the (face, suit) name older code expects.
+"""
+from __future__ import print_function
+
+CARD_SUITS = ['Spade', 'Heart', 'Diamond', 'Club']
+CARD_FACES = [str(numb) for numb in range(2, 11)] + ['jack', 'king', 'queen', 'ace']
+FACE_VALUES = {str(numb): numb for numb in range(2, 11)}
+for face in ('jack', 'king', 'queen'):
+    FACE_VALUES[face] = 10
+FACE_VALUES['ace'] = 11
+
+DECK = list(range(len(CARD_SUITS) * len(CARD_FACES)))
+CARD_NAMES = [(face, suit) for suit in CARD_SUITS for face in CARD_FACES]  # (face, suit) by card
+CARD_CODES = dict((name, card) for card, name in enumerate(CARD_NAMES))  # Card by (face, suit)
+CARD_VALUES = [FACE_VALUES[face] for face, suit in CARD_NAMES]  # Ace counted as 11
+HARD_CARD_VALUES = [1 if face == 'ace' else FACE_VALUES[face] for face, suit in CARD_NAMES]  # Ace counted as 1
+IS_ACE = [1 if face == 'ace' else 0 for face, suit in CARD_NAMES]
+
+
+def encode(card):
+    """Returns the card as an int.  card can be an int already or a (face, suit) tuple"""
+    if isinstance(card, int):
+        return card
+    return CARD_CODES[tuple(card)]
+
+
+def decode(card):
+    """Returns the (face, suit) tuple of the card"""
+    return CARD_NAMES[card]
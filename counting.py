@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""
+Card counting: running and true counts of the cards dealt from a Shoe.
+
+A counting system tags each card value (2 to 11, Ace is 11) with a count.  The running count is the sum of the tags
+of the cards dealt since the shoe was shuffled, the true count is the running count per deck left in the shoe.
+
+The cards only leave the shoe from the end, in the shuffled order, so the counter sums the tags of the shoe once per
+shuffle, as a running sum from the bottom of the shoe.  The running count is then a lookup by the number of cards
+left: no work per card drawn, whether a card is drawn with Shoe.draw or popped by the Simulator.
+
+Attach a counter to a shoe with Shoe(decks=6, counter=CardCounter('hi-lo')), then read BlackJack.running_count() and
+BlackJack.true_count(), or pass count='hi-lo' to the Simulator.
+"""
+from __future__ import print_function, division
+try:
+    from .cards import CARD_VALUES, DECK
+except (ImportError, ValueError):
+    from cards import CARD_VALUES, DECK
+
+HI_LO = {2: 1, 3: 1, 4: 1, 5: 1, 6: 1, 7: 0, 8: 0, 9: 0, 10: -1, 11: -1}
+KO = {2: 1, 3: 1, 4: 1, 5: 1, 6: 1, 7: 1, 8: 0, 9: 0, 10: -1, 11: -1}
+OMEGA_II = {2: 1, 3: 1, 4: 2, 5: 2, 6: 2, 7: 1, 8: 0, 9: -1, 10: -2, 11: 0}
+SYSTEMS = {'hi-lo': HI_LO, 'ko': KO, 'omega-ii': OMEGA_II}
+CARD_VALUE_CARDS = list(range(12))  # Cards that are their own value, as in the Simulator's shoe
+
+
+class CardCounter(object):
+    """Running and true count of a shoe with a counting system"""
+
+    def __init__(self, system='hi-lo', card_values=CARD_VALUES):
+        """Returns None.  system is a name in SYSTEMS or a dict of tags by card value.
+        card_values gives the value of the cards in the shoe, by default cards are ints as in cards.py.  Use
+        CARD_VALUE_CARDS for a shoe of card values.
+        """
+        if not isinstance(system, dict):
+            if system not in SYSTEMS:
+                raise ValueError('Unknown counting system: %r' % (system,))
+            system = SYSTEMS[system]
+        self.system = system
+        self.tags = [system.get(value, 0) for value in card_values]  # Tag by card
+        self.imbalance = sum(system[value] for value in CARD_VALUES)  # Sum of the tags of a deck, 0 if balanced
+        self.initial = 0
+        self.total = 0  # Sum of the tags of the full shoe
+        self.bottom_counts = [0]  # Sum of the tags of the bottom i cards of the shoe, by i
+
+    def shuffled(self, cards):
+        """Returns None.  Starts counting a freshly shuffled shoe, cards bytearray as in Shoe.cards"""
+        tags = self.tags
+        bottom_counts = [0] * (len(cards) + 1)
+        running = 0
+        for i, card in enumerate(cards):
+            running += tags[card]
+            bottom_counts[i + 1] = running
+        self.bottom_counts = bottom_counts
+        self.total = running
+        # Unbalanced systems start below 0, at 4 - 4 x decks for KO, so the count ends at the imbalance of one deck
+        self.initial = int(round(self.imbalance * (1 - len(cards) / len(DECK))))
+
+    def running_count(self, cards_left):
+        """Returns the running count after the cards dealt since the shuffle, when cards_left remain in the shoe"""
+        return self.initial + self.total - self.bottom_counts[cards_left]
+
+    def true_count(self, cards_left):
+        """Returns the running count per deck left in the shoe.  Counts half a deck when less is left"""
+        decks_left = max(cards_left / len(DECK), 0.5)
+        return self.running_count(cards_left) / decks_left
+
+
+class BetRamp(object):
+    """A bet spread for the Simulator: called with the true count, returns the wager.  Picklable for run_parallel"""
+
+    def __init__(self, ramp, min_wager=1):
+        """Returns None.  ramp is {true count: wager}, the wager for true counts from that count up.
+        Below the lowest count bets min_wager.
+        """
+        self.steps = sorted(ramp.items(), reverse=True)
+        self.min_wager = min_wager
+
+    def __call__(self, true_count):
+        for count, wager in self.steps:
+            if true_count >= count:
+                return wager
+        return self.min_wager
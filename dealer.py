@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+"""
+Distribution of the Dealer's final hand value by up card.
+
+The Dealer draws until the hand value reaches dealer_min, as in BlackJack.stand, and on a soft dealer_min as well
+with dealer_hits_soft_17.  Outcomes are arrays indexed by the
+final hand value (0 to 21) with the chance of going bust at index BUST.  Card values run from 2 to 11 (Ace).
+
+dealer_probabilities computes the exact distribution by walking every sequence of Dealer draws, with the results
+memoized on the cards left and the Dealer hand.  sample_dealer_outcomes plays millions of Dealer hands at once as
+NumPy arrays.  NumPy is only needed for the sampler.
+"""
+from __future__ import print_function, division
+try:
+    from .cards import CARD_VALUES, DECK
+    from .hand import hand_value
+except (ImportError, ValueError):
+    from cards import CARD_VALUES, DECK
+    from hand import hand_value
+
+BUST = 22
+CARD_RANKS = list(range(2, 12))  # Card values, Ace is 11
+HARD_RANKS = [1 if value == 11 else value for value in CARD_RANKS]
+INFINITE_DECK = (1, 1, 1, 1, 1, 1, 1, 1, 4, 1)  # Relative weights of each value in an infinite deck
+
+
+def shoe_composition(decks=1, cards=None):
+    """Returns the number of cards of each value 2 to 11 as a list of 10 counts.
+    Counts cards, a list of cards as ints like Shoe.cards, else full decks
+    """
+    counts = [0] * len(CARD_RANKS)
+    for card in (DECK if cards is None else cards):
+        counts[CARD_VALUES[card] - 2] += 1 if cards is not None else decks
+    return counts
+
+
+class BoundedCache(dict):
+    """A dict that empties itself when it holds max_size entries, to bound memory of memoized results"""
+
+    def __init__(self, max_size):
+        dict.__init__(self)
+        self.max_size = max_size
+
+    def __setitem__(self, key, value):
+        if len(self) >= self.max_size:
+            self.clear()
+        dict.__setitem__(self, key, value)
+
+
+def dealer_stands(value, hard, aces, dealer_min, allow_soft_limit, dealer_hits_soft_17):
+    """Returns True when the Dealer stands on the hand, as RuleSet.dealer_draws"""
+    if value != dealer_min or not dealer_hits_soft_17:
+        return value >= dealer_min
+    return not aces or hard > 11 and allow_soft_limit  # Hard dealer_min, no Ace counts as 11
+
+
+_draw_cache = BoundedCache(2 ** 20)  # Dealer draws, by (rules, cards left, hand)
+_outcome_cache = BoundedCache(2 ** 14)  # Final results, by (rules, cards left, up card)
+
+
+def _dealer_draws(counts, hard, aces, dealer_min, allow_soft_limit, dealer_hits_soft_17):
+    """Returns the outcome probabilities of a Dealer hand that still has to draw from counts.
+    counts is a tuple of the cards left by value, or None for an infinite deck.
+    """
+    key = (dealer_min, allow_soft_limit, dealer_hits_soft_17, counts, hard, aces)
+    outcome = _draw_cache.get(key)
+    if outcome is not None:
+        return outcome
+    outcome = [0.0] * (BUST + 1)
+    weights = INFINITE_DECK if counts is None else counts
+    total = sum(weights)
+    for rank, weight in enumerate(weights):
+        if not weight:
+            continue
+        probability = weight / total
+        card_hard = hard + HARD_RANKS[rank]
+        card_aces = aces + (rank == 9)
+        value = hand_value(card_hard, card_aces, allow_soft_limit)
+        if dealer_stands(value, card_hard, card_aces, dealer_min, allow_soft_limit, dealer_hits_soft_17):
+            outcome[min(value, BUST)] += probability
+        elif counts is not None and total == 1:  # Shoe is empty, Dealer stays at the value reached
+            outcome[value] += probability
+        else:
+            if counts is not None:
+                card_counts = counts[:rank] + (weight - 1,) + counts[rank + 1:]
+            else:
+                card_counts = None
+            if allow_soft_limit:
+                card_aces = min(card_aces, 1)  # Only one Ace can count as 11, more Aces give the same hands
+            draws = _dealer_draws(card_counts, card_hard, card_aces, dealer_min, allow_soft_limit, dealer_hits_soft_17)
+            for index, chance in enumerate(draws):
+                if chance:
+                    outcome[index] += probability * chance
+    outcome = tuple(outcome)
+    _draw_cache[key] = outcome
+    return outcome
+
+
+def dealer_probabilities(upcard, dealer_min=17, allow_soft_limit=True, decks=1, composition=None,
+                         dealer_hits_soft_17=False):
+    """Returns the exact outcome probabilities for the up card as a list indexed by final hand value (BUST for bust).
+    The Dealer draws the hole card and then hits until dealer_min, as in BlackJack.stand, from decks (or composition,
+    counts of card values 2 to 11) less the up card.  decks=None draws from an infinite deck.  dealer_hits_soft_17
+    has the Dealer draw on a soft dealer_min.
+    """
+    if composition is None and decks is not None:
+        composition = shoe_composition(decks)
+    if composition is not None:
+        composition = tuple(composition)
+        if composition[upcard - 2] < 1:
+            raise ValueError('No %d left in the shoe for the up card' % upcard)
+    key = (dealer_min, allow_soft_limit, dealer_hits_soft_17, composition, upcard)
+    outcome = _outcome_cache.get(key)
+    if outcome is None:
+        counts = None
+        if composition is not None:
+            counts = composition[:upcard - 2] + (composition[upcard - 2] - 1,) + composition[upcard - 1:]
+        outcome = _dealer_draws(counts, HARD_RANKS[upcard - 2], int(upcard == 11), dealer_min, allow_soft_limit,
+                                dealer_hits_soft_17)
+        _outcome_cache[key] = outcome
+    return list(outcome)
+
+
+def dealer_outcomes(dealer_min=17, allow_soft_limit=True, decks=1, composition=None, dealer_hits_soft_17=False):
+    """Returns {upcard: exact outcome probabilities} for every up card left in the shoe"""
+    if composition is None and decks is not None:
+        composition = shoe_composition(decks)
+    return dict((upcard, dealer_probabilities(upcard, dealer_min, allow_soft_limit, decks, composition,
+                                              dealer_hits_soft_17))
+                for upcard in CARD_RANKS if composition is None or composition[upcard - 2])
+
+
+def _require_numpy():
+    """Returns the numpy module, imported here as only the vectorized sampler needs it"""
+    try:
+        import numpy  # NumPy takes longer to import than the rest of the game
+    except ImportError:
+        raise ImportError('sample_dealer_outcomes needs NumPy.  Install it with: pip install numpy')
+    return numpy
+
+
+def sample_dealer_outcomes(samples, dealer_min=17, allow_soft_limit=True, decks=1, composition=None, upcards=None,
+                           rng=None, dealer_hits_soft_17=False):
+    """Returns {upcard: outcome probabilities} estimated from samples Dealer hands for each up card.
+    The hands are drawn without replacement from decks (or composition, counts of card values 2 to 11) less the
+    up card.  decks=None draws from an infinite deck.  rng is a numpy.random.Generator, or a seed for one.
+    """
+    numpy = _require_numpy()
+    if not isinstance(rng, numpy.random.Generator):
+        rng = numpy.random.default_rng(rng)
+    infinite = composition is None and decks is None
+    if composition is None:
+        composition = shoe_composition(1 if infinite else decks)
+    composition = numpy.asarray(composition, dtype=numpy.int64)
+    values = numpy.array(CARD_RANKS, dtype=numpy.int64)
+    hard_values = numpy.where(values == 11, 1, values)
+    outcomes = {}
+    for upcard in (CARD_RANKS if upcards is None else upcards):
+        if not infinite and composition[upcard - 2] < 1:
+            raise ValueError('No %d left in the shoe for the up card' % upcard)
+        if infinite:
+            counts = None
+            probabilities = composition / composition.sum()
+        else:
+            counts = numpy.tile(composition, (samples, 1))
+            counts[:, upcard - 2] -= 1
+        hard = numpy.full(samples, 1 if upcard == 11 else upcard, dtype=numpy.int64)
+        aces = numpy.full(samples, 1 if upcard == 11 else 0, dtype=numpy.int64)
+        lanes = numpy.arange(samples)  # Dealer hands still drawing
+        final = numpy.empty(samples, dtype=numpy.int64)
+        while lanes.size:
+            # Draw one card for every hand still drawing
+            if infinite:
+                ranks = rng.choice(len(CARD_RANKS), size=lanes.size, p=probabilities)
+            else:
+                lane_counts = counts[lanes]
+                pick = (rng.random(lanes.size) * lane_counts.sum(axis=1)).astype(numpy.int64)
+                ranks = (lane_counts.cumsum(axis=1) <= pick[:, None]).sum(axis=1)
+                counts[lanes, ranks] -= 1
+            hard[lanes] += hard_values[ranks]
+            aces[lanes] += values[ranks] == 11
+            lane_hard = hard[lanes]
+            lane_aces = aces[lanes]
+            if allow_soft_limit:
+                soft = (lane_aces > 0) & (lane_hard <= 11)
+                hand_values = numpy.where(soft, lane_hard + 10, lane_hard)
+            else:
+                soft = lane_aces > 0
+                hand_values = lane_hard + 10 * lane_aces
+            final[lanes] = hand_values
+            draws = hand_values < dealer_min
+            if dealer_hits_soft_17:
+                draws |= (hand_values == dealer_min) & soft
+            lanes = lanes[draws]
+        final = numpy.minimum(final, BUST)
+        outcomes[upcard] = numpy.bincount(final, minlength=BUST + 1)[:BUST + 1] / samples
+    return outcomes
@@ -0,0 +1,513 @@
+#!/usr/bin/env python
+"""
+Exact expected value of a BlackJack round, for rule changes that would otherwise need long simulations.
+
+round_ev enumerates every opening deal (two Player cards and the Dealer up card, drawn from the shoe without
+replacement) and plays each one to the end by recursion over the Player's cards, with the Dealer's final hand
+probabilities conditioned on every card the Player holds.  Play is the best action at every decision (optimal,
+composition dependent play), or the actions of a policy, as in the Simulator, to check it.
+
+The rules are those of BlackJack: a two card 21 pays 1.5 (also after a split) unless the Dealer has 21 in two
+cards, a hand is a push when both Player and Dealer bust, any two cards can be split once, and doubling down is
+capped by max_wager.  With allow_surrender the opening hand can also be surrendered for half the wager (all of it
+against a Dealer BlackJack), and with dealer_hits_soft_17 the Dealer draws on a soft dealer_min.  Re-splits and
+insurance are not priced, round_ev raises ValueError on those rules.  The Dealer drawing on each hit (or at the
+end with lazy_dealer) does not change the odds: the cards each hand gets are as random either way.
+
+The Dealer's draws from an up card form the same graph of states for every shoe, so it's built once per up card and
+only the probabilities are worked out per shoe.  Split hands are played from the shoe less the up card and the two
+split cards, without removing the cards the hands draw, as analyzers usually do; everything else is exact.
+"""
+from __future__ import print_function, division
+import sys
+import time
+try:
+    from .blackjack import HIT, STAND, DOUBLE_DOWN, SPLIT, SURRENDER
+    from .dealer import BUST, CARD_RANKS, HARD_RANKS, dealer_stands, shoe_composition
+    from .hand import hand_value
+    from .rules import PAYOUTS
+except (ImportError, ValueError):
+    from blackjack import HIT, STAND, DOUBLE_DOWN, SPLIT, SURRENDER
+    from dealer import BUST, CARD_RANKS, HARD_RANKS, dealer_stands, shoe_composition
+    from hand import hand_value
+    from rules import PAYOUTS
+
+ACE = 9  # Index of the Ace in the card counts, values 2 to 11
+MIN_CARDS = 13  # Up card and the most cards a Player hand can hold (four Aces, four 2s, three 3s) and draw
+
+
+class DealerGraph(object):
+    """States of the Dealer's hand after each draw from an up card, keyed by the counts of the cards drawn"""
+
+    def __init__(self, upcard, dealer_min=17, allow_soft_limit=True, dealer_hits_soft_17=False):
+        self.upcard = upcard
+        start = (0,) * len(CARD_RANKS)
+        index = {start: 0}
+        hands = [(start, HARD_RANKS[upcard - 2], int(upcard == 11))]  # (cards drawn, hard total, Aces) by state
+        self.states = []  # (number drawn, (rank, drawn) of the ranks drawn, draws to states, finals, busts)
+        state = 0
+        while state < len(hands):
+            drawn, hard, aces = hands[state]
+            draws, finals, busts = [], [], []
+            for rank, card_hard in enumerate(HARD_RANKS):
+                card_hard += hard
+                card_aces = aces + (rank == ACE)
+                value = hand_value(card_hard, card_aces, allow_soft_limit)
+                if value > 21:
+                    busts.append((rank, drawn[rank]))
+                elif dealer_stands(value, card_hard, card_aces, dealer_min, allow_soft_limit, dealer_hits_soft_17):
+                    finals.append((rank, drawn[rank], value))
+                else:
+                    next_drawn = drawn[:rank] + (drawn[rank] + 1,) + drawn[rank + 1:]
+                    if next_drawn not in index:
+                        index[next_drawn] = len(hands)
+                        hands.append((next_drawn, card_hard, card_aces))
+                    draws.append((rank, drawn[rank], index[next_drawn]))
+            ranks_drawn = tuple((rank, count) for rank, count in enumerate(drawn) if count)
+            self.states.append((sum(drawn), ranks_drawn, draws, finals, busts,
+                                hand_value(hard, aces, allow_soft_limit)))
+            state += 1
+
+    def outcomes(self, counts):
+        """Returns the Dealer's final value probabilities (BUST for bust) drawing from counts, the cards left by value
+        less the up card, and the chance of busting with each value as the card after the Dealer's hand.
+        That card is as likely to be any card left as the card a Player draws before the Dealer, so it prices the
+        push of a Player bust against a Dealer bust.
+        """
+        total = sum(counts)
+        probability = [0.0] * len(self.states)
+        probability[0] = 1.0
+        outcome = [0.0] * (BUST + 1)
+        next_total = 0.0  # Sum of the bust chances over the cards left after them, by the cards drawn before them
+        next_drawn = [0.0] * len(CARD_RANKS)
+        next_rank = [0.0] * len(CARD_RANKS)
+        for state, (number_drawn, ranks_drawn, draws, finals, busts, value) in enumerate(self.states):
+            chance = probability[state]
+            if not chance:
+                continue
+            left = total - number_drawn
+            if left <= 0:  # Shoe is empty, Dealer stays at the value reached
+                outcome[value] += chance
+                continue
+            chance /= left
+            for rank, rank_drawn, next_state in draws:
+                weight = counts[rank] - rank_drawn
+                if weight > 0:
+                    probability[next_state] += chance * weight
+            for rank, rank_drawn, value in finals:
+                weight = counts[rank] - rank_drawn
+                if weight > 0:
+                    outcome[value] += chance * weight
+            state_next = 0.0
+            for rank, rank_drawn in busts:
+                weight = counts[rank] - rank_drawn
+                if weight > 0:
+                    outcome[BUST] += chance * weight
+                    if left > 1:
+                        bust_chance = chance * weight / (left - 1)
+                        state_next += bust_chance
+                        next_rank[rank] += bust_chance
+            if state_next:
+                next_total += state_next
+                for rank, rank_drawn in ranks_drawn:
+                    next_drawn[rank] += state_next * rank_drawn
+        return outcome, [next_total * count - next_drawn[rank] - next_rank[rank] for rank, count in enumerate(counts)]
+
+    def batch_outcomes(self, counts):
+        """Returns outcomes(row) of every row of counts, a NumPy array of shoes, worked out at once"""
+        import numpy  # Imported here, as NumPy takes longer to import than the rest of the game
+        counts = numpy.asarray(counts, dtype=float)
+        total = counts.sum(axis=1)
+        probability = numpy.zeros((len(self.states), len(counts)))
+        probability[0] = 1.0
+        outcome = numpy.zeros((BUST + 1, len(counts)))
+        next_total = numpy.zeros(len(counts))
+        next_drawn = numpy.zeros((len(CARD_RANKS), len(counts)))
+        next_rank = numpy.zeros((len(CARD_RANKS), len(counts)))
+        for state, (number_drawn, ranks_drawn, draws, finals, busts, value) in enumerate(self.states):
+            chance = probability[state]
+            if not chance.any():
+                continue
+            left = total - number_drawn
+            empty = left <= 0  # Shoe is empty, Dealer stays at the value reached
+            outcome[value] += numpy.where(empty, chance, 0.0)
+            chance = numpy.where(empty, 0.0, chance / numpy.where(empty, 1.0, left))
+            for rank, rank_drawn, next_state in draws:
+                probability[next_state] += chance * numpy.maximum(counts[:, rank] - rank_drawn, 0.0)
+            for rank, rank_drawn, value in finals:
+                outcome[value] += chance * numpy.maximum(counts[:, rank] - rank_drawn, 0.0)
+            if not busts:
+                continue
+            next_chance = numpy.where(left > 1, chance / numpy.maximum(left - 1, 1.0), 0.0)
+            state_next = numpy.zeros(len(counts))
+            for rank, rank_drawn in busts:
+                weight = numpy.maximum(counts[:, rank] - rank_drawn, 0.0)
+                outcome[BUST] += chance * weight
+                bust_chance = next_chance * weight
+                state_next += bust_chance
+                next_rank[rank] += bust_chance
+            next_total += state_next
+            for rank, rank_drawn in ranks_drawn:
+                next_drawn[rank] += state_next * rank_drawn
+        bust_next = next_total * counts.T - next_drawn - next_rank
+        return list(zip(outcome.T.tolist(), bust_next.T.tolist()))
+
+
+def _stand_ev(value, outcome):
+    """Returns the EV of standing on value against the Dealer's final value probabilities"""
+    ev = outcome[BUST]
+    for dealer_value in range(BUST):
+        if dealer_value < value:
+            ev += outcome[dealer_value]
+        elif dealer_value > value:
+            ev -= outcome[dealer_value]
+    return ev
+
+
+class RoundEV(object):
+    """Exact expected wager earned per round, in total and by Dealer up card (weighted by its chance)"""
+
+    def __init__(self, ev, by_upcard, rules, elapsed):
+        self.ev = ev
+        self.by_upcard = by_upcard
+        self.rules = rules
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return '<RoundEV ev=%.6f elapsed=%.2fs>' % (self.ev, self.elapsed)
+
+
+class _UpcardRound(object):
+    """Player hands against one Dealer up card, from the shoe less the up card"""
+
+    def __init__(self, upcard, counts, graph, rules, policy):
+        self.upcard = upcard
+        self.counts = counts
+        self.graph = graph
+        self.rules = rules
+        self.policy = policy
+        self.payout = rules['blackjack_payout']
+        wager, max_wager = rules['wager'], rules['max_wager']
+        self.double_factor = 2 if max_wager >= 2 * wager else max_wager / wager
+        self.can_split = rules['allow_split'] and max_wager >= 2 * wager
+        self.split_double_factor = 2 if max_wager >= 3 * wager else max_wager / wager
+        self.can_surrender = rules['allow_surrender']
+        self.surrender = getattr(policy, 'surrender', None) if policy is not None else None
+        self._dealer = {}
+        self._hands = {}
+
+    def dealer(self, removed):
+        """Returns the Dealer outcomes and bust chances by the next card with the removed cards out of the shoe, as
+        DealerGraph.outcomes
+        """
+        result = self._dealer.get(removed)
+        if result is None:
+            counts = tuple(count - out for count, out in zip(self.counts, removed))
+            result = self._dealer[removed] = self.graph.outcomes(counts)
+        return result
+
+    def prefetch(self):
+        """Returns None.  Works out the Dealer outcomes for every Player hand of two or more cards at once"""
+        hands = []
+
+        def add_hands(rank, removed, hard):
+            if rank == len(HARD_RANKS):
+                if sum(removed) >= 2:
+                    hands.append(tuple(removed))
+                return
+            count = 0
+            while count <= self.counts[rank] and hard + count * HARD_RANKS[rank] <= 21:
+                add_hands(rank + 1, removed + [count], hard + count * HARD_RANKS[rank])
+                count += 1
+
+        add_hands(0, [], 0)
+        counts = [[count - out for count, out in zip(self.counts, removed)] for removed in hands]
+        self._dealer.update(zip(hands, self.graph.batch_outcomes(counts)))
+
+    def dealer_blackjack(self, removed):
+        """Returns the chance of the Dealer's hole card making 21 with the up card"""
+        hole = {10: ACE, 11: 8}.get(self.upcard)
+        if hole is None:
+            return 0.0
+        left = sum(self.counts) - sum(removed)
+        return (self.counts[hole] - removed[hole]) / left if left else 0.0
+
+    def _action(self, value, soft, pair, can_double, can_split):
+        action = self.policy(value, soft, pair, self.upcard, can_double, can_split)
+        if action == DOUBLE_DOWN and not can_double:
+            raise ValueError('Policy chose to double down when double down is not allowed')
+        if action == SPLIT and not can_split:
+            raise ValueError('Policy chose to split when split is not allowed')
+        if action not in (HIT, STAND, DOUBLE_DOWN, SPLIT):
+            raise ValueError('Unknown action from policy: %r' % (action,))
+        return action
+
+    def _draws(self, removed, hard, outcome_for):
+        """Returns the EV over the next card of outcome_for(rank, removed after, hard after), a bust pushing when
+        the Dealer busts too
+        """
+        left = sum(self.counts) - sum(removed)
+        ev = 0.0
+        bust_next = None
+        for rank, card_hard in enumerate(HARD_RANKS):
+            weight = self.counts[rank] - removed[rank]
+            if weight <= 0:
+                continue
+            chance = weight / left
+            if hard + card_hard > 21:
+                if bust_next is None:
+                    bust_next = self.dealer(removed)[1]
+                ev -= chance - bust_next[rank]  # Lost, unless the Dealer busts too
+            else:
+                next_removed = removed[:rank] + (removed[rank] + 1,) + removed[rank + 1:]
+                ev += chance * outcome_for(rank, next_removed, hard + card_hard)
+        return ev
+
+    def stand(self, removed, value):
+        """Returns the EV of standing on value"""
+        return _stand_ev(value, self.dealer(removed)[0])
+
+    def hit(self, removed, hard, ace):
+        """Returns the EV of drawing a card and playing on"""
+        return self._draws(removed, hard, lambda rank, next_removed, next_hard: self.play(
+            next_removed, next_hard, ace or rank == ACE))
+
+    def double_down(self, removed, hard, ace, factor):
+        """Returns the EV of drawing one card and standing, with the wager multiplied by factor"""
+        return factor * self._draws(removed, hard, lambda rank, next_removed, next_hard: self.stand(
+            next_removed, hand_value(next_hard, ace or rank == ACE)))
+
+    def play(self, removed, hard, ace):
+        """Returns the EV of playing on a hand of three or more cards, the cards in removed"""
+        key = removed
+        ev = self._hands.get(key)
+        if ev is not None:
+            return ev
+        value = hand_value(hard, ace)
+        soft = ace and hard <= 11
+        if self.policy is not None:
+            if self._action(value, soft, 0, False, False) == HIT:
+                ev = self.hit(removed, hard, ace)
+            else:
+                ev = self.stand(removed, value)
+        elif value == 21:
+            ev = self.stand(removed, value)  # Drawing to 21 can't do better
+        elif value < self.rules['dealer_min'] and hard <= 11:
+            ev = self.hit(removed, hard, ace)  # No card busts and standing below the Dealer minimum can't do better
+        else:
+            ev = max(self.stand(removed, value), self.hit(removed, hard, ace))
+        self._hands[key] = ev
+        return ev
+
+    def opening(self, first, second, removed):
+        """Returns the EV of the opening hand of first and second, ranks of the cards"""
+        hard = HARD_RANKS[first] + HARD_RANKS[second]
+        ace = first == ACE or second == ACE
+        value = hand_value(hard, ace)
+        if value == 21:  # BlackJack is settled at the deal
+            return self.payout * (1 - self.dealer_blackjack(removed))
+        can_double = self.rules['allow_dd']
+        pair = CARD_RANKS[first] if first == second else 0
+        soft = ace and hard <= 11
+        evs = {}
+        if self.policy is not None:
+            if self.can_surrender and self.surrender is not None and self.surrender(value, soft, pair, self.upcard):
+                actions = [SURRENDER]
+            else:
+                actions = [self._action(value, soft, pair, can_double, self.can_split)]
+        else:
+            actions = [STAND, HIT] + ([DOUBLE_DOWN] if can_double else []) + ([SPLIT] if self.can_split else []) + \
+                ([SURRENDER] if self.can_surrender else [])
+        for action in actions:
+            if action == SURRENDER:
+                dealer_blackjack = self.dealer_blackjack(removed)
+                evs[action] = PAYOUTS['surrender'] * (1 - dealer_blackjack) - dealer_blackjack
+            elif action == STAND:
+                evs[action] = self.stand(removed, value)
+            elif action == HIT:
+                evs[action] = self.hit(removed, hard, ace)
+            elif action == DOUBLE_DOWN:
+                evs[action] = self.double_down(removed, hard, ace, self.double_factor)
+            else:
+                evs[action] = self.split(first, second, removed)
+        return max(evs.values())
+
+    def split(self, first, second, removed):
+        """Returns the EV of splitting, both hands played from the shoe less the up card and the split cards"""
+        split_hands = _SplitHands(self, removed)
+        can_double = self.rules['allow_dd'] and self.rules['allow_dd_after_split']
+        factor = self.split_double_factor
+        first_ev, doubled = split_hands.hand(first, can_double, factor)
+        second_ev = split_hands.hand(second, can_double, factor)[0]
+        max_wager, wager = self.rules['max_wager'], self.rules['wager']
+        if doubled and can_double and max_wager < (2 + factor) * wager:
+            # The first hand's double down leaves less to double the second hand with
+            second_doubled_ev = split_hands.hand(second, can_double, max_wager / wager)[0]
+            second_ev = doubled * second_doubled_ev + (1 - doubled) * second_ev
+        return first_ev + second_ev
+
+
+class _SplitHands(object):
+    """Hands after a split, drawing from a fixed shoe: the shoe less the up card and the two split cards"""
+
+    def __init__(self, upcard_round, removed):
+        self.round = upcard_round
+        self.removed = removed
+        self.outcome, self.bust_next = upcard_round.dealer(removed)
+        self.dealer_blackjack = upcard_round.dealer_blackjack(removed)
+        counts = [count - out for count, out in zip(upcard_round.counts, removed)]
+        total = sum(counts)
+        self.draws = [(rank, HARD_RANKS[rank], count / total) for rank, count in enumerate(counts) if count]
+        self._hands = {}
+
+    def _stand(self, value, two_cards):
+        if value == 21 and two_cards:
+            return self.round.payout * (1 - self.dealer_blackjack)
+        return _stand_ev(value, self.outcome)
+
+    def _draws(self, hard, ace, outcome_for):
+        ev = 0.0
+        for rank, card_hard, chance in self.draws:
+            if hard + card_hard > 21:
+                ev -= chance - self.bust_next[rank]
+            else:
+                ev += chance * outcome_for(hard + card_hard, ace or rank == ACE)
+        return ev
+
+    def _play(self, hard, ace):
+        """Returns the EV of playing on with hit or stand"""
+        key = (hard, ace)
+        ev = self._hands.get(key)
+        if ev is not None:
+            return ev
+        value = hand_value(hard, ace)
+        if self.round.policy is not None:
+            if self.round._action(value, ace and hard <= 11, 0, False, False) == HIT:
+                ev = self._draws(hard, ace, self._play)
+            else:
+                ev = self._stand(value, False)
+        else:
+            ev = self._stand(value, False)
+            if value < 21:
+                ev = max(ev, self._draws(hard, ace, self._play))
+        self._hands[key] = ev
+        return ev
+
+    def hand(self, rank, can_double, factor):
+        """Returns the EV of a split hand starting with the card rank, and the chance it doubles down"""
+        ev = 0.0
+        doubled = 0.0
+        for second, card_hard, chance in self.draws:
+            hard = HARD_RANKS[rank] + card_hard
+            ace = rank == ACE or second == ACE
+            value = hand_value(hard, ace)
+            pair = CARD_RANKS[rank] if rank == second else 0
+            evs = {}
+            if self.round.policy is not None:
+                actions = [self.round._action(value, ace and hard <= 11, pair, can_double, False)]
+            else:
+                actions = [STAND, HIT] + ([DOUBLE_DOWN] if can_double else [])
+            for action in actions:
+                if action == STAND:
+                    evs[action] = self._stand(value, True)
+                elif action == HIT:
+                    evs[action] = self._draws(hard, ace, self._play)
+                else:
+                    evs[action] = factor * self._draws(hard, ace, lambda next_hard, next_ace: self._stand(
+                        hand_value(next_hard, next_ace), False))
+            action = max(evs, key=evs.get)
+            ev += chance * evs[action]
+            if action == DOUBLE_DOWN:
+                doubled += chance
+        return ev, doubled
+
+
+def round_ev(policy=None, wager=1, max_wager=1, dealer_min=17, allow_soft_limit=True, allow_split=True, allow_dd=True,
+             allow_dd_after_split=True, decks=1, composition=None, blackjack_payout=PAYOUTS['blackjack'],
+             allow_surrender=False, dealer_hits_soft_17=False, max_hands=2, allow_insurance=False, use_numpy=True):
+    """Returns the RoundEV, the exact expected wager earned per round, for the rules.
+    policy is a Simulator policy to play the hands with, by default each hand is played to its best EV.  With
+    allow_surrender, a policy surrenders when its surrender method says so, as in the Simulator.
+    The round is dealt from decks, or from composition, the counts of card values 2 to 11 left in the shoe.
+    blackjack_payout prices a different payout for a two card 21.  Re-splits (max_hands over 2) and insurance are not
+    priced, so those rules raise ValueError.  The Dealer outcomes are worked out with NumPy when it's installed,
+    unless use_numpy is False.
+    """
+    if max_hands != 2:
+        raise ValueError('The exact EV prices a single split, not max_hands=%r' % (max_hands,))
+    if allow_insurance:
+        raise ValueError('The exact EV does not price insurance')
+    start = time.time()
+    numpy = None
+    if use_numpy:
+        try:
+            import numpy  # Imported here, as NumPy takes longer to import than the rest of the game
+        except ImportError:
+            pass  # The Dealer outcomes are worked out one shoe at a time instead of all at once
+    if composition is None:
+        if decks is None:
+            raise ValueError('The exact EV needs a shoe of decks or a composition, not an infinite deck')
+        composition = shoe_composition(decks)
+    composition = tuple(composition)
+    if sum(composition) < MIN_CARDS:
+        raise ValueError('Needs at least %d cards to play every round to the end' % MIN_CARDS)
+    rules = {
+        'wager': wager,
+        'max_wager': max_wager,
+        'dealer_min': dealer_min,
+        'allow_soft_limit': allow_soft_limit,
+        'dealer_hits_soft_17': dealer_hits_soft_17,
+        'allow_split': allow_split,
+        'allow_dd': allow_dd,
+        'allow_dd_after_split': allow_dd_after_split,
+        'composition': composition,
+        'blackjack_payout': blackjack_payout,
+        'allow_surrender': allow_surrender,
+    }
+    total = sum(composition)
+    ranks = range(len(CARD_RANKS))
+    by_upcard = {}
+    for upcard_rank in ranks:
+        if not composition[upcard_rank]:
+            continue
+        upcard = CARD_RANKS[upcard_rank]
+        counts = composition[:upcard_rank] + (composition[upcard_rank] - 1,) + composition[upcard_rank + 1:]
+        graph = DealerGraph(upcard, dealer_min, allow_soft_limit, dealer_hits_soft_17)
+        upcard_round = _UpcardRound(upcard, counts, graph, rules, policy)
+        if numpy is not None:
+            upcard_round.prefetch()
+        upcard_ev = 0.0
+        # The Player's cards are dealt before the up card, the chance of the deal is the same in any order
+        for first in ranks:
+            for second in ranks:
+                first_weight = counts[first]
+                second_weight = counts[second] - (first == second)
+                if first_weight <= 0 or second_weight <= 0:
+                    continue
+                chance = first_weight * second_weight / ((total - 1) * (total - 2))
+                removed = tuple((rank == first) + (rank == second) for rank in ranks)
+                upcard_ev += chance * upcard_round.opening(first, second, removed)
+        by_upcard[upcard] = composition[upcard_rank] / total * upcard_ev * wager
+    return RoundEV(sum(by_upcard.values()), by_upcard, rules, time.time() - start)
+
+
+def round_ev_for_game(game, policy=None, composition=None):
+    """Returns the RoundEV for the rules of a freshly dealt BlackJack game, from its full shoe or composition"""
+    if composition is None:
+        composition = shoe_composition(cards=game.shoe.full_shoe)
+    rules = game.rules
+    return round_ev(policy, game.players[0].wager, game.max_wager, rules.dealer_min, rules.allow_soft_limit,
+                    rules.allow_split, game.players[0].allow_dd, rules.allow_dd_after_split, composition=composition,
+                    blackjack_payout=rules.blackjack_payout, allow_surrender=rules.allow_surrender,
+                    dealer_hits_soft_17=rules.dealer_hits_soft_17, max_hands=rules.max_hands,
+                    allow_insurance=rules.allow_insurance)
+
+
+if __name__ == '__main__':
+    decks = int(sys.argv[1]) if len(sys.argv) >= 2 else 6
+    max_wager = int(sys.argv[2]) if len(sys.argv) >= 3 else 1
+    result = round_ev(decks=decks, max_wager=max_wager)
+    print('Optimal play, %d decks, max wager %d: EV %.6f per round (%.2fs)' % (decks, max_wager, result.ev,
+                                                                              result.elapsed))
+    for upcard, ev in sorted(result.by_upcard.items()):
+        print('  Dealer up card %2d: %+.6f' % (upcard, ev))
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+A hand of cards that keeps its value up to date as cards are added.
+
+The hand tracks the hard total (every Ace counted as 1) and the number of Aces, so its value is a table lookup
+instead of a pass over the cards.  Cards are held as small ints (see cards.py) in a bytearray.
+"""
+from __future__ import print_function
+try:
+    from .cards import CARD_NAMES, HARD_CARD_VALUES, IS_ACE, encode
+except (ImportError, ValueError):
+    from cards import CARD_NAMES, HARD_CARD_VALUES, IS_ACE, encode
+
+# Value of a hand with at least one Ace, by hard total, when an Ace can count as 1 or 11.  Only one Ace can ever be
+# counted as 11 without going over 21, so the hard total is enough.
+MAX_HARD_TOTAL = 64
+SOFT_HAND_VALUES = [hard + 10 if hard <= 11 else hard for hard in range(MAX_HARD_TOTAL)]
+
+
+def hand_value(hard, aces, allow_soft_limit=True):
+    """Returns the value of a hand from its hard total and number of Aces.
+    If allow_soft_limit is set, Ace is calculated with 1 or 11, which ever is favorable to reach 21, else always 11
+    """
+    if not aces:
+        return hard
+    if allow_soft_limit:
+        return SOFT_HAND_VALUES[hard] if hard < MAX_HARD_TOTAL else hard
+    return hard + 10 * aces
+
+
+class Hand(object):
+    """Cards with their hard total and number of Aces.
+    Reads like the list of (face, suit) cards it replaces: len(), iteration, indexing and printing give (face, suit).
+    """
+    __slots__ = ('cards', 'hard', 'aces')
+
+    def __init__(self, cards=()):
+        self.cards = bytearray()
+        self.hard = 0
+        self.aces = 0
+        for card in cards:
+            self.append(card)
+
+    def add(self, card):
+        """Returns None.  Adds the card, given as an int, to the hand"""
+        self.cards.append(card)
+        self.hard += HARD_CARD_VALUES[card]
+        self.aces += IS_ACE[card]
+
+    def append(self, card):
+        """Returns None.  Adds the card, given as an int or a (face, suit) tuple, to the hand"""
+        self.add(encode(card))
+
+    def extend(self, cards):
+        """Returns None.  Adds the cards to the hand"""
+        for card in cards:
+            self.append(card)
+
+    def clear(self):
+        """Returns None.  Removes every card, the hand is empty again"""
+        del self.cards[:]
+        self.hard = 0
+        self.aces = 0
+
+    def pop(self, index=-1):
+        """Returns the (face, suit) card after removing it from the hand"""
+        card = self.cards.pop(index)
+        self.hard -= HARD_CARD_VALUES[card]
+        self.aces -= IS_ACE[card]
+        return CARD_NAMES[card]
+
+    def value(self, allow_soft_limit=True):
+        """Returns the hand value"""
+        return hand_value(self.hard, self.aces, allow_soft_limit)
+
+    def is_soft(self):
+        """Returns True when an Ace is counted as 11 in the hand value"""
+        return self.aces > 0 and self.hard <= 11
+
+    def __len__(self):
+        return len(self.cards)
+
+    def __iter__(self):
+        return (CARD_NAMES[card] for card in self.cards)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [CARD_NAMES[card] for card in self.cards[index]]
+        return CARD_NAMES[self.cards[index]]
+
+    def __repr__(self):
+        return repr(list(self))
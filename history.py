@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+"""
+Hand history log: every round played, in a compact binary file.
+
+A file is a header followed by fixed width records, one per round.  A record holds the rules and wagers, the cards
+dealt in order with who they were dealt to, the actions played, the result of each hand and the wager earned.
+The header holds the format VERSION, which changes with the record layout: files of older versions are not read.
+
+HistoryWriter buffers records and appends them to the file in batches.  HistoryReader memory maps the file, so any
+record can be read by index without loading the file.  replay deals a record's cards again and plays its actions
+to rebuild the BlackJack game.
+
+Record games with BlackJack(record=True), or play a batch with record_games.
+"""
+from __future__ import print_function
+import mmap
+import os
+import struct
+from collections import Counter
+try:
+    from .blackjack import BlackJack, DEALER, HIT, STAND, DOUBLE_DOWN, SPLIT, SURRENDER, INSURANCE
+    from .rules import MAX_HANDS, RuleSet
+    from .shoe import Shoe, EVERY_ROUND
+    from .shufflers import StackedShuffler
+except (ImportError, ValueError):
+    from blackjack import BlackJack, DEALER, HIT, STAND, DOUBLE_DOWN, SPLIT, SURRENDER, INSURANCE
+    from rules import MAX_HANDS, RuleSet
+    from shoe import Shoe, EVERY_ROUND
+    from shufflers import StackedShuffler
+
+MAGIC = b'BJHIST'
+VERSION = 3
+MAX_CARDS = 48
+MAX_ACTIONS = 48
+ACTIONS = (None, HIT, STAND, DOUBLE_DOWN, SPLIT, SURRENDER, INSURANCE)  # Action by code
+RESULTS = (None, 'blackjack', 'won', 'lost', 'bust', 'push', 'surrender')  # Result by code
+DEALER_OWNER = 15  # Owner nibble of the Dealer's cards
+
+# Wager, max wager, wager earned, BlackJack payout, dealer_min, rule flags, max hands, cards, actions, hands, results,
+# cards, owners, actions
+RECORD = struct.Struct('<ddddBBBBBB%ds%ds%ds%ds' % (MAX_HANDS, MAX_CARDS, MAX_CARDS // 2, MAX_ACTIONS))
+HEADER = struct.Struct('<%dsHH' % len(MAGIC))  # Magic, version, record size
+
+# Rule flags
+SOFT_LIMIT, SPLIT_ALLOWED, DD_ALLOWED, DD_AFTER_SPLIT, LAZY_DEALER, HITS_SOFT_17 = 1, 2, 4, 8, 16, 32
+SURRENDER_ALLOWED, INSURANCE_ALLOWED = 64, 128
+
+
+class RoundRecord(object):
+    """One round read from a history file"""
+    __slots__ = ('wager', 'max_wager', 'wager_earned', 'blackjack_payout', 'dealer_min', 'dealer_hits_soft_17',
+                 'allow_soft_limit', 'allow_split', 'allow_dd', 'allow_dd_after_split', 'max_hands', 'allow_surrender',
+                 'allow_insurance', 'lazy_dealer', 'cards', 'actions', 'results')
+
+    def dealer_cards(self):
+        """Returns the Dealer's cards, as ints, in the order drawn"""
+        return [card for owner, card in self.cards if owner == DEALER]
+
+    def player_cards(self, hand_idx=0):
+        """Returns the cards of a Player hand, as ints, in the order drawn.  A split hand starts with its split card"""
+        hands = []
+        last_owner = None
+        for owner, card in self.cards:
+            if owner == DEALER:
+                continue
+            if owner < len(hands):
+                hands[owner].append(card)
+            elif not hands:
+                hands.append([card])
+            else:
+                # A split: the hand dealt the card before lost its second card to this new hand
+                split_hand = hands[last_owner]
+                hands.append([split_hand.pop(1), card])
+            last_owner = owner
+        return hands[hand_idx]
+
+    def __repr__(self):
+        return '<RoundRecord wager=%s results=%r wager_earned=%s>' % (self.wager, self.results, self.wager_earned)
+
+
+def pack_record(game):
+    """Returns the bytes of the record of a game played with record=True"""
+    history = game.history
+    if history is None:
+        raise ValueError('Game was not recorded, create it with BlackJack(record=True)')
+    if len(history.cards) > MAX_CARDS or len(history.actions) > MAX_ACTIONS or len(game.players) > MAX_HANDS:
+        raise ValueError('Round is too long for a history record')
+    flags = (SOFT_LIMIT if game.allow_soft_limit else 0) | (SPLIT_ALLOWED if history.allow_split else 0) | \
+        (DD_ALLOWED if history.allow_dd else 0) | (DD_AFTER_SPLIT if game.allow_dd_after_split else 0) | \
+        (LAZY_DEALER if game.lazy_dealer else 0) | (HITS_SOFT_17 if game.rules.dealer_hits_soft_17 else 0) | \
+        (SURRENDER_ALLOWED if game.rules.allow_surrender else 0) | \
+        (INSURANCE_ALLOWED if game.rules.allow_insurance else 0)
+    owners = [DEALER_OWNER if owner == DEALER else owner for owner, card in history.cards]
+    if len(owners) % 2:
+        owners.append(0)
+    return RECORD.pack(
+        history.wager, game.max_wager, game.wager_earned, game.rules.blackjack_payout, game.dealer_min, flags,
+        game.rules.max_hands, len(history.cards), len(history.actions), len(game.players),
+        bytes(bytearray(RESULTS.index(player.result) for player in game.players)),
+        bytes(bytearray(card for owner, card in history.cards)),
+        bytes(bytearray(owners[i] | owners[i + 1] << 4 for i in range(0, len(owners), 2))),
+        bytes(bytearray(ACTIONS.index(action) | hand_idx << 4 for action, hand_idx in history.actions)))
+
+
+def unpack_record(data, offset=0):
+    """Returns the RoundRecord in data at offset"""
+    wager, max_wager, wager_earned, blackjack_payout, dealer_min, flags, max_hands, n_cards, n_actions, n_hands, \
+        results, cards, owners, actions = RECORD.unpack_from(data, offset)
+    record = RoundRecord()
+    record.wager = wager
+    record.max_wager = max_wager
+    record.wager_earned = wager_earned
+    record.blackjack_payout = blackjack_payout
+    record.dealer_min = dealer_min
+    record.dealer_hits_soft_17 = bool(flags & HITS_SOFT_17)
+    record.allow_soft_limit = bool(flags & SOFT_LIMIT)
+    record.allow_split = bool(flags & SPLIT_ALLOWED)
+    record.allow_dd = bool(flags & DD_ALLOWED)
+    record.allow_dd_after_split = bool(flags & DD_AFTER_SPLIT)
+    record.max_hands = max_hands
+    record.allow_surrender = bool(flags & SURRENDER_ALLOWED)
+    record.allow_insurance = bool(flags & INSURANCE_ALLOWED)
+    record.lazy_dealer = bool(flags & LAZY_DEALER)
+    owners = bytearray(owners)
+    record.cards = []
+    for i, card in enumerate(bytearray(cards)[:n_cards]):
+        owner = owners[i // 2] >> 4 * (i % 2) & 15
+        record.cards.append((DEALER if owner == DEALER_OWNER else owner, card))
+    record.actions = [(ACTIONS[code & 15], code >> 4) for code in bytearray(actions)[:n_actions]]
+    record.results = [RESULTS[code] for code in bytearray(results)[:n_hands]]
+    return record
+
+
+class HistoryWriter(object):
+    """Appends round records to a history file, batch records at a time"""
+
+    def __init__(self, path, batch=4096):
+        self.path = path
+        self.batch = batch
+        if os.path.exists(path) and os.path.getsize(path):
+            _check_header(path)  # Before opening, so a file that's not read is not left open
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+        self.buffer = bytearray()
+        self.pending = 0
+
+    def write(self, game):
+        """Returns None.  Adds the record of a game played with record=True"""
+        self.buffer += pack_record(game)
+        self.pending += 1
+        if self.pending >= self.batch:
+            self.flush()
+
+    def flush(self):
+        """Returns None.  Writes the buffered records to the file"""
+        if self.buffer:
+            self.file.write(self.buffer)
+            self.buffer = bytearray()
+            self.pending = 0
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _check_header(path):
+    with open(path, 'rb') as history_file:
+        header = history_file.read(HEADER.size)
+    if len(header) < HEADER.size or HEADER.unpack(header)[0] != MAGIC:
+        raise ValueError('%s is not a hand history file' % path)
+    if HEADER.unpack(header) != (MAGIC, VERSION, RECORD.size):
+        raise ValueError('%s is a version %d hand history file, only version %d is read'
+                         % (path, HEADER.unpack(header)[1], VERSION))
+
+
+class HistoryReader(object):
+    """Reads round records from a memory mapped history file.  Supports len(), indexing and iteration"""
+
+    def __init__(self, path):
+        _check_header(path)
+        self.file = open(path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        self.records = (size - HEADER.size) // RECORD.size
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return self.records
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.records
+        if not 0 <= index < self.records:
+            raise IndexError('Record %d out of range' % index)
+        return unpack_record(self.data, HEADER.size + index * RECORD.size)
+
+    def __iter__(self):
+        for index in range(self.records):
+            yield unpack_record(self.data, HEADER.size + index * RECORD.size)
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def replay(record):
+    """Returns the BlackJack game rebuilt by dealing the record's cards and playing its actions"""
+    copies = Counter(card for owner, card in record.cards)
+    decks = max(copies.values()) if copies else 1  # Enough decks for cards dealt more than once from a shoe
+    shoe = Shoe(decks=decks, reshuffle=EVERY_ROUND,
+                shuffler=StackedShuffler([[card for owner, card in record.cards]]))
+    rules = RuleSet(decks, record.blackjack_payout, record.dealer_min, record.dealer_hits_soft_17,
+                    record.allow_soft_limit, record.allow_split, record.allow_dd, record.allow_dd_after_split,
+                    record.max_hands, record.allow_surrender, record.allow_insurance)
+    game = BlackJack(wager=record.wager, max_wager=record.max_wager, shoe=shoe, record=True,
+                     lazy_dealer=record.lazy_dealer, rules=rules)
+    for action, hand_idx in record.actions:
+        getattr(game, action)(hand_idx)
+    return game
+
+
+def record_games(path, rounds, policy, shoe=None, **rules):
+    """Returns the total wager earned after playing rounds of BlackJack with policy and recording them to path.
+    rules are the BlackJack rule arguments.  The rounds are dealt from shoe, by default a new 6 deck Shoe.
+    """
+    try:  # Imported here, as the simulator is slow to import and only recording needs it
+        from .simulation import play_game
+    except (ImportError, ValueError):
+        from simulation import play_game
+    if shoe is None:
+        shoe = Shoe(decks=6)
+    earned = 0
+    with HistoryWriter(path) as writer:
+        for _ in range(rounds):
+            game = BlackJack(shoe=shoe, record=True, **rules)
+            earned += play_game(game, policy)
+            writer.write(game)
+    return earned
@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+"""
+Opt-in counters and timings of the game hot paths, to see where the time goes without a profiler.
+
+    from blackjack import BlackJack
+    instruments = BlackJack.instrument(timings=True)
+    ...play...
+    print(format_snapshot(instruments.snapshot()))
+
+Counters: cards drawn (and how many by the Dealer in stand), hand evaluations, reshuffles, splits and double downs.
+Timings: histograms of the time spent in hit, stand and building a BlackJack game.
+
+Enabling wraps the BlackJack and Shoe methods with counting versions, and disabling puts the original methods
+back, so there is no cost at all while disabled.  The Simulator does not call these methods, it adds its totals per
+run (rounds, hands, splits, reshuffles) when instrumentation is enabled.
+
+Set CARD_GAMES_INSTRUMENT to a file name (or - for stderr) to enable instrumentation in simulation.py and
+play_blackjack.py and dump the snapshot as JSON at exit.
+"""
+from __future__ import print_function, division
+import atexit
+import functools
+import os
+import sys
+import timeit
+try:
+    from .blackjack import BlackJack
+    from .shoe import Shoe
+except (ImportError, ValueError):
+    from blackjack import BlackJack
+    from shoe import Shoe
+
+timer = timeit.default_timer
+ENVIRONMENT_VARIABLE = 'CARD_GAMES_INSTRUMENT'
+COUNTERS = ('cards_drawn', 'dealer_draws', 'hand_evaluations', 'reshuffles', 'splits', 'double_downs')
+TIMINGS = ('construct', 'hit', 'stand')
+
+
+class Histogram(object):
+    """Durations counted in buckets doubling in size from 1 microsecond, with their count, total and max"""
+    BUCKETS = 24  # Up to 2 ** 23 microseconds, about 8 seconds, then an overflow bucket
+
+    def __init__(self):
+        self.buckets = [0] * (self.BUCKETS + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        """Returns None.  Counts a duration"""
+        microseconds = seconds * 1e6
+        bucket = 0
+        bound = 1.0
+        while microseconds > bound and bucket < self.BUCKETS:
+            bound *= 2
+            bucket += 1
+        self.buckets[bucket] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction):
+        """Returns the upper bound, in microseconds, of the bucket holding the fraction percentile"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                return min(2.0 ** bucket, self.max * 1e6)
+        return self.max * 1e6
+
+    def snapshot(self):
+        """Returns the histogram as a JSON-ready dict, times in microseconds"""
+        return {
+            'count': self.count,
+            'mean_us': self.total * 1e6 / self.count if self.count else 0.0,
+            'max_us': self.max * 1e6,
+            'p50_us': self.percentile(0.5),
+            'p90_us': self.percentile(0.9),
+            'p99_us': self.percentile(0.99),
+            'buckets_us': dict(('<=%d' % 2 ** bucket if bucket < self.BUCKETS else '>%d' % 2 ** (bucket - 1), count)
+                               for bucket, count in enumerate(self.buckets) if count),
+        }
+
+
+class Instrumentation(object):
+    """Counters and timing histograms, with the methods wrapped to keep them while enabled"""
+
+    def __init__(self):
+        self.enabled = False
+        self.timings_enabled = False
+        self.counters = dict((name, 0) for name in COUNTERS)
+        self.timings = dict((name, Histogram()) for name in TIMINGS)
+        self._originals = []  # (class, name, method) to put back on disable
+
+    def count(self, name, number=1):
+        """Returns None.  Adds number to a counter, new counter names are created as needed"""
+        self.counters[name] = self.counters.get(name, 0) + number
+
+    def snapshot(self):
+        """Returns the counters and the timings as a JSON-ready dict"""
+        return {
+            'counters': dict(self.counters),
+            'timings': dict((name, histogram.snapshot()) for name, histogram in self.timings.items()
+                            if histogram.count),
+        }
+
+    def reset(self):
+        """Returns None.  Sets the counters and timings back to 0"""
+        self.counters = dict((name, 0) for name in COUNTERS)
+        self.timings = dict((name, Histogram()) for name in TIMINGS)
+
+    def enable(self, timings=False):
+        """Returns self after wrapping the BlackJack and Shoe methods to count, and with timings also to time"""
+        if self.enabled:
+            self.disable()
+        counters = self.counters
+        for name, wrapper in self._wrappers(timings):
+            cls = Shoe if name == 'shuffle' else BlackJack
+            method = cls.__dict__[name]
+            self._originals.append((cls, name, method))
+            setattr(cls, name, functools.wraps(method)(wrapper(method)))
+        self.enabled = True
+        self.timings_enabled = timings
+        return self
+
+    def disable(self):
+        """Returns self after putting the original methods back"""
+        while self._originals:
+            cls, name, method = self._originals.pop()
+            setattr(cls, name, method)
+        self.enabled = False
+        self.timings_enabled = False
+        return self
+
+    def _wrappers(self, timings):
+        """Returns (method name, function of the method returning its wrapper) for every method to wrap"""
+        instruments = self
+
+        def pick_card(method):
+            def _pick_card(game, *args, **kwargs):
+                instruments.counters['cards_drawn'] += 1
+                return method(game, *args, **kwargs)
+            return _pick_card
+
+        def hand_value(method):
+            def wrapper(game, *args, **kwargs):
+                instruments.counters['hand_evaluations'] += 1
+                return method(game, *args, **kwargs)
+            return wrapper
+
+        def stand_draws(method):
+            def _stand(game, *args, **kwargs):
+                dealer_cards = len(game.dealer_hand)
+                method(game, *args, **kwargs)
+                instruments.counters['dealer_draws'] += len(game.dealer_hand) - dealer_cards
+            return _stand
+
+        def succeeded(counter):
+            def counting(method):
+                def wrapper(game, *args, **kwargs):
+                    result = method(game, *args, **kwargs)
+                    if result:
+                        instruments.counters[counter] += 1
+                    return result
+                return wrapper
+            return counting
+
+        def shuffle(method):
+            def wrapper(shoe, *args, **kwargs):
+                instruments.counters['reshuffles'] += 1
+                return method(shoe, *args, **kwargs)
+            return wrapper
+
+        def timed(timing):
+            def timing_method(method):
+                def wrapper(*args, **kwargs):
+                    start = timer()
+                    try:
+                        return method(*args, **kwargs)
+                    finally:
+                        instruments.timings[timing].add(timer() - start)
+                return wrapper
+            return timing_method
+
+        wrappers = [
+            ('_pick_card', pick_card),
+            ('_get_hand_value', hand_value),
+            ('player_hand_value', hand_value),
+            ('dealer_hand_value', hand_value),
+            ('_stand', stand_draws),
+            ('split', succeeded('splits')),
+            ('double_down', succeeded('double_downs')),
+            ('shuffle', shuffle),
+        ]
+        if timings:
+            wrappers += [('__init__', timed('construct')), ('hit', timed('hit')), ('stand', timed('stand'))]
+        return wrappers
+
+    def export(self, path='-'):
+        """Returns None.  Writes the snapshot as JSON to the file at path, or to stderr for -"""
+        import json  # Imported here, as the json module and its re dependency are slow to import
+        text = json.dumps(self.snapshot(), indent=2, sort_keys=True)
+        if path == '-':
+            print(text, file=sys.stderr)
+        else:
+            with open(path, 'w') as export_file:
+                export_file.write(text + '\n')
+
+    def dump_at_exit(self, path='-'):
+        """Returns None.  Exports the snapshot to path when the program exits"""
+        atexit.register(self.export, path)
+
+
+INSTRUMENTATION = Instrumentation()  # The instruments of this process
+
+
+def format_snapshot(snapshot):
+    """Returns a snapshot as text, one line per counter and per timing"""
+    lines = ['%-18s %12d' % (name, value) for name, value in sorted(snapshot['counters'].items())]
+    for name, timing in sorted(snapshot['timings'].items()):
+        lines.append('%-18s %12d calls  mean %.2fus  p50 %.0fus  p90 %.0fus  p99 %.0fus  max %.0fus' % (
+            name, timing['count'], timing['mean_us'], timing['p50_us'], timing['p90_us'], timing['p99_us'],
+            timing['max_us']))
+    return '\n'.join(lines)
+
+
+def enable_from_environment():
+    """Returns the Instrumentation, enabled with timings and dumped at exit when CARD_GAMES_INSTRUMENT is set,
+    else None.  CARD_GAMES_INSTRUMENT is the file to dump the snapshot to, or - for stderr.
+    """
+    path = os.environ.get(ENVIRONMENT_VARIABLE)
+    if not path:
+        return None
+    INSTRUMENTATION.enable(timings=True)
+    INSTRUMENTATION.dump_at_exit(path)
+    return INSTRUMENTATION
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Load generator for the BlackJack game server.
+
+Run from command line against a running server.py: python load_client.py [sessions] [rounds] [port or socket path]
+
+Opens sessions connections at once, each playing rounds with a simulation policy, and reports the sessions, actions
+and rounds per second the server kept up with.
+"""
+import asyncio
+import json
+import sys
+import time
+try:
+    from .blackjack import HIT, STAND, DOUBLE_DOWN, SPLIT
+    from .simulation import mimic_dealer
+except (ImportError, ValueError):
+    from blackjack import HIT, STAND, DOUBLE_DOWN, SPLIT
+    from simulation import mimic_dealer
+
+
+class LoadResult(object):
+    """Totals of a load test"""
+
+    def __init__(self):
+        self.sessions = 0
+        self.rounds = 0
+        self.actions = 0  # Requests sent, deals included
+        self.errors = 0
+        self.elapsed = 0.0
+
+    @property
+    def sessions_per_second(self):
+        return self.sessions / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def actions_per_second(self):
+        return self.actions / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def rounds_per_second(self):
+        return self.rounds / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self):
+        return '<LoadResult sessions=%d rounds=%d actions=%d errors=%d elapsed=%.2fs actions/sec=%d>' % (
+            self.sessions, self.rounds, self.actions, self.errors, self.elapsed, self.actions_per_second)
+
+
+def choose_action(state, policy):
+    """Returns the request for the next action of the round in state, played with policy"""
+    hands = state['hands']
+    for hand_idx, hand in enumerate(hands):
+        if hand['active']:
+            action = policy(hand['value'], hand['soft'], hand['pair'], state['upcard'], hand['can_double'],
+                            hand['can_split'])
+            if action not in (HIT, STAND, DOUBLE_DOWN, SPLIT):
+                raise ValueError('Unknown action from policy: %r' % (action,))
+            return {'action': action, 'hand': hand_idx}
+
+
+async def play_session(rounds, policy=mimic_dealer, host='127.0.0.1', port=8021, path=None, wager=1, result=None):
+    """Returns the LoadResult after playing rounds in one session (fewer if the chips run out)"""
+    if result is None:
+        result = LoadResult()
+    if path is not None:
+        reader, writer = await asyncio.open_unix_connection(path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+
+    async def send(request):
+        writer.write(json.dumps(request).encode('utf-8') + b'\n')
+        result.actions += 1
+        response = json.loads((await reader.readline()).decode('utf-8'))
+        if 'error' in response:
+            result.errors += 1
+        return response
+
+    try:
+        state = json.loads((await reader.readline()).decode('utf-8'))
+        for _ in range(rounds):
+            if state['chips'] < wager:
+                break
+            state = await send({'action': 'deal', 'wager': wager})
+            while state.get('in_play'):
+                state = await send(choose_action(state, policy))
+            result.rounds += 1
+        result.sessions += 1
+        writer.write(b'{"action": "quit"}\n')
+        await writer.drain()
+    finally:
+        writer.close()
+    return result
+
+
+async def load_test(sessions, rounds, policy=mimic_dealer, host='127.0.0.1', port=8021, path=None, concurrency=None):
+    """Returns the LoadResult of sessions playing rounds each, with at most concurrency connections open at once"""
+    result = LoadResult()
+    limit = asyncio.Semaphore(concurrency or sessions)
+
+    async def limited_session():
+        async with limit:
+            await play_session(rounds, policy, host, port, path, result=result)
+
+    start = time.time()
+    await asyncio.gather(*[limited_session() for _ in range(sessions)])
+    result.elapsed = time.time() - start
+    return result
+
+
+if __name__ == '__main__':
+    """Entry point of the program when run via command line"""
+    sessions = int(sys.argv[1]) if len(sys.argv) >= 2 else 1000
+    rounds = int(sys.argv[2]) if len(sys.argv) >= 3 else 10
+    address = sys.argv[3] if len(sys.argv) >= 4 else '8021'
+    if address.isdigit():
+        stats = asyncio.run(load_test(sessions, rounds, port=int(address)))
+    else:
+        stats = asyncio.run(load_test(sessions, rounds, path=address))
+    print(stats)
+    print('%d sessions/sec, %d actions/sec, %d rounds/sec' % (
+        stats.sessions_per_second, stats.actions_per_second, stats.rounds_per_second))
@@ -1,10 +1,15 @@
 #!/usr/bin/env python
 """
-Play blackjack, by running the program via command line: python play_blackjack.py
+Play blackjack, by running the program via command line: python play_blackjack.py [credits] [history file]
 """
 from __future__ import print_function
 import sys
-from blackjack import BlackJack
+try:
+    from .blackjack import BlackJack
+    from .instrumentation import enable_from_environment
+except (ImportError, ValueError):
+    from blackjack import BlackJack
+    from instrumentation import enable_from_environment
 
 # To get this program to work with both Python 2 and Python 3, input is assigned raw_input when running in Python 2
 try:
@@ -14,9 +19,11 @@ except (ImportError, AttributeError):
     pass
 
 
-def play_blackjack(wager, max_wager):
-    """Returns the game result and wage Earned. Plays One Round of BlackJack"""
-    game = BlackJack(wager=wager, max_wager=max_wager, allow_split=True, allow_dd=True)
+def play_blackjack(wager, max_wager, history_writer=None):
+    """Returns the game result and wage Earned. Plays One Round of BlackJack
+    The round is recorded with history_writer, a history.HistoryWriter, when given.
+    """
+    game = BlackJack(wager=wager, max_wager=max_wager, allow_split=True, allow_dd=True, record=history_writer is not None)
     player = game.players[0]
     print('\nYour Hand %s has %s points.  Your wager is: %d' % (player['hand'], game.player_hand_value(), player['wager']))
     print("Dealer's upcard is: ", game.get_dealer_upcard())
@@ -48,6 +55,8 @@ def play_blackjack(wager, max_wager):
         print("Dealer's Final Hand %s is of value %d" % (game.dealer_hand, game.dealer_hand_value()))
         print('Result: ', game.players[hand_idx]['result'])
         results.append(game.players[hand_idx]['result'])
+    if history_writer is not None:
+        history_writer.write(game)
     return results, game.wager_earned
 
 
@@ -97,10 +106,12 @@ def _initialize_game(wager_credits):
     player['lost'] = 0
     player['push'] = 0
     player['bust'] = 0
+    player['surrender'] = 0
     return player
 
 if __name__ == '__main__':
     """Entry point of the program when run via command line"""
+    enable_from_environment()  # Dumps counters and timings at exit when CARD_GAMES_INSTRUMENT is set
     # Get the wager credits provided in run argument
     wager_credits = 100
     if len(sys.argv) >= 2:
@@ -108,6 +119,14 @@ if __name__ == '__main__':
             wager_credits = int(sys.argv[1])
         except:
             print('Could not convert the Wager Credits provided: %s into a number. Default credit of 100 provided.' % sys.argv[1])
+    # Record every round to the hand history file, when one is given
+    history_writer = None
+    if len(sys.argv) >= 3:
+        try:  # Imported here, only a game recorded to a history file needs it
+            from .history import HistoryWriter
+        except (ImportError, ValueError):
+            from history import HistoryWriter
+        history_writer = HistoryWriter(sys.argv[2])
     # Now, initailize the game and start the rounds
     player = _initialize_game(wager_credits)
     print('Welcome to BlackJack')
@@ -121,7 +140,7 @@ if __name__ == '__main__':
         if play == 'Y':
             wager = get_wager_input(player['chips'])
             player['round'] += 1
-            results, wager = play_blackjack(wager, player['chips'])
+            results, wager = play_blackjack(wager, player['chips'], history_writer)
             player['chips'] += wager
             for result in results:  # Could be two hands with Split
                 player[result] += 1
@@ -129,4 +148,6 @@ if __name__ == '__main__':
     print('-' * 13)
     print('Your Final Wager Credits: ', player['chips'])
     print('Your results: %d blackjack, %d won, %d lost, %d bust, %d push' % (player['blackjack'], player['won'], player['lost'], player['bust'], player['push']))
+    if history_writer is not None:
+        history_writer.close()
     print('Thanks for playing BlackJack.')
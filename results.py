@@ -0,0 +1,377 @@
+#!/usr/bin/env python
+"""
+Round results as columns, for studies too large to keep a Python object per round.
+
+ResultColumns holds one row per Player hand in typed arrays, one array per column (see COLUMNS): the round and seat,
+the hand, the opening two cards and the Dealer's up card, the actions played on the hand, the final Player and Dealer
+totals, the result, the opening wager, the wager earned and the rules.  Cards are values 2 to 11 (Ace is 11).  The
+first hand of a round also has the insurance in its wager earned, so the wager earned of a round is the sum over its
+hands.  Pass one to Simulator.run or simulate_table to add the rounds they play.
+
+ResultsWriter is a ResultColumns that appends its rows to a column file in chunks of chunk_rows, so memory stays
+the same however many rounds are played.  A chunk is the raw bytes of each column, little endian, after the rule
+sets seen so far as JSON.  read_results loads a file back into one ResultColumns, iter_chunks a chunk at a time, and
+write_csv exports columns to CSV.
+
+aggregate groups the rounds by columns of the round (up card, opening total, rules...) into a SimulationResult per
+group, in one vectorized pass over the columns with NumPy, or one loop over them without it.
+"""
+from __future__ import print_function, division
+import csv
+import os
+import struct
+import sys
+from array import array
+try:
+    from .blackjack import HIT, DOUBLE_DOWN, SPLIT, SURRENDER, INSURANCE
+    from .hand import hand_value
+    from .rules import FIELDS, RuleSet
+except (ImportError, ValueError):
+    from blackjack import HIT, DOUBLE_DOWN, SPLIT, SURRENDER, INSURANCE
+    from hand import hand_value
+    from rules import FIELDS, RuleSet
+
+MAGIC = b'BJCOLS'
+VERSION = 1
+HEADER = struct.Struct('<%dsHH' % len(MAGIC))  # Magic, version, number of columns
+CHUNK = struct.Struct('<II')  # Rows, bytes of the rule sets JSON
+COLUMNS = (('round', 'I'), ('seat', 'B'), ('hand', 'B'), ('first', 'B'), ('second', 'B'), ('upcard', 'B'),
+           ('total', 'B'), ('soft', 'B'), ('actions', 'B'), ('player_total', 'B'), ('dealer_total', 'B'),
+           ('result', 'B'), ('rules', 'H'), ('wager', 'd'), ('wager_earned', 'd'))  # Name and array typecode
+COLUMN_NAMES = tuple(name for name, typecode in COLUMNS)
+ROW_SIZE = sum(array(typecode).itemsize for name, typecode in COLUMNS)  # Bytes of a row across the columns of a chunk
+# Columns with the same value for every hand of a round, which aggregate can group the rounds by
+ROUND_COLUMNS = ('seat', 'first', 'second', 'upcard', 'total', 'soft', 'dealer_total', 'rules', 'wager')
+RESULTS = ('blackjack', 'won', 'lost', 'bust', 'push', 'surrender')  # Result by code
+HIT_FLAG, DOUBLE_DOWN_FLAG, SPLIT_FLAG, SURRENDER_FLAG, INSURANCE_FLAG = 1, 2, 4, 8, 16  # Bits of the actions column
+ACTION_FLAGS = {HIT: HIT_FLAG, DOUBLE_DOWN: DOUBLE_DOWN_FLAG, SPLIT: SPLIT_FLAG, SURRENDER: SURRENDER_FLAG,
+                INSURANCE: INSURANCE_FLAG}
+
+
+def action_names(flags):
+    """Returns the names of the actions in the flags of the actions column"""
+    return [action for action in (INSURANCE, SURRENDER, SPLIT, DOUBLE_DOWN, HIT) if flags & ACTION_FLAGS[action]]
+
+
+class ResultColumns(object):
+    """Rows of hand results kept as one array per column.  len() is the number of rows"""
+
+    def __init__(self):
+        self.columns = dict((name, array(typecode)) for name, typecode in COLUMNS)
+        self.rule_sets = []  # RuleSet by code of the rules column
+        self.rule_codes = {}
+        self.round = -1  # Number of the round rows are added to, across flushes for a ResultsWriter
+        self._append = [self.columns[name].append for name in COLUMN_NAMES]
+
+    def __len__(self):
+        return len(self.columns['round'])
+
+    def __getitem__(self, name):
+        """Returns the array of a column"""
+        return self.columns[name]
+
+    def rules_code(self, rules):
+        """Returns the code of a RuleSet in the rules column"""
+        code = self.rule_codes.get(rules)
+        if code is None:
+            code = self.rule_codes[rules] = len(self.rule_sets)
+            self.rule_sets.append(rules)
+        return code
+
+    def new_round(self):
+        """Returns None.  The rows added next are for a new round"""
+        self.round += 1
+
+    def add(self, seat, hand, first, second, upcard, actions, player_total, dealer_total, result, wager,
+            wager_earned, rules_code):
+        """Returns None.  Adds the row of a finished hand of the round.  first and second are the opening cards of
+        the seat, actions the ACTION_FLAGS of the actions played on the hand and result one of RESULTS
+        """
+        hard = (first if first != 11 else 1) + (second if second != 11 else 1)
+        aces = (first == 11) + (second == 11)
+        row = (self.round, seat, hand, first, second, upcard, hand_value(hard, aces), aces > 0 and hard <= 11, actions,
+               player_total, dealer_total, RESULTS.index(result), rules_code, wager, wager_earned)
+        for append, value in zip(self._append, row):
+            append(value)
+
+    def clear(self):
+        """Returns None.  Drops the rows, the round numbers and rule codes carry on"""
+        for name, typecode in COLUMNS:
+            del self.columns[name][:]
+
+
+class ResultsWriter(ResultColumns):
+    """ResultColumns that appends its rows to a column file, a chunk of chunk_rows at a time"""
+
+    def __init__(self, path, chunk_rows=65536):
+        ResultColumns.__init__(self)
+        self.path = path
+        self.chunk_rows = chunk_rows
+        if os.path.exists(path) and os.path.getsize(path):
+            # Carry on the round numbers and rule codes of the file, the last chunk has them
+            rule_sets, self.round = _last_chunk(path)
+            for rules in rule_sets:
+                self.rules_code(rules)
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(HEADER.pack(MAGIC, VERSION, len(COLUMNS)))
+
+    def new_round(self):
+        if len(self) >= self.chunk_rows:  # Only between rounds, so a round is never split across chunks
+            self.flush()
+        ResultColumns.new_round(self)
+
+    def flush(self):
+        """Returns None.  Writes the rows kept so far to the file as a chunk"""
+        if len(self):
+            import json  # Imported here, as the json module and its re dependency are slow to import
+            rule_sets = json.dumps([rules.as_dict() for rules in self.rule_sets], sort_keys=True).encode('utf-8')
+            self.file.write(CHUNK.pack(len(self), len(rule_sets)))
+            self.file.write(rule_sets)
+            for name in COLUMN_NAMES:
+                column = self.columns[name]
+                if sys.byteorder == 'big':
+                    column = array(column.typecode, column)
+                    column.byteswap()
+                self.file.write(column.tostring() if sys.version_info[0] < 3 else column.tobytes())
+            self.clear()
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _check_header(path):
+    with open(path, 'rb') as results_file:
+        header = results_file.read(HEADER.size)
+    if len(header) < HEADER.size or HEADER.unpack(header) != (MAGIC, VERSION, len(COLUMNS)):
+        raise ValueError('%s is not a version %d results column file' % (path, VERSION))
+
+
+def _rule_sets(data):
+    """Returns the RuleSets of the rule sets JSON of a chunk"""
+    import json  # Imported here, as the json module and its re dependency are slow to import
+    return [RuleSet(**dict((name, rules[name]) for name in FIELDS)) for rules in json.loads(data.decode('utf-8'))]
+
+
+def _read_column(column, data):
+    """Returns None.  Adds the little endian bytes of a chunk's column to the array"""
+    if sys.version_info[0] < 3:
+        column.fromstring(data)
+    else:
+        column.frombytes(data)
+    if sys.byteorder == 'big':
+        column.byteswap()
+
+
+def _last_chunk(path):
+    """Returns the rule sets and the last round of a column file, (RuleSets, -1) without chunks.
+    Only the chunk headers are read, the columns of every chunk are skipped, then the last round is read from the end
+    of the round column of the last chunk.
+    """
+    _check_header(path)
+    size = os.path.getsize(path)
+    with open(path, 'rb') as results_file:
+        position = HEADER.size
+        last = None
+        while position < size:
+            results_file.seek(position)
+            data = results_file.read(CHUNK.size)
+            if len(data) < CHUNK.size:
+                raise ValueError('%s ends in the middle of a chunk' % path)
+            rows, rules_size = CHUNK.unpack(data)
+            last = (position + CHUNK.size, rows, rules_size)
+            position += CHUNK.size + rules_size + rows * ROW_SIZE
+        if position > size:
+            raise ValueError('%s ends in the middle of a chunk' % path)
+        if last is None:
+            return [], -1
+        start, rows, rules_size = last
+        results_file.seek(start)
+        rule_sets = _rule_sets(results_file.read(rules_size))
+        if not rows:
+            return rule_sets, -1
+        rounds = array(COLUMNS[0][1])  # The round column comes first
+        results_file.seek(start + rules_size + (rows - 1) * rounds.itemsize)
+        _read_column(rounds, results_file.read(rounds.itemsize))
+    return rule_sets, rounds[0]
+
+
+def iter_chunks(path):
+    """Yields the chunks of a column file as ResultColumns, in the order written"""
+    _check_header(path)
+    with open(path, 'rb') as results_file:
+        results_file.seek(HEADER.size)
+        while True:
+            data = results_file.read(CHUNK.size)
+            if not data:
+                return
+            if len(data) < CHUNK.size:
+                raise ValueError('%s ends in the middle of a chunk' % path)
+            rows, rules_size = CHUNK.unpack(data)
+            chunk = ResultColumns()
+            for rules in _rule_sets(results_file.read(rules_size)):
+                chunk.rules_code(rules)
+            for name, typecode in COLUMNS:
+                column = chunk.columns[name]
+                size = rows * column.itemsize
+                data = results_file.read(size)
+                if len(data) < size:
+                    raise ValueError('%s ends in the middle of a chunk' % path)
+                _read_column(column, data)
+            chunk.round = chunk.columns['round'][-1] if rows else -1
+            yield chunk
+
+
+def read_results(path):
+    """Returns ResultColumns with every row of a column file"""
+    results = ResultColumns()
+    for chunk in iter_chunks(path):
+        for name in COLUMN_NAMES:
+            results.columns[name].extend(chunk.columns[name])
+        results.rule_sets, results.rule_codes, results.round = chunk.rule_sets, chunk.rule_codes, chunk.round
+    return results
+
+
+def write_csv(results, path, batch=4096):
+    """Returns None.  Writes the rows of ResultColumns to a CSV file, batch rows at a time.  Results and actions are
+    written by name (actions joined with +), rules by code
+    """
+    with open(path, 'w') as csv_file:
+        writer = csv.writer(csv_file, lineterminator='\n')
+        writer.writerow(COLUMN_NAMES)
+        result_idx = COLUMN_NAMES.index('result')
+        actions_idx = COLUMN_NAMES.index('actions')
+        rows = []
+        for row in zip(*[results.columns[name] for name in COLUMN_NAMES]):
+            row = list(row)
+            row[result_idx] = RESULTS[row[result_idx]]
+            row[actions_idx] = '+'.join(action_names(row[actions_idx]))
+            rows.append(row)
+            if len(rows) >= batch:
+                writer.writerows(rows)
+                rows = []
+        writer.writerows(rows)
+
+
+def aggregate(results, by=('upcard',), use_numpy=True):
+    """Returns {group: SimulationResult} of the rounds of ResultColumns, grouped by the values of the columns in by,
+    any of ROUND_COLUMNS.  A group is the tuple of those values, with the rules column as the RuleSet.
+    A round is the hands of one seat, and the results count hands as in SimulationResult.  Uses NumPy when it's
+    installed, unless use_numpy is False.
+    """
+    for name in by:
+        if name not in ROUND_COLUMNS:
+            raise ValueError('Can only group by columns of the round, %s: %r' % (', '.join(ROUND_COLUMNS), name))
+    numpy = None
+    if use_numpy:
+        try:
+            import numpy  # Imported here, as NumPy takes longer to import than the rest of the game
+        except ImportError:
+            pass
+    groups = _aggregate_numpy(numpy, results, by) if numpy is not None else _aggregate_rows(results, by)
+    if 'rules' in by:
+        rules_idx = list(by).index('rules')
+        groups = dict((key[:rules_idx] + (results.rule_sets[key[rules_idx]],) + key[rules_idx + 1:], stats)
+                      for key, stats in groups.items())
+    return groups
+
+
+def aggregate_file(path, by=('upcard',), use_numpy=True):
+    """Returns aggregate of the rows of a column file, a chunk at a time"""
+    groups = {}
+    for chunk in iter_chunks(path):
+        for key, stats in aggregate(chunk, by, use_numpy).items():
+            if key in groups:
+                groups[key].merge(stats)
+            else:
+                groups[key] = stats
+    return groups
+
+
+def _simulation_result():
+    """Returns the simulation.SimulationResult class, imported here as simulation imports this module"""
+    try:
+        from .simulation import SimulationResult
+    except (ImportError, ValueError):
+        from simulation import SimulationResult
+    return SimulationResult
+
+
+def _aggregate_rows(results, by):
+    """Returns {group: SimulationResult} from one loop over the rows"""
+    SimulationResult = _simulation_result()
+    columns = results.columns
+    key_columns = [columns[name] for name in by]
+    wagers = columns['wager']
+    groups = {}
+    stats = None
+    round_earned = 0.0
+    for row, (hand, result, earned) in enumerate(zip(columns['hand'], columns['result'], columns['wager_earned'])):
+        if hand == 0:  # The first hand of a round
+            if stats is not None:
+                stats.net += round_earned
+                stats.net_squared += round_earned * round_earned
+            key = tuple(column[row] for column in key_columns)
+            stats = groups.get(key)
+            if stats is None:
+                stats = groups[key] = SimulationResult()
+            stats.rounds += 1
+            stats.wagered += wagers[row]
+            round_earned = 0.0
+        stats.hands += 1
+        stats.counts[RESULTS[result]] += 1
+        round_earned += earned
+    if stats is not None:
+        stats.net += round_earned
+        stats.net_squared += round_earned * round_earned
+    return groups
+
+
+def _aggregate_numpy(numpy, results, by):
+    """Returns {group: SimulationResult} worked out on every row at once with NumPy"""
+    SimulationResult = _simulation_result()
+    if not len(results):
+        return {}
+    columns = dict((name, numpy.frombuffer(column, dtype=column.typecode)) for name, column in results.columns.items())
+    first_hand = columns['hand'] == 0
+    starts = numpy.flatnonzero(first_hand)  # First row of each round
+    round_of_row = numpy.cumsum(first_hand) - 1
+    if by:
+        keys, group_of_round = numpy.unique(numpy.stack([columns[name][starts] for name in by], axis=1), axis=0,
+                                            return_inverse=True)
+        group_of_round = group_of_round.reshape(-1)
+    else:
+        keys, group_of_round = numpy.zeros((1, 0)), numpy.zeros(len(starts), dtype=numpy.intp)
+    n_groups = len(keys)
+    round_earned = numpy.add.reduceat(columns['wager_earned'], starts)
+    rounds = numpy.bincount(group_of_round, minlength=n_groups)
+    net = numpy.bincount(group_of_round, weights=round_earned, minlength=n_groups)
+    net_squared = numpy.bincount(group_of_round, weights=round_earned * round_earned, minlength=n_groups)
+    wagered = numpy.bincount(group_of_round, weights=columns['wager'][starts], minlength=n_groups)
+    group_of_row = group_of_round[round_of_row]
+    hands = numpy.bincount(group_of_row, minlength=n_groups)
+    counts = numpy.bincount(group_of_row * len(RESULTS) + columns['result'],
+                            minlength=n_groups * len(RESULTS)).reshape(n_groups, len(RESULTS))
+    groups = {}
+    for group, key in enumerate(keys.tolist()):
+        # Keys of the same types as the row loop gives, the columns were stacked into one array type
+        key = tuple(value if name == 'wager' else int(value) for name, value in zip(by, key))
+        stats = groups[key] = SimulationResult()
+        stats.rounds = int(rounds[group])
+        stats.hands = int(hands[group])
+        stats.net = float(net[group])
+        stats.net_squared = float(net_squared[group])
+        stats.wagered = float(wagered[group])
+        for result, count in zip(RESULTS, counts[group].tolist()):
+            stats.counts[result] = count
+    return groups
+
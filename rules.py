@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+"""
+The rules of a BlackJack game as one frozen, hashable object.
+
+A RuleSet is validated once and compiles its lookup tables once: the payout of each result and, for the Dealer's
+hand by number of Aces and hard total, its value and whether the Dealer draws.  RuleSet(...) returns the same object
+for the same rules, so every game with those rules points at the same tables instead of building its own.
+
+    rules = RuleSet(decks=6, blackjack_payout=1.2, dealer_hits_soft_17=True)
+    game = BlackJack(rules=rules)
+    stats = Simulator(rules=rules).run(100000)
+
+dealer_hits_soft_17 has the Dealer draw on a soft hand of dealer_min (soft 17) instead of standing.  The Dealer's
+Ace is counted as 1 or 11 with allow_soft_limit (else always 11), and a hand is soft when an Ace is counted as 11.
+
+max_hands is the most hands a round can be split into, 2 for a single split and up to MAX_HANDS with re-splits.
+allow_surrender offers late surrender of the opening hand for half the wager (a Dealer BlackJack still takes the whole
+wager), and allow_insurance offers insurance against a Dealer BlackJack when the up card is an Ace.
+"""
+from __future__ import print_function, division
+try:
+    from .hand import MAX_HARD_TOTAL, hand_value
+except (ImportError, ValueError):
+    from hand import MAX_HARD_TOTAL, hand_value
+
+FIELDS = ('decks', 'blackjack_payout', 'dealer_min', 'dealer_hits_soft_17', 'allow_soft_limit', 'allow_split',
+          'allow_dd', 'allow_dd_after_split', 'max_hands', 'allow_surrender', 'allow_insurance')
+PAYOUTS = {'blackjack': 1.5, 'won': 1, 'lost': -1, 'bust': -1, 'push': 0,
+           'surrender': -0.5}  # Wager earned per unit wagered, by result
+INSURANCE_PAYOUT = 2  # Insurance pays 2 to 1 on a Dealer BlackJack
+INSURANCE_WAGER = 0.5  # Insurance costs half the opening wager
+MAX_HANDS = 4  # Most hands a round can be split into
+
+_rule_sets = {}  # RuleSet by its fields, every RuleSet ever made
+
+
+class RuleSet(object):
+    """Frozen, hashable rules of a game with their compiled tables:
+    payouts, the wager earned per unit wagered by result, and dealer_values and dealer_draws, the Dealer's hand value
+    and whether the Dealer draws, indexed [aces][hard total].
+    """
+    __slots__ = FIELDS + ('payouts', 'dealer_values', 'dealer_draws')
+
+    def __new__(cls, decks=1, blackjack_payout=PAYOUTS['blackjack'], dealer_min=17, dealer_hits_soft_17=False,
+                allow_soft_limit=True, allow_split=True, allow_dd=True, allow_dd_after_split=True, max_hands=2,
+                allow_surrender=False, allow_insurance=False):
+        key = (decks, blackjack_payout, dealer_min, bool(dealer_hits_soft_17), bool(allow_soft_limit),
+               bool(allow_split), bool(allow_dd), bool(allow_dd_after_split), max_hands, bool(allow_surrender),
+               bool(allow_insurance))
+        rules = _rule_sets.get(key)
+        if rules is not None:
+            return rules
+        if int(decks) != decks or decks < 1:
+            raise ValueError('A shoe needs a whole number of decks, at least one: %r' % (decks,))
+        if not blackjack_payout > 0:
+            raise ValueError('BlackJack payout must be more than 0: %r' % (blackjack_payout,))
+        if int(dealer_min) != dealer_min or not 2 <= dealer_min <= 21:
+            raise ValueError('Dealer minimum must be a whole number from 2 to 21: %r' % (dealer_min,))
+        if int(max_hands) != max_hands or not 2 <= max_hands <= MAX_HANDS:
+            raise ValueError('Max hands must be a whole number from 2 to %d: %r' % (MAX_HANDS, max_hands))
+        # Stored under the normalized rules, which equal the rules given (6.0 == 6), so both find the same RuleSet
+        key = (int(decks), float(blackjack_payout), int(dealer_min)) + key[3:8] + (int(max_hands),) + key[9:]
+        rules = object.__new__(cls)
+        for name, value in zip(FIELDS, key):
+            object.__setattr__(rules, name, value)
+        payouts = dict(PAYOUTS)
+        payouts['blackjack'] = blackjack_payout
+        object.__setattr__(rules, 'payouts', payouts)
+        values = [[hand_value(hard, aces, allow_soft_limit) for hard in range(MAX_HARD_TOTAL)]
+                  for aces in range(MAX_HARD_TOTAL)]
+        object.__setattr__(rules, 'dealer_values', values)
+        object.__setattr__(rules, 'dealer_draws', [
+            [_dealer_draws(value, hard, aces, rules) for hard, value in enumerate(aces_values)]
+            for aces, aces_values in enumerate(values)])
+        return _rule_sets.setdefault(key, rules)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('RuleSet is frozen, use replace() for other rules')
+
+    def __delattr__(self, name):
+        raise AttributeError('RuleSet is frozen, use replace() for other rules')
+
+    def key(self):
+        """Returns the rules as a tuple, in the order of FIELDS"""
+        return tuple(getattr(self, name) for name in FIELDS)
+
+    def as_dict(self):
+        """Returns {field: value} of the rules"""
+        return dict(zip(FIELDS, self.key()))
+
+    def replace(self, **changes):
+        """Returns the RuleSet of these rules with changes, given as keyword arguments"""
+        for name in changes:
+            if name not in FIELDS:
+                raise TypeError('Unknown rule: %r' % (name,))
+        rules = self.as_dict()
+        rules.update(changes)
+        return RuleSet(**rules)
+
+    def __eq__(self, other):
+        return isinstance(other, RuleSet) and self.key() == other.key()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __reduce__(self):
+        return RuleSet, self.key()
+
+    def __repr__(self):
+        return 'RuleSet(%s)' % ', '.join('%s=%r' % (name, getattr(self, name)) for name in FIELDS)
+
+
+def _dealer_draws(value, hard, aces, rules):
+    """Returns True when the Dealer draws on the hand"""
+    if value != rules.dealer_min or not rules.dealer_hits_soft_17:
+        return value < rules.dealer_min
+    return aces > 0 and (hard <= 11 or not rules.allow_soft_limit)  # Soft dealer_min: an Ace counts as 11
+
+
+DEFAULT_RULES = RuleSet()
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+BlackJack game server: many players at once, each playing BlackJack games in a session kept in memory.
+
+Run from command line: python server.py [port or Unix socket path]  (Python 3, it's built on asyncio)
+
+Clients connect over TCP (or a Unix socket) and send one JSON request per line.  Every request gets one JSON
+response line, the state of the session or {"error": "..."}.  On connect the server sends the state of a new
+session, with chips and the round counters of play_blackjack.  Requests:
+
+    {"action": "deal", "wager": 5}           Starts a round, the max wager is the chips left
+    {"action": "hit", "hand": 0}             Also "stand" and "double_down", hand defaults to 0
+    {"action": "split", "hand": 0}           Also "surrender" and "insurance", offered on the opening hand by the rules
+    {"action": "state"}
+    {"action": "resume", "session": "..."}   Continues an earlier session, after a reconnect
+    {"action": "quit"}
+
+Sessions outlive their connection so a player can resume, and are evicted once idle for idle_timeout seconds.
+A game is a few microseconds of work per request, so requests are played on the event loop without blocking it.
+
+load_client.py plays many sessions against the server to measure sessions and actions per second.
+"""
+import asyncio
+import json
+import sys
+import time
+import uuid
+try:
+    from .blackjack import BlackJack, HIT, STAND, DOUBLE_DOWN, SPLIT, SURRENDER, INSURANCE
+    from .cards import CARD_VALUES
+    from .play_blackjack import _initialize_game
+except (ImportError, ValueError):
+    from blackjack import BlackJack, HIT, STAND, DOUBLE_DOWN, SPLIT, SURRENDER, INSURANCE
+    from cards import CARD_VALUES
+    from play_blackjack import _initialize_game
+
+
+class Session(object):
+    """A player's chips, round counters and the game in play"""
+
+    def __init__(self, session_id, chips):
+        self.session_id = session_id
+        self.player = _initialize_game(chips)
+        self.game = None  # BlackJack of the round in play, or of the last round once it's over
+        self.in_play = False
+        self.last_seen = time.monotonic()
+        self.writer = None  # Connection the session is played on, None once disconnected
+
+
+def _hand_state(game, hand_idx):
+    player = game.players[hand_idx]
+    cards = player.hand.cards
+    pair = CARD_VALUES[cards[0]] if len(cards) == 2 and CARD_VALUES[cards[0]] == CARD_VALUES[cards[1]] else 0
+    return {
+        'cards': player.hand[:],
+        'value': player.hand.value(),
+        'soft': player.hand.is_soft(),
+        'pair': pair,
+        'wager': player.wager,
+        'active': player.active,
+        'can_double': player.allow_dd and player.active,
+        'can_split': game.can_split(hand_idx),
+        'result': player.result,
+    }
+
+
+def session_state(session):
+    """Returns the state of a session sent to the client, as a JSON-ready dict.
+    The Dealer's hole card and draws are only shown once the round is over.
+    """
+    state = {'session': session.session_id, 'in_play': session.in_play}
+    state.update(session.player)
+    game = session.game
+    if game is not None:
+        state['hands'] = [_hand_state(game, hand_idx) for hand_idx in range(len(game.players))]
+        state['upcard'] = CARD_VALUES[game.dealer_hand.cards[0]]
+        if session.in_play:
+            state['dealer'] = [game.get_dealer_upcard()]
+            state['can_split'] = game.can_split()
+            state['can_surrender'] = game.can_surrender()
+            state['can_insure'] = game.can_insure()
+        else:
+            state['dealer'] = game.dealer_hand[:]
+            state['dealer_value'] = game.dealer_hand_value()
+            state['wager_earned'] = game.wager_earned
+    return state
+
+
+class GameServer(object):
+    """Sessions of BlackJack played over the line/JSON protocol"""
+
+    def __init__(self, chips=100, idle_timeout=300.0, **rules):
+        """Returns None.  Every new session gets chips.  rules are BlackJack rule arguments other than the wagers"""
+        self.chips = chips
+        self.idle_timeout = idle_timeout
+        self.rules = rules
+        self.sessions = {}
+        self.requests = 0
+        self.evicted = 0
+
+    def new_session(self):
+        """Returns a new Session"""
+        session = Session(uuid.uuid4().hex, self.chips)
+        self.sessions[session.session_id] = session
+        return session
+
+    def handle_request(self, session, request):
+        """Returns the session the connection plays on next and the response to the request"""
+        self.requests += 1
+        session.last_seen = time.monotonic()
+        if not isinstance(request, dict):
+            return session, {'error': 'Request must be a JSON object'}
+        action = request.get('action')
+        if action == 'state':
+            return session, session_state(session)
+        if action == 'resume':
+            other = self.sessions.get(request.get('session'))
+            if other is None:
+                return session, {'error': 'Unknown or evicted session'}
+            if other is session:
+                return session, session_state(session)
+            other.writer, session.writer = session.writer, None
+            other.last_seen = session.last_seen
+            return other, session_state(other)
+        if action == 'deal':
+            return session, self._deal(session, request.get('wager', 1))
+        if action in (HIT, STAND, DOUBLE_DOWN, SPLIT, SURRENDER, INSURANCE):
+            return session, self._play(session, action, request.get('hand', 0))
+        return session, {'error': 'Unknown action: %r' % (action,)}
+
+    def _deal(self, session, wager):
+        player = session.player
+        if session.in_play:
+            return {'error': 'Round in play, finish it first'}
+        if not isinstance(wager, int) or isinstance(wager, bool) or not 1 <= wager <= player['chips']:
+            return {'error': 'Wager must be a whole number from 1 to %d' % player['chips']}
+        session.game = BlackJack(wager=wager, max_wager=player['chips'], **self.rules)
+        session.in_play = True
+        player['round'] += 1
+        self._finish_round(session)  # A BlackJack ends the round straight away
+        return session_state(session)
+
+    def _play(self, session, action, hand_idx):
+        game = session.game
+        if not session.in_play:
+            return {'error': 'No round in play, deal first'}
+        if not isinstance(hand_idx, int) or not 0 <= hand_idx < len(game.players):
+            return {'error': 'No hand %r' % (hand_idx,)}
+        if not game.players[hand_idx].active:
+            return {'error': 'Hand %d is over' % hand_idx}
+        if action in (HIT, STAND):
+            getattr(game, action)(hand_idx)
+        elif not getattr(game, action)(hand_idx):
+            return {'error': '%s is not allowed' % action.replace('_', ' ').capitalize()}
+        self._finish_round(session)
+        return session_state(session)
+
+    def _finish_round(self, session):
+        """Returns None.  Pays the round to the chips once every hand is over"""
+        game = session.game
+        for player in game.players:
+            if player.active:
+                return None
+        session.in_play = False
+        session.player['chips'] += game.wager_earned
+        for player in game.players:
+            session.player[player.result] += 1
+        return None
+
+    def evict_idle(self, now=None):
+        """Returns the number of sessions evicted for being idle longer than idle_timeout.  Closes their connection"""
+        if now is None:
+            now = time.monotonic()
+        idle = [session for session in self.sessions.values() if now - session.last_seen > self.idle_timeout]
+        for session in idle:
+            del self.sessions[session.session_id]
+            if session.writer is not None:
+                session.writer.close()
+                session.writer = None
+        self.evicted += len(idle)
+        return len(idle)
+
+    async def _evict_loop(self):
+        while True:
+            await asyncio.sleep(max(self.idle_timeout / 4.0, 0.01))
+            self.evict_idle()
+
+    async def handle_connection(self, reader, writer):
+        """Plays the requests of one connection, one response line per request line"""
+        session = self.new_session()
+        session.writer = writer
+        try:
+            writer.write(json.dumps(session_state(session)).encode('utf-8') + b'\n')
+            await writer.drain()
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # Line over the stream limit
+                    break
+                if not line or session.writer is not writer:  # Disconnected, or evicted
+                    break
+                try:
+                    request = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    response = {'error': 'Request is not valid JSON'}
+                else:
+                    if isinstance(request, dict) and request.get('action') == 'quit':
+                        break
+                    session, response = self.handle_request(session, request)
+                writer.write(json.dumps(response).encode('utf-8') + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            if session.writer is writer:
+                session.writer = None
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=0, path=None):
+        """Returns the asyncio server listening on host and port, or on the Unix socket path when given.
+        Also starts evicting idle sessions in the background.
+        """
+        if path is not None:
+            server = await asyncio.start_unix_server(self.handle_connection, path=path)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+        self._evict_task = asyncio.ensure_future(self._evict_loop())
+        return server
+
+    async def serve(self, host='127.0.0.1', port=8021, path=None):
+        """Serves until cancelled"""
+        server = await self.start(host, port, path)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self._evict_task.cancel()
+
+
+if __name__ == '__main__':
+    """Entry point of the program when run via command line"""
+    address = sys.argv[1] if len(sys.argv) >= 2 else '8021'
+    game_server = GameServer()
+    try:
+        if address.isdigit():
+            print('Serving BlackJack on port %s' % address)
+            asyncio.run(game_server.serve(port=int(address)))
+        else:
+            print('Serving BlackJack on %s' % address)
+            asyncio.run(game_server.serve(path=address))
+    except KeyboardInterrupt:
+        pass
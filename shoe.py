@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""
+A dealing shoe of one or more decks, kept across rounds.
+
+Cards are small ints (see cards.py) drawn from the end of a bytearray, so a draw is a pop.  The shoe is shuffled only when the cut card has
+come out (checked at the start of a round), or before every round when the reshuffle policy is EVERY_ROUND.
+"""
+from __future__ import print_function, division
+try:
+    from .cards import DECK
+    from .shufflers import RandomShuffler
+except (ImportError, ValueError):
+    from cards import DECK
+    from shufflers import RandomShuffler
+
+# Reshuffle policies
+CUT_CARD = 'cut_card'  # Reshuffle before the round after the cut card comes out
+EVERY_ROUND = 'every_round'  # Reshuffle before every round, as with a fresh deck per round
+
+
+class Shoe(object):
+    """Holds the cards left to deal from one or more decks"""
+
+    def __init__(self, decks=1, penetration=0.75, reshuffle=CUT_CARD, cards=None, rng=None, shuffler=None,
+                 counter=None):
+        """Returns None.  Builds and shuffles the shoe.
+        penetration is the fraction of the shoe dealt before the cut card.  cards is the list of cards in one deck,
+        by default the 52 cards of cards.DECK.  Cards need to be ints from 0 to 255.
+        rng is a random.Random instance to shuffle with, by default the random module.  shuffler replaces the shuffle
+        altogether, see shufflers.py.  counter is a counting.CardCounter that keeps count of the cards dealt.
+        """
+        if decks < 1:
+            raise ValueError('A shoe needs at least one deck: %r' % (decks,))
+        if not 0 < penetration <= 1:
+            raise ValueError('Penetration must be more than 0 and at most 1: %r' % (penetration,))
+        if reshuffle not in (CUT_CARD, EVERY_ROUND):
+            raise ValueError('Unknown reshuffle policy: %r' % (reshuffle,))
+        if cards is None:
+            cards = DECK
+        self.decks = decks
+        self.penetration = penetration
+        self.reshuffle = reshuffle
+        self.shuffler = RandomShuffler(rng) if shuffler is None else shuffler
+        self.full_shoe = bytearray(cards) * decks
+        self.cut_card = int(round(len(self.full_shoe) * (1 - penetration)))  # Cards left when the cut card comes out
+        self.counter = counter
+        self.reshuffles = 0
+        self.cards = bytearray()  # Cards left to deal, top of the shoe is the end
+        self.shuffle()
+
+    def __len__(self):
+        return len(self.cards)
+
+    @property
+    def cut_card_reached(self):
+        """Returns True once the cut card has come out"""
+        return len(self.cards) <= self.cut_card
+
+    def shuffle(self):
+        """Returns None.  Puts all the cards back in the shoe and shuffles it"""
+        self.cards[:] = self.full_shoe  # In place, so references to self.cards stay valid
+        self.shuffler.shuffle(self.cards)
+        self.reshuffles += 1
+        if self.counter is not None:
+            self.counter.shuffled(self.cards)
+
+    def start_round(self):
+        """Returns True if the shoe was shuffled before the round as required by the reshuffle policy"""
+        remaining = len(self.cards)
+        if remaining < len(self.full_shoe) and (self.reshuffle == EVERY_ROUND or remaining <= self.cut_card):
+            self.shuffle()
+            return True
+        return False
+
+    def running_count(self):
+        """Returns the running count of the cards dealt since the shuffle, None when the shoe has no counter"""
+        if self.counter is None:
+            return None
+        return self.counter.running_count(len(self.cards))
+
+    def true_count(self):
+        """Returns the true count, the running count per deck left, None when the shoe has no counter"""
+        if self.counter is None:
+            return None
+        return self.counter.true_count(len(self.cards))
+
+    def draw(self):
+        """Returns the top card.  If the shoe runs out in the middle of a round, it's shuffled in full"""
+        if not self.cards:
+            self.shuffle()
+        return self.cards.pop()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+"""
+Shuffle providers for the Shoe.
+
+A shuffler has a shuffle(cards) method that puts the bytearray of cards in a new order, in place.  The top of the
+shoe is the end of the bytearray.
+
+RandomShuffler: Fisher-Yates with a random.Random instance (or the random module).  The default.
+NumpyShuffler: pre-generates a batch of permutations at once with a NumPy Generator.  Needs NumPy.
+StackedShuffler: deals given decks in the given order, to replay a recording or set up a test.
+RecordingShuffler: records the order of every deck another shuffler produces, for replay.
+"""
+from __future__ import print_function
+import random
+from collections import Counter
+try:
+    from .cards import encode
+except (ImportError, ValueError):
+    from cards import encode
+
+
+class RandomShuffler(object):
+    """Shuffles with rng, a random.Random instance, by default the random module"""
+
+    def __init__(self, rng=None):
+        self.rng = random if rng is None else rng
+
+    def shuffle(self, cards):
+        """Returns None.  Fisher-Yates with random() instead of random.shuffle: the bias is negligible for a shoe
+        and it's noticeably cheaper than the bit-exact shuffle, which would otherwise dominate simulations.
+        """
+        rand = self.rng.random
+        for i in range(len(cards) - 1, 0, -1):
+            j = int(rand() * (i + 1))
+            cards[i], cards[j] = cards[j], cards[i]
+
+
+class NumpyShuffler(object):
+    """Shuffles with permutations generated batch at a time by a numpy.random.Generator"""
+
+    def __init__(self, rng=None, batch=1024):
+        """Returns None.  rng is a numpy.random.Generator, or a seed for one"""
+        try:
+            import numpy  # Imported here, as NumPy takes longer to import than the rest of the game
+        except ImportError:
+            raise ImportError('NumpyShuffler needs NumPy.  Install it with: pip install numpy')
+        if not isinstance(rng, numpy.random.Generator):
+            rng = numpy.random.default_rng(rng)
+        self.rng = rng
+        self.batch = batch
+        self.permutations = None  # batch x shoe size array of card positions
+        self.next_permutation = 0
+
+    def shuffle(self, cards):
+        import numpy  # Already imported by __init__, this only looks it up
+        size = len(cards)
+        if self.permutations is None or self.next_permutation == self.batch or self.permutations.shape[1] != size:
+            positions = numpy.tile(numpy.arange(size, dtype=numpy.uint16), (self.batch, 1))
+            self.permutations = self.rng.permuted(positions, axis=1)
+            self.next_permutation = 0
+        permutation = self.permutations[self.next_permutation]
+        self.next_permutation += 1
+        # Copy to bytes first: a NumPy view would stop the bytearray from shrinking as cards are drawn
+        cards[:] = numpy.frombuffer(bytes(cards), dtype=numpy.uint8)[permutation].tobytes()
+
+
+class StackedShuffler(object):
+    """Deals the given decks, one per shuffle, in order"""
+
+    def __init__(self, decks):
+        """Returns None.  Each deck lists the cards in the order they are dealt, first card first, as ints or (face,
+        suit) tuples.  A deck can list only the first cards to deal, the rest of the shoe follows in a fixed order.
+        """
+        self.decks = [[encode(card) for card in deck] for deck in decks]
+        self.next_deck = 0
+
+    def shuffle(self, cards):
+        if self.next_deck == len(self.decks):
+            raise IndexError('No more stacked decks, %d were dealt' % len(self.decks))
+        deal = self.decks[self.next_deck]
+        self.next_deck += 1
+        rest = Counter(cards)
+        rest.subtract(deal)
+        if min(rest.values()) < 0:
+            raise ValueError('Stacked deck has cards that are not in the shoe: %r' % (deal,))
+        cards[:] = bytearray(card for card in sorted(rest.elements())) + bytearray(reversed(deal))
+
+
+class RecordingShuffler(object):
+    """Shuffles with another shuffler and keeps every deck dealt, first card first, to replay with StackedShuffler"""
+
+    def __init__(self, shuffler=None):
+        self.shuffler = RandomShuffler() if shuffler is None else shuffler
+        self.decks = []
+
+    def shuffle(self, cards):
+        self.shuffler.shuffle(cards)
+        self.decks.append(list(reversed(cards)))
@@ -0,0 +1,508 @@
+#!/usr/bin/env python
+"""
+Headless Monte Carlo simulation of BlackJack rounds.
+
+The Simulator plays rounds against a player policy without building a BlackJack object per round.  The rules are
+the same as blackjack.BlackJack (including the dealer drawing a card on each player hit), but the cards are plain
+values dealt from a Shoe kept across the rounds.
+
+Run from command line to compare against a BlackJack() per round loop: python simulation.py [rounds]
+"""
+from __future__ import print_function, division
+import math
+import random
+import sys
+import time
+try:
+    from .blackjack import BlackJack, HIT, STAND, DOUBLE_DOWN, SPLIT, hand_result
+    from .cards import CARD_VALUES, DECK
+    from .counting import CardCounter, CARD_VALUE_CARDS
+    from .instrumentation import INSTRUMENTATION, enable_from_environment
+    from .results import DOUBLE_DOWN_FLAG, HIT_FLAG, INSURANCE_FLAG, SPLIT_FLAG, SURRENDER_FLAG
+    from .rules import INSURANCE_PAYOUT, INSURANCE_WAGER, RuleSet
+    from .shoe import Shoe, CUT_CARD
+except (ImportError, ValueError):
+    from blackjack import BlackJack, HIT, STAND, DOUBLE_DOWN, SPLIT, hand_result
+    from cards import CARD_VALUES, DECK
+    from counting import CardCounter, CARD_VALUE_CARDS
+    from instrumentation import INSTRUMENTATION, enable_from_environment
+    from results import DOUBLE_DOWN_FLAG, HIT_FLAG, INSURANCE_FLAG, SPLIT_FLAG, SURRENDER_FLAG
+    from rules import INSURANCE_PAYOUT, INSURANCE_WAGER, RuleSet
+    from shoe import Shoe, CUT_CARD
+
+RESULTS = ('blackjack', 'won', 'lost', 'bust', 'push', 'surrender')
+
+
+def mimic_dealer(total, soft, pair, upcard, can_double, can_split):
+    """Player policy that plays like the dealer: Hit until 17, then Stand"""
+    return HIT if total < 17 else STAND
+
+
+def always_stand(total, soft, pair, upcard, can_double, can_split):
+    """Player policy that never draws a card"""
+    return STAND
+
+
+class SimulationResult(object):
+    """Aggregate results of simulated rounds.  wager_earned is tracked per round to compute EV and variance"""
+
+    def __init__(self):
+        self.rounds = 0
+        self.hands = 0
+        self.net = 0.0  # Sum of wager_earned over all rounds
+        self.net_squared = 0.0  # Sum of wager_earned ** 2 over all rounds
+        self.counts = dict((result, 0) for result in RESULTS)
+        self.wagered = 0.0  # Sum of the opening wagers
+        self.by_count = {}  # SimulationResult by true count, rounded down, when the Simulator counts cards
+        self.elapsed = 0.0
+
+    @property
+    def ev(self):
+        """Expected wager earned per round"""
+        return self.net / self.rounds if self.rounds else 0.0
+
+    @property
+    def variance(self):
+        """Sample variance of wager earned per round"""
+        if self.rounds < 2:
+            return 0.0
+        return max(self.net_squared - self.rounds * self.ev ** 2, 0.0) / (self.rounds - 1)
+
+    @property
+    def std_error(self):
+        """Standard error of the EV estimate"""
+        return math.sqrt(self.variance / self.rounds) if self.rounds else 0.0
+
+    def ev_by_count(self):
+        """Returns {true count: expected wager earned per round} for the rounds started at each true count"""
+        return dict((count, stats.ev) for count, stats in self.by_count.items())
+
+    @property
+    def rounds_per_second(self):
+        return self.rounds / self.elapsed if self.elapsed else 0.0
+
+    def merge(self, other):
+        """Returns self after adding the totals of another SimulationResult"""
+        self.rounds += other.rounds
+        self.hands += other.hands
+        self.net += other.net
+        self.net_squared += other.net_squared
+        for result in RESULTS:
+            self.counts[result] += other.counts[result]
+        self.wagered += other.wagered
+        for count, stats in other.by_count.items():
+            self.by_count.setdefault(count, SimulationResult()).merge(stats)
+        self.elapsed += other.elapsed
+        return self
+
+    def __repr__(self):
+        return '<SimulationResult rounds=%d ev=%.5f std_error=%.5f %s>' % (
+            self.rounds, self.ev, self.std_error, ' '.join('%s=%d' % (result, self.counts[result]) for result in RESULTS))
+
+
+class Simulator(object):
+    """Plays BlackJack rounds in bulk.  Takes the same rule arguments as BlackJack"""
+
+    def __init__(self, wager=1, max_wager=1, dealer_min=17, allow_soft_limit=True, allow_split=True, allow_dd=True,
+                 allow_dd_after_split=True, decks=1, penetration=0.75, reshuffle=CUT_CARD, rng=None, shuffler=None,
+                 count=None, bet_spread=None, lazy_dealer=False, rules=None):
+        """Returns None.  decks, penetration and reshuffle configure the Shoe kept across all the rounds.
+        rng is the random.Random instance that shuffles the Shoe, by default the random module, or pass a shuffler
+        such as shufflers.NumpyShuffler.
+        count is a counting system (see counting.py) to keep count of the shoe with: the results are then also kept
+        by the true count at the start of the round.  bet_spread, a function of the true count such as
+        counting.BetRamp, gives the wager of each round instead of wager.
+        lazy_dealer deals the Dealer's cards after all the Player's, as BlackJack(lazy_dealer=True) does.
+        rules, a rules.RuleSet, gives the rules and decks instead of the rule arguments, as in BlackJack.
+        """
+        if bet_spread is not None and count is None:
+            raise ValueError('A bet spread needs a counting system to bet by')
+        if rules is None:
+            rules = RuleSet(decks, dealer_min=dealer_min, allow_soft_limit=allow_soft_limit, allow_split=allow_split,
+                            allow_dd=allow_dd, allow_dd_after_split=allow_dd_after_split)
+        self.rules = rules
+        self.wager = wager
+        self.max_wager = max_wager
+        self.dealer_min = rules.dealer_min
+        self.allow_soft_limit = rules.allow_soft_limit
+        self.allow_split = rules.allow_split
+        self.allow_dd = rules.allow_dd
+        self.allow_dd_after_split = rules.allow_dd_after_split
+        self.bet_spread = bet_spread
+        self.lazy_dealer = lazy_dealer
+        counter = CardCounter(count, CARD_VALUE_CARDS) if count is not None else None
+        self.shoe = Shoe(rules.decks, penetration, reshuffle, cards=[CARD_VALUES[card] for card in DECK], rng=rng,
+                         shuffler=shuffler, counter=counter)
+
+    def run(self, rounds, policy=mimic_dealer, session=None, results=None):
+        """Returns SimulationResult after playing the rounds.
+        policy is called as policy(total, soft, pair, upcard, can_double, can_split) and returns one of
+        HIT, STAND, DOUBLE_DOWN or SPLIT.  pair is the card value when the hand is two cards of equal value (else 0),
+        upcard is the value of the dealer's up card (Ace is 11).
+        When the rules offer them, a policy with an insurance(total, soft, pair, true_count) method is asked whether
+        to take insurance (true_count is None without a counting system), and one with a
+        surrender(total, soft, pair, upcard) method whether to surrender, both on the opening hand before it's played.
+        session, such as a bankroll.Session, gives each round's wager and max wager with session.bet(), and is told
+        the round's wager earned with session.settle(earned), which returns True to end the run before rounds.
+        results, a results.ResultColumns such as a ResultsWriter, gets a row for every hand played.
+        """
+        stats = SimulationResult()
+        counts = stats.counts
+        net = net_squared = wagered = 0.0
+        hands_played = 0
+        wager, max_wager = self.wager, self.max_wager
+        dealer_values, dealer_draws = self.rules.dealer_values, self.rules.dealer_draws
+        blackjack_payout = self.rules.blackjack_payout
+        surrender_payout = self.rules.payouts['surrender']
+        surrender = getattr(policy, 'surrender', None) if self.rules.allow_surrender else None
+        insure = getattr(policy, 'insurance', None) if self.rules.allow_insurance else None
+        max_hands = self.rules.max_hands
+        payouts = self.rules.payouts
+        rules_code = results.rules_code(self.rules) if results is not None else None
+        can_split_rule = self.allow_split and max_wager >= wager * 2
+        allow_dd, allow_dd_after_split = self.allow_dd, self.allow_dd_after_split
+        dealer_on_hit = not self.lazy_dealer
+        shoe = self.shoe
+        start_round = shoe.start_round
+        deck = shoe.cards
+        pop = deck.pop
+        refill = shoe.draw  # Only called when the shoe has run out, so it reshuffles and draws
+        counter = shoe.counter
+        bet_spread = self.bet_spread
+        by_count = stats.by_count
+        # Player hands as parallel lists, allocated once for the most hands a round can have: hard total (Aces as 1),
+        # Aces, cards, wager, double down allowed, first and second card, the value of each finished hand, and the
+        # results.ACTION_FLAGS of its actions other than hit, which is told by the cards
+        hard = [0] * max_hands
+        aces = [0] * max_hands
+        cards = [0] * max_hands
+        wagers = [0] * max_hands
+        dd_allowed = [False] * max_hands
+        firsts = [0] * max_hands
+        seconds = [0] * max_hands
+        values = [0] * max_hands
+        acted = [0] * max_hands
+        true_count = None
+        start = time.time()
+        for round_idx in range(rounds):
+            start_round()
+            if counter is not None:
+                true_count = counter.true_count(len(deck))
+                count_stats = by_count.get(int(math.floor(true_count)))
+                if count_stats is None:
+                    count_stats = by_count[int(math.floor(true_count))] = SimulationResult()
+                if bet_spread is not None:
+                    wager = bet_spread(true_count)
+                    can_split_rule = self.allow_split and max_wager >= wager * 2
+            if session is not None:
+                wager, max_wager = session.bet()
+                can_split_rule = self.allow_split and max_wager >= wager * 2
+            # Deal two cards for Player and Dealer in the same order as BlackJack
+            p1 = pop() if deck else refill()
+            p2 = pop() if deck else refill()
+            upcard = pop() if deck else refill()
+            hole = pop() if deck else refill()
+            d_hard = (upcard if upcard != 11 else 1) + (hole if hole != 11 else 1)
+            d_aces = (upcard == 11) + (hole == 11)
+            d_cards = 2
+            hard[0] = (p1 if p1 != 11 else 1) + (p2 if p2 != 11 else 1)
+            aces[0] = (p1 == 11) + (p2 == 11)
+            cards[0] = 2
+            wagers[0] = wager
+            dd_allowed[0] = allow_dd
+            firsts[0] = p1
+            seconds[0] = p2
+            acted[0] = 0
+            n_hands = 1
+            at_stake = wager  # Wagers of the hands and the insurance, limited by max_wager
+            earned = 0.0
+            hand_idx = 0
+            player_value = hard[0] + 10 if aces[0] and hard[0] <= 11 else hard[0]
+            if player_value != 21 and (insure is not None or surrender is not None):
+                soft = hard[0] <= 11 and aces[0] > 0
+                pair = p1 if p1 == p2 else 0
+                dealer_blackjack = upcard + hole == 21
+                insurance = wager * INSURANCE_WAGER
+                if insure is not None and upcard == 11 and max_wager >= wager + insurance and \
+                        insure(player_value, soft, pair, true_count):
+                    at_stake += insurance
+                    acted[0] |= INSURANCE_FLAG
+                    earned += INSURANCE_PAYOUT * insurance if dealer_blackjack else -insurance
+                if surrender is not None and surrender(player_value, soft, pair, upcard):
+                    # Late surrender: a Dealer BlackJack still takes the whole wager.  The Dealer draws no cards
+                    acted[0] |= SURRENDER_FLAG
+                    if dealer_blackjack:
+                        counts['lost'] += 1
+                        earned -= wager
+                    else:
+                        counts['surrender'] += 1
+                        earned += surrender_payout * wager
+                    n_hands = 0  # No hands left to play or settle
+            while hand_idx < n_hands:
+                h = hard[hand_idx]
+                player_value = h + 10 if aces[hand_idx] and h <= 11 else h
+                n = cards[hand_idx]
+                # A two card 21 on the opening hand is settled straight away (verify_blackjack)
+                active = not (hand_idx == 0 and n == 2 and player_value == 21 and n_hands == 1)
+                split_allowed = can_split_rule and n == 2 and n_hands < max_hands and \
+                    max_wager >= at_stake + wagers[hand_idx]
+                while active:
+                    can_double = dd_allowed[hand_idx]
+                    first = firsts[hand_idx]
+                    action = policy(player_value, h <= 11 and aces[hand_idx] > 0,
+                                    first if n == 2 and first == seconds[hand_idx] else 0, upcard, can_double,
+                                    split_allowed)
+                    if action == STAND:
+                        break
+                    if action == SPLIT:
+                        if not split_allowed:
+                            raise ValueError('Policy chose to split when split is not allowed')
+                        # The second card starts a new hand, played last, and both hands draw their second card
+                        dd_allowed[hand_idx] = allow_dd_after_split and dd_allowed[hand_idx]
+                        second = seconds[hand_idx]
+                        card1 = pop() if deck else refill()
+                        card2 = pop() if deck else refill()
+                        h = hard[hand_idx] = (first if first != 11 else 1) + (card1 if card1 != 11 else 1)
+                        aces[hand_idx] = (first == 11) + (card1 == 11)
+                        seconds[hand_idx] = card1
+                        hard[n_hands] = (second if second != 11 else 1) + (card2 if card2 != 11 else 1)
+                        aces[n_hands] = (second == 11) + (card2 == 11)
+                        cards[n_hands] = 2
+                        wagers[n_hands] = wagers[hand_idx]
+                        dd_allowed[n_hands] = dd_allowed[hand_idx]
+                        firsts[n_hands] = second
+                        seconds[n_hands] = card2
+                        acted[hand_idx] |= SPLIT_FLAG
+                        acted[n_hands] = SPLIT_FLAG
+                        at_stake += wagers[hand_idx]
+                        n_hands += 1
+                        player_value = h + 10 if aces[hand_idx] and h <= 11 else h
+                        split_allowed = n_hands < max_hands and max_wager >= at_stake + wagers[hand_idx]
+                        continue
+                    if action == DOUBLE_DOWN:
+                        if not can_double:
+                            raise ValueError('Policy chose to double down when double down is not allowed')
+                        hand_wager = wagers[hand_idx]
+                        wagers[hand_idx] = hand_wager * 2 if max_wager >= at_stake + hand_wager else max_wager
+                        at_stake += wagers[hand_idx] - hand_wager
+                        acted[hand_idx] |= DOUBLE_DOWN_FLAG
+                    elif action != HIT:
+                        raise ValueError('Unknown action from policy: %r' % (action,))
+                    # Hit: one card for the Player and one for the Dealer while the Dealer is below the minimum
+                    card = pop() if deck else refill()
+                    if card == 11:
+                        aces[hand_idx] += 1
+                        card = 1
+                    h += card
+                    n += 1
+                    player_value = h + 10 if aces[hand_idx] and h <= 11 else h
+                    if dealer_on_hit and dealer_draws[d_aces][d_hard]:
+                        card = pop() if deck else refill()
+                        d_cards += 1
+                        if card == 11:
+                            d_aces += 1
+                            card = 1
+                        d_hard += card
+                    split_allowed = False
+                    dd_allowed[hand_idx] = False
+                    if action == DOUBLE_DOWN or player_value > 21:
+                        break
+                hard[hand_idx] = h
+                cards[hand_idx] = n
+                values[hand_idx] = player_value
+                hand_idx += 1
+                # Stand: Dealer hits until the minimum.  With lazy_dealer that waits for the last hand
+                while dealer_draws[d_aces][d_hard] and (dealer_on_hit or hand_idx == n_hands):
+                    card = pop() if deck else refill()
+                    d_cards += 1
+                    if card == 11:
+                        d_aces += 1
+                        card = 1
+                    d_hard += card
+            # The Dealer hand is final once the first hand stands, so all the hands are settled together
+            dealer_value = dealer_values[d_aces][d_hard]
+            for idx in range(n_hands):
+                player_value = values[idx]
+                n = cards[idx]
+                hand_wager = wagers[idx]
+                if player_value == 21 and n == 2 and (dealer_value != 21 or d_cards > 2):
+                    counts['blackjack'] += 1
+                    earned += blackjack_payout * hand_wager
+                elif player_value == dealer_value or (player_value > 21 and dealer_value > 21):
+                    counts['push'] += 1
+                elif player_value > 21:
+                    counts['bust'] += 1
+                    earned -= hand_wager
+                elif dealer_value > 21 or player_value > dealer_value:
+                    counts['won'] += 1
+                    earned += hand_wager
+                else:
+                    counts['lost'] += 1
+                    earned -= hand_wager
+            hands = n_hands or 1  # A surrendered hand was played too
+            if results is not None:
+                # A row per hand.  The first hand's wager earned is what's left of the round's once the other hands
+                # are paid, so it has the insurance, and a surrendered hand was settled before the Dealer drew
+                results.new_round()
+                first_earned = earned
+                for idx in range(1, n_hands):
+                    first_earned -= payouts[hand_result(values[idx], cards[idx], dealer_value, d_cards)] * wagers[idx]
+                for idx in range(hands):
+                    flags = acted[idx]
+                    if n_hands:
+                        player_value = values[idx]
+                        result = hand_result(player_value, cards[idx], dealer_value, d_cards)
+                        if cards[idx] > 2 and not flags & DOUBLE_DOWN_FLAG:
+                            flags |= HIT_FLAG
+                    else:
+                        player_value = hard[0] + 10 if aces[0] and hard[0] <= 11 else hard[0]
+                        result = 'lost' if dealer_value == 21 and d_cards == 2 else 'surrender'
+                    hand_earned = first_earned if idx == 0 else payouts[result] * wagers[idx]
+                    results.add(0, idx, p1, p2, upcard, flags, player_value, dealer_value, result, wager, hand_earned,
+                                rules_code)
+            hands_played += hands
+            net += earned
+            net_squared += earned * earned
+            wagered += wager
+            if counter is not None:
+                count_stats.rounds += 1
+                count_stats.hands += hands
+                count_stats.net += earned
+                count_stats.net_squared += earned * earned
+                count_stats.wagered += wager
+            if session is not None and session.settle(earned):
+                rounds = round_idx + 1
+                break
+        stats.elapsed = time.time() - start
+        stats.rounds = rounds
+        stats.hands = hands_played
+        stats.net = net
+        stats.net_squared = net_squared
+        stats.wagered = wagered
+        if INSTRUMENTATION.enabled:  # The inlined rounds don't go through the instrumented BlackJack methods
+            INSTRUMENTATION.count('simulator_rounds', rounds)
+            INSTRUMENTATION.count('simulator_hands', hands_played)
+            INSTRUMENTATION.count('splits', hands_played - rounds)
+        return stats
+
+
+def simulate(rounds, policy=mimic_dealer, **rules):
+    """Returns SimulationResult for rounds played with policy.  rules are the BlackJack rule arguments"""
+    return Simulator(**rules).run(rounds, policy)
+
+
+def shard_seed(seed, shard):
+    """Returns the seed of the random.Random instance of a shard.  Seeds differ for every (seed, shard)"""
+    return '%d:%d' % (seed, shard)
+
+
+def _run_shard(args):
+    """Returns SimulationResult of one shard.  Runs in a worker process"""
+    seed, shard, rounds, policy, rules = args
+    return Simulator(rng=random.Random(shard_seed(seed, shard)), **rules).run(rounds, policy)
+
+
+def _map_shards(func, shards, workers):
+    """Returns the results of func on every shard, in shard order, from a pool of worker processes.
+    workers is the size of the pool, None for one per CPU, and workers=1 runs the shards in this process instead.
+    """
+    if workers == 1:
+        return map(func, shards)
+    import multiprocessing  # Imported here, only the parallel runs need it and it's slow to import
+    pool = multiprocessing.Pool(workers)
+    try:
+        return pool.map(func, shards)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def run_parallel(rounds, policy=mimic_dealer, workers=None, seed=0, shard_rounds=100000, **rules):
+    """Returns SimulationResult of rounds played across a pool of worker processes.
+    The rounds are split into shards of shard_rounds, each with its own Shoe and random.Random seeded from
+    (seed, shard), and the results are merged in shard order.  So the same seed gives the same results whatever the
+    number of workers.  policy needs to be picklable, a module level function or a BasicStrategy.
+    """
+    shards = []
+    for shard, start in enumerate(range(0, rounds, shard_rounds)):
+        shards.append((seed, shard, min(shard_rounds, rounds - start), policy, rules))
+    start = time.time()
+    stats = SimulationResult()
+    for result in _map_shards(_run_shard, shards, workers):
+        stats.merge(result)
+    stats.elapsed = time.time() - start  # Wall clock time, not the sum over the workers
+    return stats
+
+
+def play_game(game, policy):
+    """Returns the wager earned after playing a dealt BlackJack game to the end with policy.
+    Insurance and surrender are asked of the policy's insurance and surrender methods, as in Simulator.run.
+    """
+    upcard = CARD_VALUES[game.dealer_hand.cards[0]]
+    insure = getattr(policy, 'insurance', None)
+    surrender = getattr(policy, 'surrender', None)
+    if insure is not None or surrender is not None:
+        hand = game.players[0].hand
+        total = hand.value()
+        soft = hand.is_soft()
+        pair = CARD_VALUES[hand.cards[0]] if CARD_VALUES[hand.cards[0]] == CARD_VALUES[hand.cards[1]] else 0
+        if insure is not None and game.can_insure() and insure(total, soft, pair, game.true_count()):
+            game.insurance()
+        if surrender is not None and game.can_surrender() and surrender(total, soft, pair, upcard):
+            game.surrender()
+    hand_idx = 0
+    while hand_idx < len(game.players):
+        player = game.players[hand_idx]
+        while player.active:
+            hand = player.hand
+            total = hand.value()
+            soft = hand.is_soft()
+            pair = CARD_VALUES[hand.cards[0]] if len(hand) == 2 and \
+                CARD_VALUES[hand.cards[0]] == CARD_VALUES[hand.cards[1]] else 0
+            action = policy(total, soft, pair, upcard, player.allow_dd, game.can_split(hand_idx))
+            if action == HIT:
+                game.hit(hand_idx)
+            elif action == STAND:
+                game.stand(hand_idx)
+            elif action == DOUBLE_DOWN:
+                if not game.double_down(hand_idx):
+                    raise ValueError('Policy chose to double down when double down is not allowed')
+            elif action == SPLIT:
+                if not game.split(hand_idx):
+                    raise ValueError('Policy chose to split when split is not allowed')
+            else:
+                raise ValueError('Unknown action from policy: %r' % (action,))
+        hand_idx += 1
+    return game.wager_earned
+
+
+def what_if(game, action, policy=mimic_dealer, hand_idx=0):
+    """Returns the wager earned by the round if the hand played action now and the round went on with policy,
+    against the cards actually left in the shoe.  The game is rewound afterwards (see BlackJack.snapshot), so it can
+    be asked of every action before playing one.
+    """
+    snapshot = game.snapshot()
+    try:
+        if action in (HIT, STAND):
+            getattr(game, action)(hand_idx)
+        elif action in (DOUBLE_DOWN, SPLIT):
+            if not getattr(game, action)(hand_idx):
+                raise ValueError('%s is not allowed' % action)
+        else:
+            raise ValueError('Unknown action: %r' % (action,))
+        return play_game(game, policy)
+    finally:
+        game.restore(snapshot)
+
+
+if __name__ == '__main__':
+    enable_from_environment()  # Dumps counters and timings at exit when CARD_GAMES_INSTRUMENT is set
+    rounds = int(sys.argv[1]) if len(sys.argv) >= 2 else 200000
+    start = time.time()
+    for _ in range(rounds // 10):
+        play_game(BlackJack(), mimic_dealer)
+    baseline = (rounds // 10) / (time.time() - start)
+    stats = simulate(rounds)
+    print(stats)
+    print('BlackJack() per round: %d rounds/sec' % baseline)
+    print('Simulator:             %d rounds/sec (%.1fx)' % (stats.rounds_per_second, stats.rounds_per_second / baseline))
@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+"""
+Basic strategy for the BlackJack rules.
+
+generate_strategy computes the expected value of standing, hitting, doubling down and splitting for every player
+hand (total, soft, pair) against every Dealer up card, using the exact Dealer outcome probabilities from dealer.py.
+The player's draws come from the shoe less the up card.  The rules are those of BlackJack: a two card 21 pays
+blackjack_payout (also after a split) unless the Dealer has 21 in two cards, the hand is a push when both Player and
+Dealer bust, and with dealer_hits_soft_17 the Dealer draws on a soft dealer_min.
+
+With allow_surrender, the opening hands where late surrender (half the wager, unless the Dealer has a BlackJack)
+beats every other action are kept too, and with allow_insurance whether insurance pays against an Ace from the full
+shoe.  A split is priced as a single split, re-splits are not, so max_hands over 2 raises ValueError.
+
+A BasicStrategy is a player policy, so it plays through simulation.play_game and the Simulator, which ask its
+surrender and insurance methods.  Tables are saved to disk keyed by the rules, so they are computed once per
+configuration.
+"""
+from __future__ import print_function, division
+import hashlib
+import json
+import os
+try:
+    from .blackjack import HIT, STAND, DOUBLE_DOWN, SPLIT
+    from .dealer import BUST, CARD_RANKS, HARD_RANKS, INFINITE_DECK, dealer_probabilities, shoe_composition
+    from .hand import hand_value
+    from .rules import INSURANCE_PAYOUT, PAYOUTS
+except (ImportError, ValueError):
+    from blackjack import HIT, STAND, DOUBLE_DOWN, SPLIT
+    from dealer import BUST, CARD_RANKS, HARD_RANKS, INFINITE_DECK, dealer_probabilities, shoe_composition
+    from hand import hand_value
+    from rules import INSURANCE_PAYOUT, PAYOUTS
+
+DEFAULT_CACHE_DIR = os.environ.get('CARD_GAMES_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'card_games'))
+_strategies = {}  # BasicStrategy by rules, for this process
+
+
+class BasicStrategy(object):
+    """Best action by (total, soft, pair, upcard), ranked so the best available action is found in constant time"""
+
+    def __init__(self, rules, table, evs=None, surrenders=(), insure=False):
+        """Returns None.  table maps (total, soft, pair, upcard) to actions ranked best first, evs to their EVs.
+        surrenders are the (total, soft, pair, upcard) of the opening hands to surrender, insure whether to take
+        insurance.
+        """
+        self.rules = rules
+        self.table = table
+        self.evs = evs or {}
+        self.surrenders = frozenset(surrenders)
+        self.insure = insure
+
+    def __call__(self, total, soft, pair, upcard, can_double, can_split):
+        """Returns the best action that's allowed.  Same arguments as the Simulator policies"""
+        actions = self.table.get((total, soft, pair, upcard)) or self.table[(total, soft, 0, upcard)]
+        for action in actions:
+            if action == DOUBLE_DOWN and not can_double or action == SPLIT and not can_split:
+                continue
+            return action
+
+    lookup = __call__
+
+    def surrender(self, total, soft, pair, upcard):
+        """Returns True when surrendering the opening hand beats playing it"""
+        key = (total, soft, pair, upcard)
+        if key not in self.table:
+            key = (total, soft, 0, upcard)
+        return key in self.surrenders
+
+    def insurance(self, total, soft, pair, true_count):
+        """Returns True when insurance pays against the full shoe, the count is not used"""
+        return self.insure
+
+    def to_json(self):
+        return {
+            'rules': self.rules,
+            'table': [[total, soft, pair, upcard, list(actions), list(self.evs.get((total, soft, pair, upcard), ()))]
+                      for (total, soft, pair, upcard), actions in sorted(self.table.items())],
+            'surrenders': [list(key) for key in sorted(self.surrenders)],
+            'insure': self.insure,
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        table = {}
+        evs = {}
+        for total, soft, pair, upcard, actions, action_evs in data['table']:
+            key = (total, soft, pair, upcard)
+            table[key] = tuple(str(action) for action in actions)
+            evs[key] = tuple(action_evs)
+        return cls(data['rules'], table, evs, [tuple(key) for key in data['surrenders']], data['insure'])
+
+
+def _rules(dealer_min, allow_soft_limit, allow_split, allow_dd, allow_dd_after_split, decks, allow_surrender,
+           allow_insurance, dealer_hits_soft_17, blackjack_payout, max_hands):
+    """Returns the rules as a dict, every rule of a RuleSet that the strategy depends on"""
+    if max_hands != 2:
+        raise ValueError('Basic strategy prices a single split, not max_hands=%r' % (max_hands,))
+    return {
+        'dealer_min': dealer_min,
+        'allow_soft_limit': allow_soft_limit,
+        'dealer_hits_soft_17': dealer_hits_soft_17,
+        'allow_split': allow_split,
+        'allow_dd': allow_dd,
+        'allow_dd_after_split': allow_dd_after_split,
+        'decks': decks,
+        'allow_surrender': allow_surrender,
+        'allow_insurance': allow_insurance,
+        'blackjack_payout': blackjack_payout,
+        'max_hands': max_hands,
+    }
+
+
+def _rules_key(rules):
+    """Returns a short digest of the rules for file names"""
+    return hashlib.sha1(json.dumps(rules, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+class _UpcardEVs(object):
+    """Expected values of the Player hands against one Dealer up card"""
+
+    def __init__(self, upcard, rules):
+        self.upcard = upcard
+        self.rules = rules
+        decks = rules['decks']
+        composition = None if decks is None else shoe_composition(decks)
+        weights = list(INFINITE_DECK if composition is None else composition)
+        if composition is not None:
+            weights[upcard - 2] -= 1  # The up card is out of the shoe
+        total = sum(weights)
+        self.draws = [(HARD_RANKS[rank], rank == 9, weight / total) for rank, weight in enumerate(weights) if weight]
+        dealer = dealer_probabilities(upcard, rules['dealer_min'], rules['allow_soft_limit'], decks, composition,
+                                      rules['dealer_hits_soft_17'])
+        # Chance of a Dealer two card 21: the hole card makes 21 with the up card
+        hole = {10: 11, 11: 10}.get(upcard)
+        self.dealer_blackjack = weights[hole - 2] / total if hole else 0.0
+        self.bust_ev = -(1 - dealer[BUST])  # Both bust is a push
+        self.blackjack_ev = rules['blackjack_payout'] * (1 - self.dealer_blackjack)
+        self.surrender_ev = PAYOUTS['surrender'] * (1 - self.dealer_blackjack) - self.dealer_blackjack
+        self.insurance_ev = INSURANCE_PAYOUT * self.dealer_blackjack - (1 - self.dealer_blackjack)  # Per unit insured
+        self.stand_evs = [dealer[BUST] + sum(dealer[value] * ((player > value) - (player < value))
+                                             for value in range(BUST)) for player in range(BUST)]
+        self._hit_evs = {}
+
+    def _after_card(self, hard, ace):
+        """Returns the value, or None if bust, of the hand after a card"""
+        value = hand_value(hard, ace)
+        return None if value > 21 else value
+
+    def stand(self, value):
+        return self.stand_evs[value]
+
+    def hit(self, hard, ace):
+        """Returns the EV of hitting and then playing on with hit or stand"""
+        key = (hard, ace)
+        if key not in self._hit_evs:
+            ev = 0.0
+            for card_hard, card_ace, probability in self.draws:
+                value = self._after_card(hard + card_hard, ace or card_ace)
+                if value is None:
+                    ev += probability * self.bust_ev
+                else:
+                    ev += probability * max(self.stand(value), self.hit(hard + card_hard, ace or card_ace))
+            self._hit_evs[key] = ev
+        return self._hit_evs[key]
+
+    def double_down(self, hard, ace):
+        """Returns the EV of doubling the wager and drawing one card"""
+        ev = 0.0
+        for card_hard, card_ace, probability in self.draws:
+            value = self._after_card(hard + card_hard, ace or card_ace)
+            ev += probability * (self.bust_ev if value is None else self.stand(value))
+        return 2 * ev
+
+    def split_hand(self, card_hard, card_ace):
+        """Returns the EV of one hand after a split, starting with the card and drawing the second card"""
+        allow_dd = self.rules['allow_dd'] and self.rules['allow_dd_after_split']
+        ev = 0.0
+        for draw_hard, draw_ace, probability in self.draws:
+            hard = card_hard + draw_hard
+            ace = card_ace or draw_ace
+            value = hand_value(hard, ace)
+            if value == 21:
+                ev += probability * self.blackjack_ev  # A two card 21 pays as a BlackJack after a split too
+                continue
+            best = max(self.stand(value), self.hit(hard, ace))
+            if allow_dd:
+                best = max(best, self.double_down(hard, ace))
+            ev += probability * best
+        return ev
+
+    def split(self, card_hard, card_ace):
+        return 2 * self.split_hand(card_hard, card_ace)
+
+
+def _rank(evs):
+    """Returns the actions sorted by EV, best first"""
+    return tuple(action for action, ev in sorted(evs.items(), key=lambda item: -item[1]))
+
+
+def generate_strategy(dealer_min=17, allow_soft_limit=True, allow_split=True, allow_dd=True, allow_dd_after_split=True,
+                      decks=1, allow_surrender=False, allow_insurance=False, dealer_hits_soft_17=False,
+                      blackjack_payout=PAYOUTS['blackjack'], max_hands=2):
+    """Returns the BasicStrategy computed for the rules.  decks=None uses an infinite deck"""
+    rules = _rules(dealer_min, allow_soft_limit, allow_split, allow_dd, allow_dd_after_split, decks, allow_surrender,
+                   allow_insurance, dealer_hits_soft_17, blackjack_payout, max_hands)
+    table = {}
+    evs = {}
+    surrenders = []
+    insure = False
+    for upcard in CARD_RANKS:
+        upcard_evs = _UpcardEVs(upcard, rules)
+        if allow_insurance and upcard == 11:
+            insure = upcard_evs.insurance_ev > 0
+        hands = [(hard, False) for hard in range(4, 22)] + [(hard, True) for hard in range(2, 12)]
+        for hard, ace in hands:
+            value = hand_value(hard, ace)
+            soft = ace and hard <= 11
+            action_evs = {STAND: upcard_evs.stand(value), HIT: upcard_evs.hit(hard, ace)}
+            if allow_dd:
+                action_evs[DOUBLE_DOWN] = upcard_evs.double_down(hard, ace)
+            key = (value, soft, 0, upcard)
+            table[key] = _rank(action_evs)
+            evs[key] = tuple(action_evs[action] for action in table[key])
+            if allow_surrender and upcard_evs.surrender_ev > max(action_evs.values()):
+                surrenders.append(key)
+        if allow_split:
+            for pair, card_hard in zip(CARD_RANKS, HARD_RANKS):
+                ace = pair == 11
+                hard = 2 * card_hard
+                value = hand_value(hard, ace)
+                action_evs = {STAND: upcard_evs.stand(value), HIT: upcard_evs.hit(hard, ace),
+                              SPLIT: upcard_evs.split(card_hard, ace)}
+                if allow_dd:
+                    action_evs[DOUBLE_DOWN] = upcard_evs.double_down(hard, ace)
+                key = (value, ace, pair, upcard)
+                table[key] = _rank(action_evs)
+                evs[key] = tuple(action_evs[action] for action in table[key])
+                if allow_surrender and upcard_evs.surrender_ev > max(action_evs.values()):
+                    surrenders.append(key)
+    return BasicStrategy(rules, table, evs, surrenders, insure)
+
+
+def basic_strategy(dealer_min=17, allow_soft_limit=True, allow_split=True, allow_dd=True, allow_dd_after_split=True,
+                   decks=1, cache_dir=DEFAULT_CACHE_DIR, allow_surrender=False, allow_insurance=False,
+                   dealer_hits_soft_17=False, blackjack_payout=PAYOUTS['blackjack'], max_hands=2):
+    """Returns the BasicStrategy for the rules, loaded from cache_dir when it has been computed before.
+    cache_dir=None skips the disk cache.
+    """
+    rules = _rules(dealer_min, allow_soft_limit, allow_split, allow_dd, allow_dd_after_split, decks, allow_surrender,
+                   allow_insurance, dealer_hits_soft_17, blackjack_payout, max_hands)
+    key = _rules_key(rules)
+    if key in _strategies:
+        return _strategies[key]
+    path = os.path.join(cache_dir, 'strategy-%s.json' % key) if cache_dir else None
+    strategy = None
+    if path and os.path.exists(path):
+        try:
+            with open(path) as cache_file:
+                strategy = BasicStrategy.from_json(json.load(cache_file))
+        except (IOError, OSError, ValueError, KeyError):
+            strategy = None  # Unreadable cache, compute it again
+        if strategy is not None and strategy.rules != rules:
+            strategy = None
+    if strategy is None:
+        strategy = generate_strategy(**rules)
+        if path:
+            if not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir)
+            temp_path = '%s.%d.tmp' % (path, os.getpid())
+            with open(temp_path, 'w') as cache_file:
+                json.dump(strategy.to_json(), cache_file)
+            os.rename(temp_path, path)  # Other processes never see a partly written table
+    _strategies[key] = strategy
+    return strategy
+
+
+def strategy_for_game(game, cache_dir=DEFAULT_CACHE_DIR):
+    """Returns the BasicStrategy for the rules of a freshly dealt BlackJack game"""
+    rules = game.rules
+    return basic_strategy(rules.dealer_min, rules.allow_soft_limit, rules.allow_split, game.players[0].allow_dd,
+                          rules.allow_dd_after_split, game.shoe.decks, cache_dir, rules.allow_surrender,
+                          rules.allow_insurance, rules.dealer_hits_soft_17, rules.blackjack_payout, rules.max_hands)
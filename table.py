@@ -0,0 +1,298 @@
+#!/usr/bin/env python
+"""
+A BlackJack table: many seats playing against one Dealer hand dealt from one shared Shoe.
+
+Each Seat has its own wager and rules (split, double down, double down after split), the Table has the Dealer rules
+and payouts, as a rules.RuleSet.
+Cards are dealt as at a casino table, one card at a time to every seat and then the Dealer, twice.  Seats play
+their hands with the same actions as BlackJack.  The Dealer draws only once every hand at the table is finished, and
+all the seats are settled against that one Dealer hand in a single pass.  Unlike BlackJack, the Dealer does not draw
+a card when a Player hits.
+
+simulate_table plays rounds with a policy per seat and returns a simulation.SimulationResult per seat, and can add a
+row per hand to a results.ResultColumns.
+"""
+from __future__ import print_function
+import time
+try:
+    from .blackjack import Player, HIT, STAND, DOUBLE_DOWN, SPLIT, hand_result
+    from .cards import CARD_VALUES
+    from .hand import Hand
+    from .results import ACTION_FLAGS, SPLIT_FLAG
+    from .rules import RuleSet
+    from .shoe import Shoe, CUT_CARD
+    from .simulation import SimulationResult
+except (ImportError, ValueError):
+    from blackjack import Player, HIT, STAND, DOUBLE_DOWN, SPLIT, hand_result
+    from cards import CARD_VALUES
+    from hand import Hand
+    from results import ACTION_FLAGS, SPLIT_FLAG
+    from rules import RuleSet
+    from shoe import Shoe, CUT_CARD
+    from simulation import SimulationResult
+
+
+class Seat(object):
+    """A Player at the Table with its wager, rules and the hands (Players, as in BlackJack) of the current round"""
+
+    def __init__(self, wager=1, max_wager=1, allow_split=True, allow_dd=True, allow_dd_after_split=True):
+        self.wager = wager
+        self.max_wager = max_wager
+        self.allow_split = allow_split
+        self.allow_dd = allow_dd
+        self.allow_dd_after_split = allow_dd_after_split
+        self.players = []
+        self.split_allowed = False  # Split is still allowed this round
+        self.wager_earned = 0
+
+    def start_round(self):
+        """Returns None.  Clears the hands of the last round"""
+        self.players = [Player(self.wager, self.allow_dd)]
+        self.split_allowed = self.allow_split
+        self.wager_earned = 0
+
+    def can_split(self):
+        """Returns True when the hand can be split now"""
+        return self.split_allowed and len(self.players) == 1 and self.players[0].active and \
+            self.max_wager >= self.players[0].wager * 2
+
+    def is_active(self):
+        """Returns True while a hand of the seat still has to be played"""
+        for player in self.players:
+            if player.active:
+                return True
+        return False
+
+
+class Table(object):
+    """Seats playing BlackJack against one Dealer hand"""
+
+    def __init__(self, seats=1, dealer_min=17, allow_soft_limit=True, decks=6, penetration=0.75, reshuffle=CUT_CARD,
+                 shoe=None, rng=None, shuffler=None, rules=None):
+        """Returns None.  seats is a list of Seat, or the number of seats with the default wager and rules.
+        The rounds are dealt from shoe, by default a new Shoe of decks with penetration, reshuffle, rng and shuffler.
+        rules, a rules.RuleSet, gives the Dealer rules, payouts and decks instead of dealer_min, allow_soft_limit and
+        decks, as in BlackJack.  The split and double down rules of the RuleSet are replaced by those of each Seat.
+        A Table plays a single split, without surrender or insurance, so other rules raise ValueError.
+        """
+        if rules is None:
+            rules = RuleSet(decks, dealer_min=dealer_min, allow_soft_limit=allow_soft_limit)
+        if rules.max_hands != 2 or rules.allow_surrender or rules.allow_insurance:
+            raise ValueError('A Table plays a single split, without surrender or insurance: %r' % (rules,))
+        if isinstance(seats, int):
+            seats = [Seat() for _ in range(seats)]
+        if not seats:
+            raise ValueError('A Table needs at least one seat')
+        self.seats = list(seats)
+        self.rules = rules
+        self.dealer_min = rules.dealer_min
+        self.allow_soft_limit = rules.allow_soft_limit
+        if shoe is None:
+            shoe = Shoe(rules.decks, penetration, reshuffle, rng=rng, shuffler=shuffler)
+        self.shoe = shoe
+        self.dealer_hand = Hand()
+        self.settled = True  # No round in play
+
+    def deal(self):
+        """Returns None.  Starts a round: two cards to every seat and to the Dealer, one card at a time.
+        A two card 21 is finished straight away, and is settled with the rest of the table.
+        """
+        self.shoe.start_round()  # Shuffles the shoe if the cut card has come out
+        draw = self.shoe.draw
+        self.dealer_hand = Hand()
+        self.settled = False
+        for seat in self.seats:
+            seat.start_round()
+        for _ in range(2):
+            for seat in self.seats:
+                seat.players[0].hand.add(draw())
+            self.dealer_hand.add(draw())
+        for seat in self.seats:
+            player = seat.players[0]
+            if player.hand.value() == 21:
+                player.active = False
+        self._settle_if_done()
+
+    def get_dealer_upcard(self):
+        """Returns the first Dealer Card as Dealer Up Card"""
+        return self.dealer_hand[0]
+
+    def dealer_hand_value(self):
+        """Returns Dealer Hand Value"""
+        return self.dealer_hand.value(self.allow_soft_limit)
+
+    def player_hand_value(self, seat_idx, hand_idx=0):
+        """Returns the value of a hand of a seat"""
+        return self.seats[seat_idx].players[hand_idx].hand.value()
+
+    def hit(self, seat_idx, hand_idx=0):
+        """Returns None.  Draws a card for the hand, which is finished if it goes bust"""
+        seat = self.seats[seat_idx]
+        player = seat.players[hand_idx]
+        if not player.active:
+            return None
+        player.hand.add(self.shoe.draw())
+        player.allow_dd = False  # Don't allow double down after the first hit
+        seat.split_allowed = False  # Don't allow split after the first hit
+        if player.hand.value() > 21:
+            self._finish(player)
+        return None
+
+    def stand(self, seat_idx, hand_idx=0):
+        """Returns None.  The hand is finished, it's settled once every hand at the table is finished"""
+        player = self.seats[seat_idx].players[hand_idx]
+        if player.active:
+            self._finish(player)
+        return None
+
+    def double_down(self, seat_idx, hand_idx=0):
+        '''Returns True if double down was successful else returns False'''
+        seat = self.seats[seat_idx]
+        player = seat.players[hand_idx]
+        if not (player.allow_dd and player.active):
+            return False
+        wager_required = sum(hand.wager for hand in seat.players) + player.wager
+        if seat.max_wager >= wager_required:
+            player.wager = player.wager * 2
+        else:
+            player.wager = seat.max_wager  # Double down what ever is remaining
+        player.hand.add(self.shoe.draw())
+        player.allow_dd = False
+        seat.split_allowed = False
+        self._finish(player)
+        return True
+
+    def split(self, seat_idx):
+        '''Splits the hand of the seat into two hands when 2 x wager is less than max and splits allowed'''
+        seat = self.seats[seat_idx]
+        if not seat.can_split():
+            seat.split_allowed = False
+            return False
+        first = seat.players[0]
+        if not seat.allow_dd_after_split:
+            first.allow_dd = False
+        second = Player(first.wager, first.allow_dd)
+        second.hand.append(first.hand.pop())  # The second card starts the split hand
+        seat.players.append(second)
+        first.hand.add(self.shoe.draw())
+        second.hand.add(self.shoe.draw())
+        seat.split_allowed = False  # No more split allowed
+        return True
+
+    def _finish(self, player):
+        player.active = False
+        self._settle_if_done()
+
+    def _settle_if_done(self):
+        for seat in self.seats:
+            if seat.is_active():
+                return None
+        self.settle()
+
+    def settle(self):
+        """Returns None.  Draws the Dealer hand to the minimum once and settles every hand at the table against it.
+        Called when the last hand at the table is finished.  Hands still in play are settled as they stand.
+        """
+        if self.settled:
+            return None
+        draw = self.shoe.draw
+        dealer_hand = self.dealer_hand
+        dealer_draws = self.rules.dealer_draws
+        # Dealer has to hit until it's atleast Dealer Min (Default 17), and on a soft 17 if the Dealer hits it
+        while dealer_draws[dealer_hand.aces][dealer_hand.hard]:
+            dealer_hand.add(draw())
+        dealer_value = dealer_hand.value(self.allow_soft_limit)
+        dealer_cards = len(dealer_hand)
+        payouts = self.rules.payouts
+        for seat in self.seats:
+            for player in seat.players:
+                player.result = hand_result(player.hand.value(), len(player.hand), dealer_value, dealer_cards)
+                seat.wager_earned += payouts[player.result] * player.wager
+                player.active = False
+        self.settled = True
+        return None
+
+    def seat_rules(self, seat):
+        """Returns the RuleSet of the rules a seat plays by"""
+        return self.rules.replace(decks=self.shoe.decks, allow_split=seat.allow_split, allow_dd=seat.allow_dd,
+                                  allow_dd_after_split=seat.allow_dd_after_split)
+
+    def play_round(self, policies, results=None):
+        """Returns the wager earned by each seat after dealing a round and playing it with a policy per seat.
+        policies is a list with a policy for each seat, called like the simulation policies.
+        results, a results.ResultColumns, gets a row for every hand played.
+        """
+        self.deal()
+        upcard = CARD_VALUES[self.dealer_hand.cards[0]]
+        acted = [[0, 0] for _ in self.seats] if results is not None else None  # ACTION_FLAGS by seat and hand
+        for seat_idx, seat in enumerate(self.seats):
+            policy = policies[seat_idx]
+            hand_idx = 0
+            while hand_idx < len(seat.players):
+                player = seat.players[hand_idx]
+                while player.active:
+                    hand = player.hand
+                    cards = hand.cards
+                    pair = CARD_VALUES[cards[0]] if len(cards) == 2 and \
+                        CARD_VALUES[cards[0]] == CARD_VALUES[cards[1]] else 0
+                    action = policy(hand.value(), hand.is_soft(), pair, upcard, player.allow_dd, seat.can_split())
+                    if action == HIT:
+                        self.hit(seat_idx, hand_idx)
+                    elif action == STAND:
+                        self.stand(seat_idx, hand_idx)
+                    elif action == DOUBLE_DOWN:
+                        if not self.double_down(seat_idx, hand_idx):
+                            raise ValueError('Policy chose to double down when double down is not allowed')
+                    elif action == SPLIT:
+                        if not self.split(seat_idx):
+                            raise ValueError('Policy chose to split when split is not allowed')
+                    else:
+                        raise ValueError('Unknown action from policy: %r' % (action,))
+                    if acted is not None:
+                        acted[seat_idx][hand_idx] |= ACTION_FLAGS.get(action, 0)  # Stand has no flag
+                        if action == SPLIT:
+                            acted[seat_idx][1] = SPLIT_FLAG
+                hand_idx += 1
+        if results is not None:
+            self._add_results(results, upcard, acted)
+        return [seat.wager_earned for seat in self.seats]
+
+    def _add_results(self, results, upcard, acted):
+        """Returns None.  Adds a row per hand of the settled round to results"""
+        results.new_round()
+        dealer_value = self.dealer_hand_value()
+        dealer_cards = len(self.dealer_hand)
+        for seat_idx, seat in enumerate(self.seats):
+            rules_code = results.rules_code(self.seat_rules(seat))
+            opening = seat.players[0].hand.cards
+            first = CARD_VALUES[opening[0]]
+            # After a split the opening second card starts the second hand
+            second = CARD_VALUES[seat.players[1].hand.cards[0] if len(seat.players) > 1 else opening[1]]
+            for hand_idx, player in enumerate(seat.players):
+                results.add(seat_idx, hand_idx, first, second, upcard, acted[seat_idx][hand_idx], player.hand.value(),
+                            dealer_value, player.result, seat.wager, self.rules.payouts[player.result] * player.wager,
+                            rules_code)
+
+
+def simulate_table(rounds, policies, seats=None, results=None, **rules):
+    """Returns a SimulationResult per seat after playing rounds at a Table.
+    policies is a list with a policy for each seat.  seats is a list of Seat, by default one default Seat per policy.
+    results, a results.ResultColumns, gets a row for every hand played.  rules are the other Table arguments.
+    """
+    table = Table(seats if seats is not None else len(policies), **rules)
+    stats = [SimulationResult() for _ in table.seats]
+    start = time.time()
+    for _ in range(rounds):
+        earned = table.play_round(policies, results)
+        for seat, seat_stats, seat_earned in zip(table.seats, stats, earned):
+            seat_stats.net += seat_earned
+            seat_stats.net_squared += seat_earned * seat_earned
+            seat_stats.hands += len(seat.players)
+            seat_stats.wagered += seat.wager
+            for player in seat.players:
+                seat_stats.counts[player.result] += 1
+    elapsed = time.time() - start
+    for seat_stats in stats:
+        seat_stats.rounds = rounds
+        seat_stats.elapsed = elapsed
+    return stats
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""
+Test code for bankroll sessions.  Test can be run from command line: python test_bankroll.py
+"""
+from __future__ import print_function, division
+import random
+import unittest
+from bankroll import (BankrollResult, Distribution, FlatBet, Martingale, ProportionalBet, Session, format_result,
+                      run_bankroll_parallel, simulate_bankroll)
+from simulation import Simulator, always_stand, mimic_dealer
+
+
+class TestDistribution(unittest.TestCase):
+
+    def test_statistics(self):
+        distribution = Distribution()
+        for value in range(1, 101):
+            distribution.add(value)
+        self.assertEqual(distribution.mean, 50.5)
+        self.assertAlmostEqual(distribution.std, 29.0115, places=4)
+        self.assertEqual((distribution.min, distribution.max), (1, 100))
+        self.assertEqual(distribution.quantile(0.5), 50)
+        self.assertEqual(distribution.quantile(0.99), 99)
+        self.assertEqual(distribution.quantile(1), 100)
+        self.assertEqual(distribution.quantiles((0.25, 0.75)), {0.25: 25, 0.75: 75})
+
+    def test_constant_memory(self):
+        distribution = Distribution(0.5)
+        for _ in range(10000):
+            distribution.add(random.choice([0.5, 1.0, 1.5]))
+        self.assertEqual(len(distribution.counts), 3)
+        self.assertEqual(distribution.count, 10000)
+
+    def test_merge(self):
+        first, second, both = Distribution(), Distribution(), Distribution()
+        for value in range(10):
+            (first if value % 2 else second).add(value)
+            both.add(value)
+        first.merge(second)
+        self.assertEqual((first.counts, first.count, first.total), (both.counts, both.count, both.total))
+        self.assertRaises(ValueError, first.merge, Distribution(0.01))
+
+
+class TestSession(unittest.TestCase):
+
+    def test_bet_capped(self):
+        session = Session(bankroll=5, betting=FlatBet(10), max_wager=20)
+        self.assertEqual(session.bet(), (5, 5))  # The bankroll caps both
+        session = Session(bankroll=50, betting=FlatBet(10), max_wager=20)
+        self.assertEqual(session.bet(), (10, 20))
+
+    def test_outcomes(self):
+        session = Session(bankroll=10, stop_loss=5, win_goal=5)
+        self.assertFalse(session.settle(-4))
+        self.assertTrue(session.settle(-1))
+        self.assertEqual(session.outcome, 'stop_loss')
+        self.assertEqual(session.low, 5)
+        session = Session(bankroll=10, win_goal=5)
+        self.assertTrue(session.settle(5))
+        self.assertEqual(session.outcome, 'win_goal')
+        session = Session(bankroll=2)
+        self.assertTrue(session.settle(-1.5))
+        self.assertEqual(session.outcome, 'ruined')
+        session = Session(bankroll=10, max_rounds=2)
+        self.assertFalse(session.settle(0))
+        self.assertTrue(session.settle(0))
+        self.assertEqual(session.outcome, 'max_rounds')
+        self.assertEqual(Session(bankroll=0.5).outcome, 'ruined')
+
+    def test_betting(self):
+        session = Session(bankroll=100, betting=Martingale(1, max_bet=4))
+        self.assertEqual(session.bet()[0], 1)
+        for wager in (2, 4, 4):
+            session.settle(-session.wager)
+            self.assertEqual(session.bet()[0], wager)
+        session.settle(session.wager)
+        self.assertEqual(session.bet()[0], 1)
+        self.assertEqual(ProportionalBet(0.1)(Session(bankroll=55)), 5)
+        self.assertEqual(ProportionalBet(0.1)(Session(bankroll=5)), 1)
+
+    def test_simulator_stops(self):
+        session = Session(bankroll=3)
+        stats = Simulator(rng=random.Random(1)).run(100000, always_stand, session)
+        self.assertEqual(session.outcome, 'ruined')
+        self.assertEqual(stats.rounds, session.rounds)
+        self.assertAlmostEqual(3 + stats.net, session.bankroll)
+
+
+class TestSimulateBankroll(unittest.TestCase):
+
+    def test_ruin(self):
+        result = simulate_bankroll(500, always_stand, bankroll=10, max_rounds=2000, rng=random.Random(2))
+        self.assertEqual(result.sessions, 500)
+        self.assertEqual(sum(result.outcomes.values()), 500)
+        self.assertGreater(result.risk_of_ruin, 0.9)  # Standing loses about 16% a round
+        self.assertLessEqual(result.lengths.max, 2000)
+        self.assertLess(result.bankrolls.quantile(0.5), 1)
+        self.assertIn('Risk of ruin', format_result(result))
+
+    def test_goals(self):
+        result = simulate_bankroll(300, mimic_dealer, betting=Martingale(1, 16), bankroll=50, stop_loss=20,
+                                   win_goal=10, max_rounds=10000, decks=6, rng=random.Random(3))
+        self.assertEqual(result.outcomes['max_rounds'], 0)
+        self.assertGreater(result.outcomes['win_goal'], 0)
+        self.assertGreater(result.outcomes['stop_loss'], 0)
+        self.assertGreaterEqual(result.lows.min, 50 - 20 - 16 * 4)  # A split and doubled Martingale bet at most
+        self.assertLessEqual(len(result.lengths.counts), 10000)
+
+    def test_parallel(self):
+        serial = run_bankroll_parallel(400, always_stand, workers=1, seed=4, batch_sessions=100, bankroll=20,
+                                       max_rounds=200)
+        parallel = run_bankroll_parallel(400, always_stand, workers=2, seed=4, batch_sessions=100, bankroll=20,
+                                         max_rounds=200)
+        self.assertEqual(parallel.sessions, 400)
+        self.assertEqual((serial.outcomes, serial.lengths.counts, serial.bankrolls.counts),
+                         (parallel.outcomes, parallel.lengths.counts, parallel.bankrolls.counts))
+
+    def test_merge(self):
+        first = simulate_bankroll(50, always_stand, bankroll=5, max_rounds=50)
+        second = simulate_bankroll(70, always_stand, bankroll=5, max_rounds=50)
+        merged = BankrollResult().merge(first).merge(second)
+        self.assertEqual(merged.sessions, 120)
+        self.assertEqual(merged.rounds, first.rounds + second.rounds)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+"""
+Test code for the benchmark suite.  Test can be run from command line: python test_benchmark.py
+"""
+from __future__ import print_function
+import json
+import sys
+import unittest
+from benchmark import (BENCHMARKS, STARTUP_BUDGET, check_startup, format_results, format_startup, percentile,
+                       run_benchmarks, run_startup)
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_run(self):
+        run = run_benchmarks(number=200)
+        self.assertEqual(set(run['benchmarks']), set(benchmark.name for benchmark in BENCHMARKS))
+        for result in run['benchmarks'].values():
+            self.assertGreater(result['ops_per_sec'], 0)
+            self.assertTrue(0 < result['p50_us'] <= result['p90_us'] <= result['p99_us'])
+        self.assertEqual(json.loads(json.dumps(run)), run)  # Results can be saved as JSON
+
+    def test_only_and_compare(self):
+        run = run_benchmarks(number=100, only=['hit', 'stand'])
+        self.assertEqual(sorted(run['benchmarks']), ['hit', 'stand'])
+        table = format_results(run, baseline=run)
+        self.assertIn('+0.0%', table)
+        self.assertRaises(ValueError, run_benchmarks, 10, 0, ['fold'])
+
+    def test_percentile(self):
+        samples = list(range(101))
+        self.assertEqual([percentile(samples, fraction) for fraction in (0.5, 0.9, 0.99)], [50, 90, 99])
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+    @unittest.skipIf(sys.version_info < (3, 7), 'No module __getattr__, the package imports every export eagerly')
+    def test_startup(self):
+        """The exports are only lazy from Python 3.7, which has module __getattr__"""
+        result = run_startup(runs=3)
+        self.assertEqual(result['loaded'], [])  # NumPy, the simulators etc are only imported when used
+        self.assertEqual(result['cli_loaded'], [])  # Nor does the command line game without a history file
+        self.assertEqual(result['strategy_loaded'], [])  # Basic strategy doesn't need NumPy either
+        self.assertIn('first_round_ms', format_startup(result))
+
+    def test_startup_over_budget(self):
+        result = {'package': 'card_games', 'import_ms': STARTUP_BUDGET['import_ms'] + 1, 'first_round_ms': 0.1,
+                  'loaded': ['numpy'], 'cli_loaded': [], 'strategy_loaded': []}
+        self.assertEqual(check_startup(result), ['import_ms %.2f is over the budget of %.2f' % (
+            STARTUP_BUDGET['import_ms'] + 1, STARTUP_BUDGET['import_ms']), 'importing card_games loaded numpy'])
+
+if __name__ == '__main__':
+    unittest.main()
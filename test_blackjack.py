@@ -5,8 +5,24 @@ Test code for blackjack game.  Test can be run from command line: python test_bl
 Due to the randomness of the cards drawn, many of the runs try multiple times to hit the test condition and avoid 'BlackJack'.
 """
 from __future__ import print_function
+import random
 import unittest
-from blackjack import BlackJack
+from blackjack import BlackJack, DOUBLE_DOWN, HIT, SPLIT, STAND
+from counting import CardCounter
+from rules import RuleSet
+from shoe import Shoe
+from shufflers import StackedShuffler
+from simulation import always_stand, mimic_dealer, play_game, what_if
+
+
+def stacked_game(faces, **rules):
+    """Returns a game dealt from a deck stacked with cards of these faces: Player, Player, Dealer, Dealer, then hits"""
+    suits = {}
+    cards = []
+    for face in faces:
+        suits[face] = suits.get(face, -1) + 1
+        cards.append((face, ['Spade', 'Heart', 'Diamond', 'Club'][suits[face]]))
+    return BlackJack(shuffler=StackedShuffler([cards]), **rules)
 
 
 class TestRule(unittest.TestCase):
@@ -24,6 +40,17 @@ class TestRule(unittest.TestCase):
         self.assertEqual(len(mygame.players[0]['hand']), 2)  # Initial hand for Player
         self.test_ran = True
 
+    def test_player_fields(self):
+        mygame = BlackJack(wager=5, max_wager=10)
+        player = mygame.players[0]
+        self.assertIs(player['hand'], player.hand)  # Dict style access still works
+        player['wager'] = 6
+        self.assertEqual(player.wager, 6)
+        self.assertRaises(KeyError, player.__getitem__, 'chips')
+        self.assertEqual(len(list(player['hand'])), 2)
+        self.assertIn(mygame.get_dealer_upcard()[1], ['Spade', 'Heart', 'Diamond', 'Club'])  # Cards read as (face, suit)
+        self.test_ran = True
+
     def test_hit(self):
         for run in range(self.run_max):
             mygame = BlackJack()
@@ -215,5 +242,227 @@ class TestRule(unittest.TestCase):
                 self.test_ran = True
                 break
 
+
+class TestStackedDeck(unittest.TestCase):
+    """Rules checked on stacked decks, no retries needed"""
+
+    def test_blackjack_against_dealer_21(self):
+        mygame = stacked_game(['ace', 'king', '6', '5', 'queen'], wager=10, max_wager=10)
+        self.assertEqual(mygame.players[0]['result'], 'blackjack')  # Dealer 21 in three cards
+        self.assertEqual(mygame.wager_earned, 15)
+
+    def test_blackjack_push(self):
+        mygame = stacked_game(['ace', 'king', 'ace', 'queen'], wager=10, max_wager=10)
+        self.assertEqual(mygame.players[0]['result'], 'push')
+
+    def test_player_and_dealer_bust(self):
+        mygame = stacked_game(['10', '6', '10', '5', 'king', 'jack'], wager=10, max_wager=10)
+        mygame.hit()  # Player draws the King and busts, Dealer draws the Jack on the hit
+        self.assertEqual(mygame.players[0]['result'], 'push')
+        self.assertEqual(mygame.wager_earned, 0)
+
+    def test_split_21_pays_blackjack(self):
+        mygame = stacked_game(['ace', 'ace', '10', '7', 'king', '2', '3'], wager=5, max_wager=10)
+        self.assertTrue(mygame.split())
+        mygame.stand(0)
+        mygame.hit(1)
+        mygame.stand(1)
+        self.assertEqual(mygame.players[0]['result'], 'blackjack')
+        self.assertEqual(mygame.players[1]['result'], 'lost')  # Ace, 2 and 3 make 16 against 17
+        self.assertEqual(mygame.player_hand_value(1), 16)
+
+    def test_soft_ace(self):
+        mygame = stacked_game(['10', '5', '10', '7', 'ace'], wager=5, max_wager=10)
+        mygame.hit()
+        self.assertEqual(mygame.player_hand_value(), 16)  # Ace counts as 1
+
+
+class TestRuleSet(unittest.TestCase):
+    """Rules given as a rules.RuleSet"""
+
+    def test_rule_arguments(self):
+        mygame = BlackJack(dealer_min=16, allow_split=False)
+        self.assertIs(mygame.rules, RuleSet(dealer_min=16, allow_split=False))
+        self.assertEqual(mygame.dealer_min, 16)
+        self.assertIs(mygame.card_faces, BlackJack().card_faces)  # Shared, not built per game
+
+    def test_dealer_hits_soft_17(self):
+        mygame = stacked_game(['10', '8', 'ace', '6', '3'], rules=RuleSet(dealer_hits_soft_17=True))
+        mygame.stand()
+        self.assertEqual(mygame.dealer_hand_value(), 20)  # Dealer draws the 3 on soft 17
+        self.assertEqual(mygame.players[0]['result'], 'lost')
+        mygame = stacked_game(['10', '8', 'ace', '6', '3'])
+        mygame.stand()
+        self.assertEqual(mygame.dealer_hand_value(), 17)
+        self.assertEqual(mygame.players[0]['result'], 'won')
+
+    def test_blackjack_payout(self):
+        mygame = stacked_game(['ace', 'king', '6', '5', 'queen'], wager=10, max_wager=10,
+                              rules=RuleSet(blackjack_payout=1.2))
+        self.assertEqual(mygame.wager_earned, 12)
+
+    def test_decks(self):
+        mygame = BlackJack(rules=RuleSet(decks=6))
+        self.assertEqual(len(mygame.card_deck), 6 * 52 - 4)
+
+
+class TestSplitSurrenderInsurance(unittest.TestCase):
+    """Re-splits, surrender and insurance, offered by the RuleSet"""
+
+    def test_resplit(self):
+        mygame = stacked_game(['8', '8', '10', '7', '8', '3', '5', '2'], wager=1, max_wager=3,
+                              rules=RuleSet(max_hands=4))
+        self.assertTrue(mygame.split())  # Hands of 8, 8 and 8, 3
+        self.assertTrue(mygame.can_split(0))
+        self.assertTrue(mygame.split(0))  # Hands of 8, 5 and 8, 3 and 8, 2
+        self.assertEqual([mygame.player_hand_value(hand_idx) for hand_idx in range(3)], [13, 11, 10])
+        self.assertFalse(mygame.can_split(1))  # A fourth hand needs a max wager of 4
+        self.assertFalse(mygame.split(1))
+        mygame = stacked_game(['8', '8', '10', '7', '8', '3'], wager=1, max_wager=3)
+        self.assertTrue(mygame.split())
+        self.assertFalse(mygame.split())  # One split by default
+
+    def test_surrender(self):
+        mygame = stacked_game(['10', '6', '10', '7'], wager=10, max_wager=10, rules=RuleSet(allow_surrender=True))
+        self.assertTrue(mygame.surrender())
+        self.assertEqual(mygame.players[0]['result'], 'surrender')
+        self.assertEqual(mygame.wager_earned, -5)
+        self.assertEqual(len(mygame.dealer_hand), 2)  # The Dealer draws no more cards
+        mygame = stacked_game(['10', '6', 'ace', 'king'], wager=10, max_wager=10, rules=RuleSet(allow_surrender=True))
+        self.assertTrue(mygame.surrender())
+        self.assertEqual(mygame.players[0]['result'], 'lost')  # Late surrender, a Dealer BlackJack takes it all
+        self.assertEqual(mygame.wager_earned, -10)
+
+    def test_surrender_not_allowed(self):
+        self.assertFalse(stacked_game(['10', '6', '10', '7']).surrender())  # Not offered by default
+        mygame = stacked_game(['10', '2', '10', '7', '3'], rules=RuleSet(allow_surrender=True))
+        mygame.hit()
+        self.assertFalse(mygame.surrender())  # Only the first two cards
+
+    def test_insurance(self):
+        rules = RuleSet(allow_insurance=True)
+        mygame = stacked_game(['10', '9', 'ace', 'king'], wager=10, max_wager=15, rules=rules)
+        self.assertTrue(mygame.insurance())
+        self.assertFalse(mygame.insurance())  # Taken once
+        mygame.stand()
+        self.assertEqual(mygame.players[0]['result'], 'lost')
+        self.assertEqual(mygame.wager_earned, 0)  # Insurance pays 2 to 1 on the 5 insured
+        mygame = stacked_game(['10', '9', 'ace', '7'], wager=10, max_wager=15, rules=rules)
+        self.assertTrue(mygame.insurance())
+        self.assertEqual(mygame.wager_earned, -5)
+        mygame = stacked_game(['10', '9', 'ace', '7'], wager=10, max_wager=10, rules=rules)
+        self.assertFalse(mygame.can_insure())  # Max wager can't cover the insurance
+        self.assertFalse(stacked_game(['10', '9', '7', 'ace'], wager=10, max_wager=15, rules=rules).insurance())
+
+
+class TestSnapshot(unittest.TestCase):
+    """Branches played from a snapshot and rewound"""
+
+    def assertSameGame(self, game, other):
+        self.assertEqual([(list(player.hand.cards), player.hand.hard, player.hand.aces, player.wager, player.active,
+                           player.allow_dd, player.result) for player in game.players],
+                         [(list(player.hand.cards), player.hand.hard, player.hand.aces, player.wager, player.active,
+                           player.allow_dd, player.result) for player in other.players])
+        self.assertEqual((list(game.dealer_hand.cards), game.dealer_hand.hard, game.dealer_hand.aces),
+                         (list(other.dealer_hand.cards), other.dealer_hand.hard, other.dealer_hand.aces))
+        self.assertEqual((game.wager_earned, game.dealer_value, game.card_deck),
+                         (other.wager_earned, other.dealer_value, other.card_deck))
+
+    def test_restore(self):
+        for lazy_dealer in (False, True):
+            mygame = stacked_game(['8', '8', '10', '6', '3', '2', '9', '7', '5', '4'], wager=5, max_wager=20,
+                                  lazy_dealer=lazy_dealer, record=True)
+            before = stacked_game(['8', '8', '10', '6', '3', '2', '9', '7', '5', '4'], wager=5, max_wager=20,
+                                  lazy_dealer=lazy_dealer, record=True)
+            snapshot = mygame.snapshot()
+            mygame.split()
+            mygame.hit(0)
+            inner = mygame.snapshot()
+            mygame.double_down(0)
+            mygame.stand(1)
+            earned = mygame.wager_earned
+            mygame.restore(inner)
+            self.assertEqual(len(mygame.players), 2)
+            mygame.double_down(0)
+            mygame.stand(1)
+            self.assertEqual(mygame.wager_earned, earned)  # The same cards come out again
+            mygame.restore(snapshot)
+            self.assertSameGame(mygame, before)
+            self.assertEqual((mygame.history.cards, mygame.history.actions), (before.history.cards, []))
+
+    def test_split_reuses_rewound_hand(self):
+        mygame = stacked_game(['8', '8', '10', '6', '3', '2', '9', '7', '5', '4'], wager=5, max_wager=20)
+        before = stacked_game(['8', '8', '10', '6', '3', '2', '9', '7', '5', '4'], wager=5, max_wager=20)
+        snapshot = mygame.snapshot()
+        mygame.split()
+        split_player = mygame.players[1]
+        mygame.double_down(1)
+        mygame.restore(snapshot)
+        self.assertEqual(len(mygame.players), 1)
+        mygame.split()
+        before.split()
+        self.assertIs(mygame.players[1], split_player)  # No new hand for the split of the next branch
+        self.assertSameGame(mygame, before)
+
+    def test_restore_reshuffled_shoe(self):
+        shoe = Shoe(decks=1, penetration=1, rng=random.Random(2), counter=CardCounter('hi-lo'))
+        while True:
+            mygame = BlackJack(shoe=shoe)
+            if mygame.players[0].active and len(shoe) < 6:
+                break
+            play_game(mygame, mimic_dealer)
+        cards = bytes(shoe.cards)
+        count = shoe.running_count()
+        snapshot = mygame.snapshot()
+        mygame.stand()
+        while shoe.reshuffles == snapshot.reshuffles:
+            mygame._pick_card()  # Draws on until the shoe runs out and is shuffled
+        mygame.restore(snapshot)
+        self.assertEqual(bytes(shoe.cards), cards)
+        self.assertEqual(shoe.running_count(), count)
+
+    def test_what_if(self):
+        mygame = stacked_game(['10', '6', '10', '7', '5', '9'])
+        self.assertEqual(what_if(mygame, HIT, always_stand), 1)  # Draws the 5 for 21
+        self.assertEqual(what_if(mygame, STAND), -1)
+        self.assertEqual(what_if(mygame, DOUBLE_DOWN), 1)  # Max wager 1, so nothing to double
+        self.assertRaises(ValueError, what_if, mygame, SPLIT)
+        self.assertTrue(mygame.players[0].active)
+        mygame.hit()
+        self.assertEqual(mygame.player_hand_value(), 21)
+
+
+class TestLazyDealer(unittest.TestCase):
+    """The Dealer draws once, after every Player hand has finished"""
+
+    def test_no_dealer_draw_on_hit(self):
+        mygame = stacked_game(['10', '2', '10', '5', '3', '4', '6'], lazy_dealer=True)
+        mygame.hit()  # Player draws the 3, the Dealer stays on 15
+        self.assertEqual(len(mygame.dealer_hand), 2)
+        mygame.hit()  # Player draws the 4 for 19
+        mygame.stand()
+        self.assertEqual(mygame.dealer_hand[2], ('6', 'Spade'))  # Dealer draws after the Player
+        self.assertEqual(mygame.dealer_hand_value(), 21)
+        self.assertEqual(mygame.players[0]['result'], 'lost')
+
+    def test_split_hands_settled_together(self):
+        mygame = stacked_game(['8', '8', '10', '6', '3', '2', '9', '7', '5'], wager=5, max_wager=10,
+                              lazy_dealer=True)
+        self.assertTrue(mygame.split())  # Hands of 8, 3 and 8, 2
+        mygame.hit(0)  # 8, 3 and 9 make 20
+        mygame.stand(0)
+        self.assertEqual(mygame.players[0]['result'], None)  # Not settled until the last hand ends
+        self.assertEqual(len(mygame.dealer_hand), 2)
+        mygame.double_down(1)  # 8, 2 and 7 make 17, then the Dealer draws the 5 for 21
+        self.assertEqual(mygame.dealer_hand_value(), 21)
+        self.assertEqual([player['result'] for player in mygame.players], ['lost', 'lost'])
+        self.assertEqual(mygame.wager_earned, -15)
+
+    def test_blackjack_settled_at_deal(self):
+        mygame = stacked_game(['ace', 'king', '6', '5', 'queen'], wager=10, max_wager=10, lazy_dealer=True)
+        self.assertEqual(mygame.players[0]['result'], 'blackjack')
+        self.assertEqual(mygame.dealer_hand_value(), 21)  # The Dealer hand is still resolved
+        self.assertEqual(mygame.wager_earned, 15)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,25 @@
+#!/usr/bin/env python
+"""
+Test code for the card encoding.  Test can be run from command line: python test_cards.py
+"""
+from __future__ import print_function
+import unittest
+from cards import CARD_NAMES, CARD_VALUES, DECK, HARD_CARD_VALUES, decode, encode
+
+
+class TestCards(unittest.TestCase):
+
+    def test_deck(self):
+        self.assertEqual(len(DECK), 52)
+        self.assertEqual(len(set(CARD_NAMES)), 52)
+        self.assertEqual(sum(CARD_VALUES[card] for card in DECK), 4 * (2 + 3 + 4 + 5 + 6 + 7 + 8 + 9 + 10 * 4 + 11))
+        self.assertEqual(sorted(set(HARD_CARD_VALUES)), list(range(1, 11)))
+
+    def test_round_trip(self):
+        for card in DECK:
+            self.assertEqual(encode(decode(card)), card)
+        self.assertEqual(decode(encode(('ace', 'Club'))), ('ace', 'Club'))
+        self.assertEqual(encode(7), 7)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""
+Test code for card counting.  Test can be run from command line: python test_counting.py
+"""
+from __future__ import print_function, division
+import random
+import unittest
+from blackjack import BlackJack
+from cards import CARD_VALUES
+from counting import HI_LO, KO, OMEGA_II, BetRamp, CardCounter
+from shoe import Shoe
+from simulation import Simulator, mimic_dealer
+
+
+class TestCardCounter(unittest.TestCase):
+
+    def test_running_count(self):
+        random.seed(7)
+        for system, tags, start in (('hi-lo', HI_LO, 0), ('omega-ii', OMEGA_II, 0), ('ko', KO, -4)):  # 4 - 4 x decks
+            shoe = Shoe(decks=2, counter=CardCounter(system))
+            self.assertEqual(shoe.running_count(), start)
+            running = start
+            for _ in range(len(shoe.full_shoe) + 10):  # Runs out and reshuffles mid way
+                if not shoe.cards:
+                    running = start
+                running += tags[CARD_VALUES[shoe.draw()]]
+                self.assertEqual(shoe.running_count(), running)
+
+    def test_balanced_and_ko(self):
+        random.seed(7)
+        for system, end in (('hi-lo', 0), ('omega-ii', 0), ('ko', 4)):
+            shoe = Shoe(decks=6, counter=CardCounter(system))
+            while len(shoe) > 1:
+                shoe.draw()
+            shoe.draw()
+            self.assertEqual(shoe.running_count(), end)  # Whole shoe dealt
+        self.assertEqual(Shoe(decks=6, counter=CardCounter('ko')).running_count(), -20)  # 4 - 4 x decks
+
+    def test_true_count(self):
+        counter = CardCounter('hi-lo')
+        counter.shuffled(bytearray(CARD_VALUES.index(10) for _ in range(104)))
+        self.assertEqual(counter.true_count(52), -52)
+        self.assertEqual(counter.true_count(13), -91 / 0.5)  # Less than half a deck counts as half a deck
+
+    def test_unknown_system(self):
+        self.assertRaises(ValueError, CardCounter, 'wong-halves')
+
+    def test_game_count(self):
+        random.seed(3)
+        shoe = Shoe(decks=1, counter=CardCounter('hi-lo'))
+        game = BlackJack(shoe=shoe)
+        dealt = list(game.players[0].hand.cards) + list(game.dealer_hand.cards)
+        self.assertEqual(game.running_count(), sum(HI_LO[CARD_VALUES[card]] for card in dealt))
+        self.assertEqual(game.true_count(), game.running_count() / (48 / 52))
+        self.assertIsNone(BlackJack().running_count())
+
+    def test_bet_ramp(self):
+        bet_spread = BetRamp({1: 2, 3: 8}, min_wager=1)
+        self.assertEqual([bet_spread(count) for count in (-2, 0.5, 1, 2.9, 3, 10)], [1, 1, 2, 2, 8, 8])
+
+
+class TestSimulatorCount(unittest.TestCase):
+
+    def test_by_count(self):
+        random.seed(5)
+        stats = Simulator(decks=6, count='hi-lo').run(20000, mimic_dealer)
+        self.assertEqual(sum(count_stats.rounds for count_stats in stats.by_count.values()), stats.rounds)
+        self.assertAlmostEqual(sum(count_stats.net for count_stats in stats.by_count.values()), stats.net)
+        self.assertEqual(set(stats.ev_by_count()), set(stats.by_count))
+        self.assertEqual(Simulator(decks=6).run(100, mimic_dealer).by_count, {})
+
+    def test_bet_spread(self):
+        random.seed(5)
+        stats = Simulator(decks=6, max_wager=8, count='ko', bet_spread=BetRamp({0: 4}, min_wager=1)).run(20000)
+        self.assertEqual(stats.wagered, sum(count_stats.wagered for count_stats in stats.by_count.values()))
+        for count, count_stats in stats.by_count.items():
+            self.assertEqual(count_stats.wagered, (4 if count >= 0 else 1) * count_stats.rounds)
+        self.assertRaises(ValueError, Simulator, bet_spread=BetRamp({0: 4}))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""
+Test code for the Dealer outcome distributions.  Test can be run from command line: python test_dealer.py
+"""
+from __future__ import print_function, division
+import random
+import unittest
+from dealer import BUST, dealer_outcomes, dealer_probabilities, sample_dealer_outcomes, shoe_composition
+from hand import hand_value
+from rules import RuleSet
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+ONLY_ACES = [0] * 9 + [8]
+
+
+def scalar_dealer_outcomes(samples, upcard, dealer_min=17, allow_soft_limit=True, decks=1, dealer_hits_soft_17=False):
+    """Returns outcome probabilities from Dealer hands played one card at a time, drawing as BlackJack does"""
+    draws = RuleSet(dealer_min=dealer_min, allow_soft_limit=allow_soft_limit,
+                    dealer_hits_soft_17=dealer_hits_soft_17).dealer_draws
+    cards = [value for value, count in zip(range(2, 12), shoe_composition(decks)) for _ in range(count)]
+    cards.remove(upcard)
+    outcomes = [0] * (BUST + 1)
+    for _ in range(samples):
+        random.shuffle(cards)
+        hard, aces = (1, 1) if upcard == 11 else (upcard, 0)
+        for value in cards:
+            hard += 1 if value == 11 else value
+            aces += value == 11
+            dealer_value = hand_value(hard, aces, allow_soft_limit)
+            if dealer_value > 21 or not draws[aces][hard]:
+                break
+        outcomes[min(dealer_value, BUST)] += 1
+    return [count / samples for count in outcomes]
+
+
+class TestDealerProbabilities(unittest.TestCase):
+
+    def test_distribution(self):
+        for decks in (1, 6, None):
+            outcomes = dealer_outcomes(decks=decks)
+            self.assertEqual(sorted(outcomes), list(range(2, 12)))
+            for upcard, probabilities in outcomes.items():
+                self.assertAlmostEqual(sum(probabilities), 1.0)
+                self.assertEqual(sum(probabilities[:17]), 0)
+
+    def test_known_values(self):
+        # Dealer bust chances standing on all 17s
+        self.assertAlmostEqual(dealer_probabilities(6, decks=None)[BUST], 0.42315, places=5)
+        self.assertAlmostEqual(dealer_probabilities(6, decks=1)[BUST], 0.42082, places=5)
+
+    def test_soft_limit(self):
+        self.assertEqual(dealer_probabilities(11, composition=ONLY_ACES)[17], 1.0)
+        self.assertEqual(dealer_probabilities(11, allow_soft_limit=False, composition=ONLY_ACES)[BUST], 1.0)
+
+    def test_composition(self):
+        composition = shoe_composition(cards=[12, 12, 8, 12])  # Aces and Tens from cards.DECK
+        self.assertEqual(composition, [0] * 8 + [1, 3])
+        probabilities = dealer_probabilities(10, composition=composition)  # Ten and an Ace, or Ten and a Ten
+        self.assertAlmostEqual(probabilities[21], 1.0)
+        self.assertRaises(ValueError, dealer_probabilities, 2, composition=composition)
+
+    def test_hits_soft_17(self):
+        stands = dealer_probabilities(6, decks=6)
+        hits = dealer_probabilities(6, decks=6, dealer_hits_soft_17=True)
+        self.assertAlmostEqual(sum(hits), 1.0)
+        self.assertLess(hits[17], stands[17])
+        self.assertGreater(hits[BUST], stands[BUST])
+        without_soft_limit = dealer_outcomes(allow_soft_limit=False, dealer_hits_soft_17=True)
+        self.assertEqual(sum(without_soft_limit[11][:18]), 0)  # Every Ace counts 11, so every 17 with one is soft
+
+    def test_matches_scalar(self):
+        random.seed(7)
+        samples = 20000
+        for upcard, dealer_min, allow_soft_limit, hits_soft in ((6, 17, True, False), (11, 17, False, False),
+                                                                (10, 15, True, False), (11, 17, True, True),
+                                                                (5, 17, False, True)):
+            exact = dealer_probabilities(upcard, dealer_min, allow_soft_limit, dealer_hits_soft_17=hits_soft)
+            scalar = scalar_dealer_outcomes(samples, upcard, dealer_min, allow_soft_limit,
+                                            dealer_hits_soft_17=hits_soft)
+            for expected, found in zip(exact, scalar):
+                self.assertLess(abs(expected - found), 5 * (0.25 / samples) ** 0.5)
+
+
+@unittest.skipIf(numpy is None, 'NumPy is not installed')
+class TestSampleDealerOutcomes(unittest.TestCase):
+
+    def test_distribution(self):
+        outcomes = sample_dealer_outcomes(10000, rng=1)
+        self.assertEqual(sorted(outcomes), list(range(2, 12)))
+        for upcard, probabilities in outcomes.items():
+            self.assertAlmostEqual(probabilities.sum(), 1.0)
+            self.assertEqual(probabilities[:17].sum(), 0)  # Dealer never stops under dealer_min
+
+    def test_soft_limit(self):
+        # A pair of Aces counts 12 with the soft limit, and keeps drawing Aces until 17
+        outcomes = sample_dealer_outcomes(100, composition=ONLY_ACES, upcards=[11], rng=1)
+        self.assertEqual(outcomes[11][17], 1.0)
+        # Without the soft limit, every Ace counts 11 and the Dealer busts on the second Ace
+        outcomes = sample_dealer_outcomes(100, allow_soft_limit=False, composition=ONLY_ACES, upcards=[11], rng=1)
+        self.assertEqual(outcomes[11][BUST], 1.0)
+
+    def test_matches_scalar(self):
+        random.seed(5)
+        samples = 20000
+        for upcard, dealer_min, allow_soft_limit in ((6, 17, True), (11, 17, False), (10, 15, True)):
+            vectorized = sample_dealer_outcomes(samples, dealer_min, allow_soft_limit, upcards=[upcard], rng=2)[upcard]
+            scalar = scalar_dealer_outcomes(samples, upcard, dealer_min, allow_soft_limit)
+            for expected, found in zip(scalar, vectorized):
+                self.assertLess(abs(expected - found), 5 * (2 * 0.25 / samples) ** 0.5)
+
+    def test_matches_exact(self):
+        samples = 200000
+        for hits_soft in (False, True):
+            sampled = sample_dealer_outcomes(samples, decks=6, rng=3, dealer_hits_soft_17=hits_soft)
+            for upcard, probabilities in dealer_outcomes(decks=6, dealer_hits_soft_17=hits_soft).items():
+                for expected, found in zip(probabilities, sampled[upcard]):
+                    self.assertLess(abs(expected - found), 5 * (0.25 / samples) ** 0.5)
+
+    def test_no_upcard_left(self):
+        self.assertRaises(ValueError, sample_dealer_outcomes, 10, composition=ONLY_ACES, upcards=[2])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+"""
+Test code for the exact round EV.  Test can be run from command line: python test_exact.py
+"""
+from __future__ import print_function, division
+import random
+import unittest
+from blackjack import BlackJack, DOUBLE_DOWN, SPLIT
+from dealer import BUST, dealer_probabilities
+from exact import DealerGraph, round_ev, round_ev_for_game
+from rules import RuleSet
+from shoe import EVERY_ROUND
+from simulation import Simulator, always_stand, mimic_dealer
+from strategy import generate_strategy
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+SMALL_SHOE = (2, 2, 2, 2, 2, 2, 2, 2, 8, 2)  # Half a deck, for the slower pure Python Dealer outcomes
+
+
+class TestDealerGraph(unittest.TestCase):
+
+    def test_matches_dealer_probabilities(self):
+        composition = (4, 3, 4, 4, 2, 4, 4, 4, 14, 3)
+        for upcard in (2, 6, 10, 11):
+            for allow_soft_limit in (True, False):
+                counts = list(composition)
+                counts[upcard - 2] -= 1
+                outcome, bust_next = DealerGraph(upcard, allow_soft_limit=allow_soft_limit).outcomes(counts)
+                expected = dealer_probabilities(upcard, allow_soft_limit=allow_soft_limit, composition=composition)
+                for probability, expected_probability in zip(outcome, expected):
+                    self.assertAlmostEqual(probability, expected_probability)
+                self.assertAlmostEqual(sum(bust_next), outcome[BUST])  # Some card always follows a bust here
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed')
+    def test_batch_outcomes(self):
+        graph = DealerGraph(7)
+        shoes = [[4, 4, 4, 4, 4, 3, 4, 4, 16, 4], [24, 23, 24, 24, 24, 23, 24, 24, 90, 24],
+                 [1, 0, 0, 0, 0, 0, 0, 0, 1, 0]]
+        for (outcome, bust_next), counts in zip(graph.batch_outcomes(shoes), shoes):
+            expected_outcome, expected_bust_next = graph.outcomes(counts)
+            for probability, expected in zip(outcome + bust_next, expected_outcome + expected_bust_next):
+                self.assertAlmostEqual(probability, expected)
+
+
+class TestRoundEV(unittest.TestCase):
+
+    def assertSimulated(self, policy, rounds=50000, **rules):
+        result = round_ev(policy, **rules)
+        simulated = Simulator(reshuffle=EVERY_ROUND, rng=random.Random(5), **rules).run(rounds, policy)
+        self.assertLess(abs(simulated.ev - result.ev), 4 * simulated.std_error)
+        return result
+
+    def test_against_simulator(self):
+        self.assertSimulated(always_stand, decks=1)
+        self.assertSimulated(mimic_dealer, decks=6, allow_soft_limit=False)
+
+    def test_split_and_double_against_simulator(self):
+        def split_everything(total, soft, pair, upcard, can_double, can_split):
+            if can_split:
+                return SPLIT
+            if can_double and total in (10, 11):
+                return DOUBLE_DOWN
+            return mimic_dealer(total, soft, pair, upcard, can_double, can_split)
+
+        self.assertSimulated(split_everything, decks=6, max_wager=3)
+        self.assertSimulated(generate_strategy(decks=6), decks=6, max_wager=4)
+
+    def test_surrender_against_simulator(self):
+        class SurrenderStiffs(object):
+            def __call__(self, *hand):
+                return mimic_dealer(*hand)
+
+            def surrender(self, total, soft, pair, upcard):
+                return 15 <= total <= 16 and upcard >= 9
+
+        rules = RuleSet(decks=6, allow_surrender=True)
+        result = round_ev(SurrenderStiffs(), decks=6, allow_surrender=True)
+        simulated = Simulator(reshuffle=EVERY_ROUND, rng=random.Random(6), rules=rules).run(50000, SurrenderStiffs())
+        self.assertLess(abs(simulated.ev - result.ev), 4 * simulated.std_error)
+        self.assertLess(result.ev, round_ev(mimic_dealer, decks=6).ev)  # Surrendering stiffs costs here
+        self.assertEqual(round_ev(decks=6, allow_surrender=True).ev, round_ev(decks=6).ev)
+
+    def test_optimal_beats_policies(self):
+        optimal = round_ev(decks=6, max_wager=2)
+        self.assertLess(optimal.elapsed, 60)
+        self.assertAlmostEqual(sum(optimal.by_upcard.values()), optimal.ev)
+        for policy in (always_stand, mimic_dealer, generate_strategy(decks=6)):
+            self.assertGreater(optimal.ev, round_ev(policy, decks=6, max_wager=2).ev)
+
+    def test_blackjack_payout(self):
+        evs = [round_ev(mimic_dealer, composition=SMALL_SHOE, blackjack_payout=payout).ev for payout in (1, 1.5, 2)]
+        self.assertGreater(evs[1], evs[0])
+        self.assertAlmostEqual(evs[2] - evs[1], evs[1] - evs[0])  # A fixed policy's EV is linear in the payout
+
+    def test_without_numpy(self):
+        with_numpy = round_ev(composition=SMALL_SHOE, max_wager=2)
+        without_numpy = round_ev(composition=SMALL_SHOE, max_wager=2, use_numpy=False)
+        self.assertAlmostEqual(with_numpy.ev, without_numpy.ev)
+
+    def test_policy_errors(self):
+        with self.assertRaises(ValueError):
+            round_ev(lambda *hand: SPLIT, composition=SMALL_SHOE)  # Split needs 2 x wager
+        with self.assertRaises(ValueError):
+            round_ev(lambda *hand: 'surrender', composition=SMALL_SHOE)
+
+    def test_shoes(self):
+        with self.assertRaises(ValueError):
+            round_ev(decks=None)
+        with self.assertRaises(ValueError):
+            round_ev(composition=(1,) * 10)
+
+    def test_hits_soft_17(self):
+        result = round_ev(mimic_dealer, decks=1, dealer_hits_soft_17=True)
+        simulated = Simulator(reshuffle=EVERY_ROUND, rng=random.Random(5),
+                              rules=RuleSet(dealer_hits_soft_17=True)).run(50000, mimic_dealer)
+        self.assertLess(abs(simulated.ev - result.ev), 4 * simulated.std_error)
+        self.assertLess(round_ev(decks=6, dealer_hits_soft_17=True).ev, round_ev(decks=6).ev)
+
+    def test_for_game_rules(self):
+        game = BlackJack(rules=RuleSet(dealer_hits_soft_17=True, blackjack_payout=1.2))
+        self.assertEqual(round_ev_for_game(game, composition=SMALL_SHOE).ev,
+                         round_ev(composition=SMALL_SHOE, dealer_hits_soft_17=True, blackjack_payout=1.2).ev)
+        for rules in (RuleSet(max_hands=3), RuleSet(allow_insurance=True)):  # Not priced
+            self.assertRaises(ValueError, round_ev_for_game, BlackJack(rules=rules), composition=SMALL_SHOE)
+
+    def test_for_game(self):
+        game = BlackJack(dealer_min=16, max_wager=2)
+        result = round_ev_for_game(game, composition=SMALL_SHOE)
+        self.assertEqual(result.rules['dealer_min'], 16)
+        self.assertEqual(result.rules['max_wager'], 2)
+        self.assertEqual(result.ev, round_ev(dealer_min=16, max_wager=2, composition=SMALL_SHOE).ev)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+"""
+Test code for hands.  Test can be run from command line: python test_hand.py
+"""
+from __future__ import print_function
+import itertools
+import unittest
+from cards import FACE_VALUES
+from hand import Hand, hand_value
+
+
+def brute_force_value(faces, allow_soft_limit=True):
+    """Returns the highest total <= 21 over every way of counting the Aces, else the lowest total"""
+    values = [0]
+    for face in faces:
+        if face == 'ace' and allow_soft_limit:
+            values = [value + ace for value in values for ace in (1, 11)]
+        else:
+            values = [value + FACE_VALUES[face] for value in values]
+    under = [value for value in values if value <= 21]
+    return max(under) if under else min(values)
+
+
+class TestHand(unittest.TestCase):
+
+    def test_values(self):
+        faces = ['2', '5', '9', '10', 'king', 'ace']
+        for size in range(1, 5):
+            for hand_faces in itertools.product(faces, repeat=size):
+                hand = Hand((face, 'Spade') for face in hand_faces)
+                self.assertEqual(hand.value(), brute_force_value(hand_faces), hand_faces)
+                self.assertEqual(hand.value(allow_soft_limit=False), brute_force_value(hand_faces, False), hand_faces)
+
+    def test_soft(self):
+        self.assertTrue(Hand([('ace', 'Spade'), ('6', 'Club')]).is_soft())
+        self.assertFalse(Hand([('ace', 'Spade'), ('6', 'Club'), ('10', 'Club')]).is_soft())
+        self.assertFalse(Hand([('10', 'Spade'), ('6', 'Club')]).is_soft())
+
+    def test_pop(self):
+        hand = Hand([('ace', 'Spade'), ('ace', 'Club')])
+        self.assertEqual(hand.value(), 12)
+        self.assertEqual(hand.pop(), ('ace', 'Club'))
+        self.assertEqual((hand.hard, hand.aces, len(hand)), (1, 1, 1))
+        self.assertEqual(hand.value(), 11)
+
+    def test_hand_value(self):
+        self.assertEqual(hand_value(16, 0), 16)
+        self.assertEqual(hand_value(7, 1), 17)
+        self.assertEqual(hand_value(17, 1), 17)
+        self.assertEqual(hand_value(2, 2, allow_soft_limit=False), 22)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+"""
+Test code for the hand history log.  Test can be run from command line: python test_history.py
+"""
+from __future__ import print_function
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from blackjack import BlackJack, HIT, STAND, SPLIT, SURRENDER, INSURANCE
+from history import HEADER, MAGIC, RECORD, VERSION, HistoryReader, HistoryWriter, record_games, replay
+from rules import RuleSet
+from shufflers import StackedShuffler
+from simulation import mimic_dealer
+from test_simulation import SplitSurrenderInsure
+
+
+def split_eights(total, soft, pair, upcard, can_double, can_split):
+    if can_split and pair == 8:
+        return SPLIT
+    return mimic_dealer(total, soft, pair, upcard, can_double, can_split)
+
+
+class TestHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'history.bin')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_write_and_read(self):
+        mygame = BlackJack(wager=5, max_wager=10, shuffler=StackedShuffler([[('10', 'Spade'), ('6', 'Spade'),
+                                                                              ('9', 'Club'), ('8', 'Club'),
+                                                                              ('3', 'Heart')]]), record=True)
+        mygame.hit()
+        mygame.stand()
+        with HistoryWriter(self.path) as writer:
+            writer.write(mygame)
+        with HistoryReader(self.path) as reader:
+            self.assertEqual(len(reader), 1)
+            record = reader[0]
+        self.assertEqual(record.results, ['won'])  # 19 against 17
+        self.assertEqual(record.wager_earned, 5)
+        self.assertEqual(record.actions, [(HIT, 0), (STAND, 0)])
+        self.assertEqual(record.player_cards(0), [8, 4, 14])
+        self.assertEqual(record.dealer_cards(), [46, 45])
+
+    def test_batches(self):
+        writer = HistoryWriter(self.path, batch=10)
+        for _ in range(15):
+            writer.write(BlackJack(record=True))
+        self.assertEqual(os.path.getsize(self.path), HEADER.size + 10 * RECORD.size)  # One batch written
+        writer.close()
+        with HistoryReader(self.path) as reader:
+            self.assertEqual(len(reader), 15)
+
+    def test_replay(self):
+        random.seed(3)
+        earned = record_games(self.path, 2000, split_eights, wager=1, max_wager=2)
+        with HistoryReader(self.path) as reader:
+            self.assertEqual(sum(record.wager_earned for record in reader), earned)
+            splits = 0
+            for index in range(len(reader) - 1, -1, -1):  # Random access, back to front
+                record = reader[index]
+                mygame = replay(record)
+                self.assertEqual([player.result for player in mygame.players], record.results)
+                self.assertEqual(mygame.wager_earned, record.wager_earned)
+                for hand_idx, player in enumerate(mygame.players):
+                    self.assertEqual(list(player.hand.cards), record.player_cards(hand_idx))
+                self.assertEqual(list(mygame.dealer_hand.cards), record.dealer_cards())
+                splits += len(record.results) > 1
+            self.assertGreater(splits, 0)
+
+    def test_replay_surrender_insurance_resplit(self):
+        random.seed(4)
+        rules = RuleSet(max_hands=4, allow_surrender=True, allow_insurance=True)
+        earned = record_games(self.path, 2000, SplitSurrenderInsure(), wager=1, max_wager=8, rules=rules)
+        with HistoryReader(self.path) as reader:
+            self.assertEqual(sum(record.wager_earned for record in reader), earned)
+            actions = set()
+            resplits = 0
+            for record in reader:
+                mygame = replay(record)
+                self.assertIs(mygame.rules.replace(decks=1), rules)  # Replay decks are enough for the cards dealt
+                self.assertEqual([player.result for player in mygame.players], record.results)
+                self.assertEqual(mygame.wager_earned, record.wager_earned)
+                for hand_idx, player in enumerate(mygame.players):
+                    self.assertEqual(list(player.hand.cards), record.player_cards(hand_idx))
+                actions.update(action for action, hand_idx in record.actions)
+                resplits += len(record.results) > 2
+            self.assertTrue(actions.issuperset([SURRENDER, INSURANCE]))
+            self.assertGreater(resplits, 0)
+
+    def test_replay_lazy_dealer(self):
+        random.seed(4)
+        record_games(self.path, 500, split_eights, wager=1, max_wager=2, lazy_dealer=True)
+        with HistoryReader(self.path) as reader:
+            for record in reader:
+                self.assertTrue(record.lazy_dealer)
+                mygame = replay(record)
+                self.assertEqual(list(mygame.dealer_hand.cards), record.dealer_cards())
+                self.assertEqual(mygame.wager_earned, record.wager_earned)
+
+    def test_replay_rules(self):
+        random.seed(5)
+        record_games(self.path, 500, split_eights, wager=1, max_wager=2,
+                     rules=RuleSet(blackjack_payout=1.2, dealer_hits_soft_17=True))
+        with HistoryReader(self.path) as reader:
+            for record in reader:
+                self.assertEqual((record.blackjack_payout, record.dealer_hits_soft_17), (1.2, True))
+                mygame = replay(record)
+                self.assertEqual(list(mygame.dealer_hand.cards), record.dealer_cards())
+                self.assertEqual(mygame.wager_earned, record.wager_earned)
+
+    def test_not_a_history_file(self):
+        with open(self.path, 'wb') as other_file:
+            other_file.write(b'not a history file')
+        self.assertRaises(ValueError, HistoryReader, self.path)
+        self.assertRaises(ValueError, HistoryWriter, self.path)
+
+    def test_older_version(self):
+        """Files of older versions have another record layout, and are not read"""
+        with open(self.path, 'wb') as old_file:
+            old_file.write(HEADER.pack(MAGIC, VERSION - 1, RECORD.size))
+        self.assertRaises(ValueError, HistoryReader, self.path)
+        self.assertRaises(ValueError, HistoryWriter, self.path)
+
+    def test_not_recorded(self):
+        with HistoryWriter(self.path) as writer:
+            self.assertRaises(ValueError, writer.write, BlackJack())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""
+Test code for the instrumentation counters and timings.  Test can be run from command line:
+python test_instrumentation.py
+"""
+from __future__ import print_function
+import json
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from blackjack import BlackJack
+from instrumentation import INSTRUMENTATION, Histogram, format_snapshot
+from shoe import Shoe
+from shufflers import StackedShuffler
+from simulation import simulate
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        INSTRUMENTATION.reset()
+
+    def tearDown(self):
+        INSTRUMENTATION.disable()
+        INSTRUMENTATION.reset()
+
+    def test_disabled_has_original_methods(self):
+        methods = dict(BlackJack.__dict__)
+        shuffle = Shoe.__dict__['shuffle']
+        BlackJack.instrument(timings=True)
+        self.assertIsNot(BlackJack.__dict__['hit'], methods['hit'])
+        INSTRUMENTATION.disable()
+        self.assertEqual(dict(BlackJack.__dict__), methods)
+        self.assertIs(Shoe.__dict__['shuffle'], shuffle)
+        BlackJack()
+        self.assertEqual(sum(INSTRUMENTATION.snapshot()['counters'].values()), 0)
+
+    def test_counters(self):
+        instruments = BlackJack.instrument()
+        # Player: 8, 8 split, draws 3 and 2, doubles down on 11 with a 10.  Dealer: 10, 4, draws a 2 with the hit
+        # of the double down and a 5 in stand
+        cards = [('8', 'Spade'), ('8', 'Heart'), ('10', 'Spade'), ('4', 'Spade'), ('3', 'Spade'), ('2', 'Spade'),
+                 ('10', 'Heart'), ('2', 'Heart'), ('5', 'Spade')]
+        game = BlackJack(max_wager=4, shuffler=StackedShuffler([cards]))
+        self.assertTrue(game.split())
+        self.assertTrue(game.double_down(0))
+        self.assertFalse(game.double_down(0))  # Hand is over, not counted
+        game.stand(1)
+        counters = instruments.snapshot()['counters']
+        self.assertEqual(counters['cards_drawn'], 9)
+        self.assertEqual(counters['dealer_draws'], 1)
+        self.assertEqual(counters['splits'], 1)
+        self.assertEqual(counters['double_downs'], 1)
+        self.assertEqual(counters['reshuffles'], 1)
+        self.assertGreater(counters['hand_evaluations'], 0)
+        self.assertEqual(instruments.snapshot()['timings'], {})  # Timings are off
+        instruments.reset()
+        self.assertEqual(sum(instruments.snapshot()['counters'].values()), 0)
+
+    def test_keyword_arguments(self):
+        instruments = BlackJack.instrument(timings=True)
+        random.seed(2)
+        game = BlackJack(wager=1, max_wager=2)
+        hand = game.players[0].hand
+        evaluations = instruments.snapshot()['counters']['hand_evaluations']
+        self.assertEqual(game._get_hand_value(hand, allow_soft_limit=False), hand.value(False))
+        self.assertEqual(game.player_hand_value(hand_idx=0), hand.value())
+        self.assertEqual(instruments.snapshot()['counters']['hand_evaluations'], evaluations + 2)
+        self.assertTrue(game.double_down(hand_idx=0))
+        self.assertEqual(instruments.snapshot()['counters']['double_downs'], 1)
+
+    def test_timings(self):
+        instruments = BlackJack.instrument(timings=True)
+        random.seed(1)
+        for _ in range(50):
+            game = BlackJack()
+            game.stand()
+        timings = instruments.snapshot()['timings']
+        self.assertEqual(timings['construct']['count'], 50)
+        self.assertEqual(timings['stand']['count'], 50)
+        self.assertIn('construct', format_snapshot(instruments.snapshot()))
+
+    def test_histogram(self):
+        histogram = Histogram()
+        for microseconds in [0.5] * 50 + [3] * 40 + [100] * 9 + [1e9]:
+            histogram.add(microseconds / 1e6)
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot['count'], 100)
+        self.assertEqual((snapshot['p50_us'], snapshot['p90_us'], snapshot['p99_us']), (1, 4, 128))
+        self.assertEqual(snapshot['buckets_us']['>%d' % 2 ** (Histogram.BUCKETS - 1)], 1)
+
+    def test_simulator_and_export(self):
+        BlackJack.instrument()
+        random.seed(2)
+        stats = simulate(1000, wager=1, max_wager=2, decks=2)
+        counters = INSTRUMENTATION.snapshot()['counters']
+        self.assertEqual(counters['simulator_rounds'], 1000)
+        self.assertEqual(counters['splits'], stats.hands - stats.rounds)
+        self.assertGreater(counters['reshuffles'], 0)
+        temp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(temp_dir, 'instruments.json')
+            INSTRUMENTATION.export(path)
+            with open(path) as export_file:
+                self.assertEqual(json.load(export_file), INSTRUMENTATION.snapshot())
+        finally:
+            shutil.rmtree(temp_dir)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+"""
+Test code for the round results columns.  Test can be run from command line: python test_results.py
+"""
+from __future__ import print_function, division
+import csv
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from results import (COLUMN_NAMES, DOUBLE_DOWN_FLAG, HIT_FLAG, INSURANCE_FLAG, RESULTS, SPLIT_FLAG, SURRENDER_FLAG,
+                     ResultColumns, ResultsWriter, action_names, aggregate, aggregate_file, iter_chunks, read_results,
+                     write_csv)
+from rules import RuleSet
+from simulation import Simulator, mimic_dealer
+from table import Seat, simulate_table
+from test_simulation import SplitSurrenderInsure
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+RULES = RuleSet(6, max_hands=4, allow_surrender=True, allow_insurance=True)
+
+
+def same_stats(test, first, second):
+    test.assertEqual((first.rounds, first.hands, first.counts), (second.rounds, second.hands, second.counts))
+    test.assertAlmostEqual(first.net, second.net)
+    test.assertAlmostEqual(first.net_squared, second.net_squared)
+    test.assertAlmostEqual(first.wagered, second.wagered)
+
+
+class TestResultColumns(unittest.TestCase):
+
+    def setUp(self):
+        self.results = ResultColumns()
+        self.stats = Simulator(max_wager=4, rng=random.Random(1), rules=RULES).run(5000, SplitSurrenderInsure(),
+                                                                                     results=self.results)
+
+    def test_simulator_rows(self):
+        results = self.results
+        self.assertEqual(len(results), self.stats.hands)
+        self.assertEqual(results['round'][-1], 4999)
+        self.assertEqual(results.rule_sets, [RULES])
+        self.assertAlmostEqual(sum(results['wager_earned']), self.stats.net)
+        flags = 0
+        for actions in results['actions']:
+            flags |= actions
+        self.assertEqual(flags, HIT_FLAG | DOUBLE_DOWN_FLAG | SPLIT_FLAG | SURRENDER_FLAG | INSURANCE_FLAG)
+        for row in range(len(results)):
+            if results['actions'][row] & SURRENDER_FLAG:
+                # Lost to a Dealer BlackJack, else surrendered
+                self.assertIn(RESULTS[results['result'][row]], ('lost', 'surrender'))
+            if results['hand'][row]:
+                self.assertTrue(results['actions'][row] & SPLIT_FLAG)
+        self.assertEqual(action_names(SPLIT_FLAG | HIT_FLAG), ['split', 'hit'])
+
+    def test_aggregate(self):
+        same_stats(self, aggregate(self.results, ())[()], self.stats)
+        by_upcard = aggregate(self.results, ('upcard', 'total', 'rules'), use_numpy=False)
+        self.assertEqual(sum(stats.rounds for stats in by_upcard.values()), 5000)
+        self.assertEqual(set(rules for upcard, total, rules in by_upcard), set([RULES]))
+        self.assertAlmostEqual(sum(stats.net for stats in by_upcard.values()), self.stats.net)
+        self.assertRaises(ValueError, aggregate, self.results, ('result',))
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed')
+    def test_aggregate_numpy(self):
+        by = ('upcard', 'total', 'soft', 'wager')
+        rows = aggregate(self.results, by, use_numpy=False)
+        columns = aggregate(self.results, by)
+        self.assertEqual(sorted(rows), sorted(columns))
+        for key in rows:
+            same_stats(self, rows[key], columns[key])
+        self.assertEqual(aggregate(ResultColumns(), by), {})
+
+    def test_table(self):
+        results = ResultColumns()
+        seats = [Seat(max_wager=2), Seat(allow_dd=False)]
+        stats = simulate_table(2000, [SplitSurrenderInsure(), mimic_dealer], seats, results=results,
+                               rng=random.Random(2))
+        by_seat = aggregate(results, ('seat',), use_numpy=False)
+        for seat, seat_stats in enumerate(stats):
+            same_stats(self, by_seat[(seat,)], seat_stats)
+        self.assertEqual([rules.allow_dd for rules in results.rule_sets], [True, False])  # Rules of each seat
+        self.assertEqual(results['round'][-1], 1999)
+
+
+class TestResultsFile(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'results.bjc')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_chunks(self):
+        expected = ResultColumns()
+        Simulator(rng=random.Random(3), decks=6).run(3000, results=expected)
+        simulator = Simulator(rng=random.Random(3), decks=6)
+        with ResultsWriter(self.path, chunk_rows=500) as writer:
+            simulator.run(1000, results=writer)
+            self.assertLess(len(writer), 600)  # Older rows are on disk
+        with ResultsWriter(self.path, chunk_rows=500) as writer:  # Appends, carrying on the round numbers
+            simulator.run(2000, results=writer)
+        self.assertGreater(len(list(iter_chunks(self.path))), 5)
+        results = read_results(self.path)
+        for name in COLUMN_NAMES:
+            self.assertEqual(list(results[name]), list(expected[name]))
+        self.assertEqual(results.rule_sets, expected.rule_sets)
+        by_upcard = aggregate(expected, ('upcard',))
+        from_file = aggregate_file(self.path, ('upcard',))
+        self.assertEqual(sorted(by_upcard), sorted(from_file))
+        for key in by_upcard:
+            same_stats(self, by_upcard[key], from_file[key])
+
+    def test_not_results_file(self):
+        with open(self.path, 'wb') as results_file:
+            results_file.write(b'not a results file')
+        self.assertRaises(ValueError, read_results, self.path)
+        self.assertRaises(ValueError, ResultsWriter, self.path)
+
+    def test_truncated(self):
+        with ResultsWriter(self.path) as writer:
+            Simulator(rng=random.Random(5)).run(100, results=writer)
+        with open(self.path, 'rb+') as results_file:
+            results_file.truncate(os.path.getsize(self.path) - 1)
+        self.assertRaises(ValueError, ResultsWriter, self.path)
+        self.assertRaises(ValueError, read_results, self.path)
+
+    def test_csv(self):
+        results = ResultColumns()
+        Simulator(rng=random.Random(4), max_wager=2).run(300, SplitSurrenderInsure(), results=results)
+        csv_path = os.path.join(self.directory, 'results.csv')
+        write_csv(results, csv_path, batch=64)
+        with open(csv_path) as csv_file:
+            rows = list(csv.reader(csv_file))
+        self.assertEqual(tuple(rows[0]), COLUMN_NAMES)
+        self.assertEqual(len(rows), len(results) + 1)
+        self.assertIn('double_down', [row[COLUMN_NAMES.index('actions')] for row in rows])
+        self.assertAlmostEqual(sum(float(row[-1]) for row in rows[1:]), sum(results['wager_earned']))
+
+
+if __name__ == '__main__':
+    unittest.main()
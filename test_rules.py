@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""
+Test code for rule sets.  Test can be run from command line: python test_rules.py
+"""
+from __future__ import print_function
+import pickle
+import unittest
+from rules import DEFAULT_RULES, RuleSet
+
+
+class TestRuleSet(unittest.TestCase):
+
+    def test_shared(self):
+        rules = RuleSet(decks=6, dealer_hits_soft_17=True)
+        self.assertIs(RuleSet(decks=6, dealer_hits_soft_17=True), rules)
+        self.assertIs(rules.replace(dealer_hits_soft_17=False), RuleSet(decks=6))
+        self.assertIs(RuleSet(), DEFAULT_RULES)
+        self.assertIsNot(rules, DEFAULT_RULES)
+        self.assertEqual(len(set([rules, RuleSet(6, dealer_hits_soft_17=1), DEFAULT_RULES])), 2)
+        self.assertIs(pickle.loads(pickle.dumps(rules)), rules)
+
+    def test_normalized(self):
+        rules = RuleSet(decks=5.0, dealer_min=16.0, max_hands=3.0, blackjack_payout=2)
+        self.assertEqual([type(value) for value in (rules.decks, rules.dealer_min, rules.max_hands)], [int] * 3)
+        self.assertIsInstance(rules.blackjack_payout, float)
+        self.assertIs(RuleSet(decks=5, dealer_min=16, max_hands=3, blackjack_payout=2.0), rules)
+
+    def test_frozen(self):
+        with self.assertRaises(AttributeError):
+            DEFAULT_RULES.dealer_min = 16
+        with self.assertRaises(AttributeError):
+            del DEFAULT_RULES.decks
+        with self.assertRaises(TypeError):
+            DEFAULT_RULES.replace(dealer_stands=True)
+
+    def test_validated(self):
+        for rules in (dict(decks=0), dict(decks=1.5), dict(blackjack_payout=0), dict(dealer_min=22), dict(max_hands=1),
+                      dict(max_hands=5)):
+            with self.assertRaises(ValueError):
+                RuleSet(**rules)
+
+    def test_payouts(self):
+        rules = RuleSet(blackjack_payout=1.2)
+        self.assertEqual(rules.payouts['blackjack'], 1.2)
+        self.assertEqual(rules.payouts['won'], 1)
+        self.assertEqual(DEFAULT_RULES.payouts['blackjack'], 1.5)
+        self.assertEqual(rules.payouts['surrender'], -0.5)
+
+    def test_dealer_tables(self):
+        hits_soft_17 = RuleSet(dealer_hits_soft_17=True)
+        self.assertFalse(DEFAULT_RULES.dealer_draws[1][7])  # Ace and 6 is a soft 17
+        self.assertTrue(hits_soft_17.dealer_draws[1][7])
+        self.assertFalse(hits_soft_17.dealer_draws[1][17])  # Hard 17 with an Ace
+        self.assertFalse(hits_soft_17.dealer_draws[0][17])
+        self.assertTrue(hits_soft_17.dealer_draws[0][16])
+        self.assertEqual(DEFAULT_RULES.dealer_values[2][2], 12)  # Two Aces
+        self.assertEqual(RuleSet(allow_soft_limit=False).dealer_values[2][2], 22)
+        self.assertTrue(RuleSet(allow_soft_limit=False, dealer_hits_soft_17=True).dealer_draws[1][7])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Test code for the game server and its load generator.  Test can be run from command line: python test_server.py
+"""
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from load_client import load_test
+from server import GameServer
+from shufflers import StackedShuffler
+
+
+async def connect(server):
+    """Returns the reader, writer and greeting of a connection to an asyncio server"""
+    host, port = server.sockets[0].getsockname()[:2]
+    reader, writer = await asyncio.open_connection(host, port)
+    greeting = json.loads((await reader.readline()).decode('utf-8'))
+    return reader, writer, greeting
+
+
+async def send(reader, writer, request):
+    writer.write((request if isinstance(request, str) else json.dumps(request)).encode('utf-8') + b'\n')
+    return json.loads((await reader.readline()).decode('utf-8'))
+
+
+class TestGameServer(unittest.TestCase):
+
+    def test_round(self):
+        # Player: 10, 6.  Dealer: 9, 8.  Player hits a 4 for 20 and wins
+        shuffler = StackedShuffler([[('10', 'Spade'), ('6', 'Spade'), ('9', 'Spade'), ('8', 'Spade'),
+                                     ('4', 'Spade')]])
+        game_server = GameServer(chips=50, shuffler=shuffler)
+        session = game_server.new_session()
+        session, state = game_server.handle_request(session, {'action': 'deal', 'wager': 5})
+        self.assertTrue(state['in_play'])
+        self.assertEqual(state['round'], 1)
+        self.assertEqual(state['hands'][0]['value'], 16)
+        self.assertEqual(state['dealer'], [('9', 'Spade')])  # The hole card is hidden
+        session, state = game_server.handle_request(session, {'action': 'hit'})
+        session, state = game_server.handle_request(session, {'action': 'stand'})
+        self.assertFalse(state['in_play'])
+        self.assertEqual(state['hands'][0]['result'], 'won')
+        self.assertEqual(state['dealer_value'], 17)
+        self.assertEqual(state['chips'], 55)
+        self.assertEqual(state['won'], 1)
+
+    def test_errors(self):
+        game_server = GameServer(chips=10)
+        session = game_server.new_session()
+        for request in ({'action': 'hit'}, {'action': 'deal', 'wager': 11}, {'action': 'deal', 'wager': 'all'},
+                        {'action': 'fold'}, {'action': 'resume', 'session': 'gone'}, [1, 2]):
+            session, state = game_server.handle_request(session, request)
+            self.assertIn('error', state)
+        self.assertEqual(session.player['chips'], 10)
+
+    def test_idle_eviction(self):
+        game_server = GameServer(idle_timeout=60)
+        old = game_server.new_session()
+        new = game_server.new_session()
+        old.last_seen -= 120
+        self.assertEqual(game_server.evict_idle(), 1)
+        self.assertEqual(list(game_server.sessions), [new.session_id])
+
+    def test_connection_and_resume(self):
+        async def play():
+            game_server = GameServer()
+            server = await game_server.start()
+            async with server:
+                reader, writer, greeting = await connect(server)
+                self.assertEqual(greeting['chips'], 100)
+                state = await send(reader, writer, {'action': 'deal', 'wager': 2})
+                self.assertEqual(state['round'], 1)
+                self.assertIn('error', await send(reader, writer, 'not json'))
+                writer.close()
+                # A new connection continues the session
+                reader, writer, other = await connect(server)
+                state = await send(reader, writer, {'action': 'resume', 'session': greeting['session']})
+                self.assertEqual(state['session'], greeting['session'])
+                self.assertEqual(state['round'], 1)
+                writer.close()
+
+        asyncio.run(play())
+
+    @unittest.skipIf(not hasattr(asyncio, 'start_unix_server'), 'No Unix sockets')
+    def test_load_test(self):
+        temp_dir = tempfile.mkdtemp()
+        path = os.path.join(temp_dir, 'blackjack.sock')
+
+        async def run():
+            game_server = GameServer()
+            server = await game_server.start(path=path)
+            async with server:
+                result = await load_test(20, 5, path=path, concurrency=10)
+            return game_server, result
+
+        try:
+            game_server, result = asyncio.run(run())
+        finally:
+            shutil.rmtree(temp_dir)
+        self.assertEqual(result.sessions, 20)
+        self.assertEqual(result.rounds, 100)
+        self.assertEqual(result.errors, 0)
+        self.assertEqual(game_server.requests, result.actions)
+        self.assertEqual(sum(session.player['round'] for session in game_server.sessions.values()), 100)
+
+if __name__ == '__main__':
+    unittest.main()
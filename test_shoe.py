@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""
+Test code for the dealing shoe.  Test can be run from command line: python test_shoe.py
+"""
+from __future__ import print_function
+import unittest
+from blackjack import BlackJack
+from shoe import Shoe, CUT_CARD, EVERY_ROUND
+
+
+class TestShoe(unittest.TestCase):
+
+    def test_init(self):
+        shoe = Shoe(decks=6, penetration=0.75)
+        self.assertEqual(len(shoe), 6 * 52)
+        self.assertEqual(shoe.cut_card, 78)
+        self.assertEqual(len(set(shoe.cards)), 52)  # Six copies of each card
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, Shoe, decks=0)
+        self.assertRaises(ValueError, Shoe, penetration=0)
+        self.assertRaises(ValueError, Shoe, reshuffle='never')
+
+    def test_cut_card(self):
+        shoe = Shoe(decks=2, penetration=0.5)
+        self.assertFalse(shoe.start_round())  # Freshly shuffled, nothing to do
+        for _ in range(51):
+            shoe.draw()
+        self.assertFalse(shoe.cut_card_reached)
+        self.assertFalse(shoe.start_round())
+        shoe.draw()
+        self.assertTrue(shoe.cut_card_reached)
+        self.assertTrue(shoe.start_round())
+        self.assertEqual(len(shoe), 104)
+
+    def test_every_round(self):
+        shoe = Shoe(reshuffle=EVERY_ROUND)
+        shoe.draw()
+        self.assertTrue(shoe.start_round())
+        self.assertEqual(len(shoe), 52)
+
+    def test_runs_out(self):
+        shoe = Shoe(penetration=1)
+        cards = [shoe.draw() for _ in range(53)]
+        self.assertEqual(len(set(cards[:52])), 52)
+        self.assertEqual(len(shoe), 51)
+        self.assertEqual(shoe.reshuffles, 2)
+
+    def test_game_keeps_shoe(self):
+        shoe = Shoe(decks=6, reshuffle=CUT_CARD)
+        game = BlackJack(shoe=shoe)
+        self.assertIs(game.shoe, shoe)
+        left = len(shoe)
+        self.assertLessEqual(left, 6 * 52 - 4)
+        BlackJack(shoe=shoe)
+        self.assertLessEqual(len(shoe), left - 4)  # Next round dealt from the same shoe
+        self.assertEqual(shoe.reshuffles, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+"""
+Test code for the shuffle providers.  Test can be run from command line: python test_shufflers.py
+"""
+from __future__ import print_function
+import random
+import unittest
+from blackjack import BlackJack
+from cards import DECK
+from shoe import Shoe
+from shufflers import NumpyShuffler, RandomShuffler, RecordingShuffler, StackedShuffler
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class TestShufflers(unittest.TestCase):
+
+    def test_random(self):
+        first = bytearray(DECK)
+        second = bytearray(DECK)
+        RandomShuffler(random.Random(1)).shuffle(first)
+        RandomShuffler(random.Random(1)).shuffle(second)
+        self.assertEqual(first, second)
+        self.assertEqual(sorted(first), DECK)
+
+    def test_stacked(self):
+        shoe = Shoe(shuffler=StackedShuffler([[('ace', 'Spade'), 5, ('king', 'Heart')]]))
+        self.assertEqual(shoe.draw(), 12)
+        self.assertEqual(shoe.draw(), 5)
+        self.assertEqual(shoe.draw(), 23)
+        self.assertEqual(len(shoe), 49)
+        self.assertEqual(sorted(shoe.cards + bytearray([12, 5, 23])), DECK)
+        self.assertRaises(IndexError, shoe.shuffle)  # Only one deck was stacked
+
+    def test_stacked_not_in_shoe(self):
+        self.assertRaises(ValueError, Shoe, shuffler=StackedShuffler([[5, 5]]))
+
+    def test_replay(self):
+        recorder = RecordingShuffler(RandomShuffler(random.Random(2)))
+        games = [BlackJack(shuffler=recorder) for _ in range(3)]
+        replayer = StackedShuffler(recorder.decks)
+        for game in games:
+            replay = BlackJack(shuffler=replayer)
+            self.assertEqual(list(replay.players[0].hand), list(game.players[0].hand))
+            self.assertEqual(list(replay.dealer_hand), list(game.dealer_hand))
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed')
+    def test_numpy(self):
+        shuffler = NumpyShuffler(3, batch=4)
+        decks = []
+        for _ in range(10):  # More than a batch
+            cards = bytearray(DECK) * 2
+            shuffler.shuffle(cards)
+            self.assertEqual(sorted(cards), sorted(DECK * 2))
+            decks.append(bytes(cards))
+            cards.pop()  # Cards can still be drawn
+        self.assertEqual(len(set(decks)), 10)
+
+if __name__ == '__main__':
+    unittest.main()
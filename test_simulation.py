@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+"""
+Test code for the BlackJack simulator.  Test can be run from command line: python test_simulation.py
+"""
+from __future__ import print_function
+import random
+import unittest
+from blackjack import BlackJack, HIT, STAND, DOUBLE_DOWN, SPLIT
+from rules import RuleSet
+from shoe import Shoe, EVERY_ROUND
+from simulation import Simulator, simulate, play_game, run_parallel, always_stand, mimic_dealer
+
+
+def split_and_double(total, soft, pair, upcard, can_double, can_split):
+    """Policy that uses every action so that all the rules are exercised"""
+    if can_split and pair in (8, 11):
+        return SPLIT
+    if can_double and total in (10, 11):
+        return DOUBLE_DOWN
+    return HIT if total < 15 else STAND
+
+
+class SplitSurrenderInsure(object):
+    """Policy that also re-splits, surrenders and takes insurance, through the policy methods"""
+
+    def __call__(self, total, soft, pair, upcard, can_double, can_split):
+        if can_split and pair in (2, 3, 8, 11):
+            return SPLIT
+        return split_and_double(total, soft, 0, upcard, can_double, False)
+
+    def surrender(self, total, soft, pair, upcard):
+        return total in (15, 16) and upcard >= 9
+
+    def insurance(self, total, soft, pair, true_count):
+        return True
+
+
+class TestSimulation(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(1234)
+
+    def test_counts(self):
+        stats = simulate(5000, split_and_double, wager=1, max_wager=4)
+        self.assertEqual(stats.rounds, 5000)
+        self.assertGreater(stats.hands, stats.rounds)  # Some hands were split
+        self.assertEqual(sum(stats.counts.values()), stats.hands)
+
+    def test_always_stand_never_busts(self):
+        stats = simulate(2000, always_stand)
+        self.assertEqual(stats.counts['bust'], 0)
+        self.assertEqual(stats.hands, stats.rounds)
+
+    def test_shoe_reused(self):
+        simulator = Simulator(decks=6, penetration=0.75)
+        simulator.run(1000)
+        self.assertLess(simulator.shoe.reshuffles, 1000 // 20)  # About 30 rounds out of a 6 deck shoe before the cut card
+        self.assertGreater(simulator.shoe.reshuffles, 1)
+
+    def test_split_not_allowed(self):
+        def always_split(total, soft, pair, upcard, can_double, can_split):
+            return SPLIT
+        self.assertRaises(ValueError, Simulator(allow_split=False).run, 1, always_split)
+
+    def test_matches_game(self):
+        # Fresh deck every round, so the Simulator and BlackJack() per round draw from the same distribution
+        rounds = 20000
+        stats = simulate(rounds, split_and_double, wager=1, max_wager=4, reshuffle=EVERY_ROUND)
+        earned = [play_game(BlackJack(wager=1, max_wager=4), split_and_double) for _ in range(rounds)]
+        mean = sum(earned) / float(rounds)
+        self.assertLess(abs(stats.ev - mean), 5 * 2 ** 0.5 * stats.std_error)
+
+    def test_same_cards_as_game(self):
+        # The Simulator's shoe of card values shuffles like a Shoe of cards, so with the same rng both deal the same
+        for lazy_dealer in (False, True):
+            stats = Simulator(decks=2, wager=1, max_wager=4, rng=random.Random(5), lazy_dealer=lazy_dealer).run(
+                3000, split_and_double)
+            shoe = Shoe(decks=2, rng=random.Random(5))
+            earned = sum(play_game(BlackJack(wager=1, max_wager=4, shoe=shoe, lazy_dealer=lazy_dealer),
+                                   split_and_double) for _ in range(3000))
+            self.assertEqual(stats.net, earned)
+
+    def test_same_cards_as_game_rules(self):
+        rules = RuleSet(decks=2, blackjack_payout=1.2, dealer_hits_soft_17=True)
+        stats = Simulator(wager=1, max_wager=4, rng=random.Random(6), rules=rules).run(3000, split_and_double)
+        shoe = Shoe(decks=2, rng=random.Random(6))
+        earned = sum(play_game(BlackJack(wager=1, max_wager=4, shoe=shoe, rules=rules), split_and_double)
+                     for _ in range(3000))
+        self.assertAlmostEqual(stats.net, earned)
+
+    def test_same_cards_as_game_surrender_insurance(self):
+        rules = RuleSet(decks=2, max_hands=4, allow_surrender=True, allow_insurance=True)
+        policy = SplitSurrenderInsure()
+        for lazy_dealer in (False, True):
+            stats = Simulator(wager=1, max_wager=8, rng=random.Random(7), rules=rules, lazy_dealer=lazy_dealer).run(
+                3000, policy)
+            shoe = Shoe(decks=2, rng=random.Random(7))
+            earned = 0
+            most_hands = 0
+            for _ in range(3000):
+                game = BlackJack(wager=1, max_wager=8, shoe=shoe, rules=rules, lazy_dealer=lazy_dealer)
+                earned += play_game(game, policy)
+                most_hands = max(most_hands, len(game.players))
+            self.assertAlmostEqual(stats.net, earned)
+            self.assertGreater(most_hands, 2)  # Re-split
+            self.assertGreater(stats.counts['surrender'], 0)
+            self.assertEqual(sum(stats.counts.values()), stats.hands)
+
+    def test_seeded(self):
+        first = Simulator(decks=2, rng=random.Random(3)).run(2000)
+        second = Simulator(decks=2, rng=random.Random(3)).run(2000)
+        self.assertEqual((first.net, first.counts), (second.net, second.counts))
+
+    def test_run_parallel(self):
+        serial = run_parallel(5000, split_and_double, workers=1, seed=9, shard_rounds=1000, max_wager=4)
+        parallel = run_parallel(5000, split_and_double, workers=2, seed=9, shard_rounds=1000, max_wager=4)
+        self.assertEqual(parallel.rounds, 5000)
+        self.assertEqual((serial.net, serial.net_squared, serial.counts), (parallel.net, parallel.net_squared, parallel.counts))
+        other = run_parallel(5000, split_and_double, workers=1, seed=10, shard_rounds=1000, max_wager=4)
+        self.assertNotEqual((serial.net, serial.counts), (other.net, other.counts))
+
+    def test_game_rng(self):
+        first = BlackJack(rng=random.Random(4))
+        second = BlackJack(rng=random.Random(4))
+        self.assertEqual(list(first.players[0].hand), list(second.players[0].hand))
+        self.assertEqual(first.card_deck, second.card_deck)
+
+    def test_play_game(self):
+        game = BlackJack(wager=5, max_wager=5)
+        earned = play_game(game, mimic_dealer)
+        self.assertFalse(game.players[0]['active'])
+        self.assertEqual(earned, game.wager_earned)
+
+if __name__ == '__main__':
+    unittest.main()
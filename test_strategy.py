@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""
+Test code for basic strategy.  Test can be run from command line: python test_strategy.py
+"""
+from __future__ import print_function
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from blackjack import BlackJack, HIT, STAND, DOUBLE_DOWN, SPLIT
+from rules import RuleSet
+from simulation import mimic_dealer, simulate
+from strategy import BasicStrategy, basic_strategy, generate_strategy, strategy_for_game
+
+
+class TestStrategy(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_table(self):
+        strategy = generate_strategy()
+        self.assertEqual(strategy(20, False, 0, 10, True, False), STAND)
+        self.assertEqual(strategy(11, False, 0, 6, True, False), DOUBLE_DOWN)
+        self.assertEqual(strategy(11, False, 0, 6, False, False), HIT)  # Double down not available
+        self.assertEqual(strategy(10, False, 5, 5, True, True), DOUBLE_DOWN)  # Pair of 5s is doubled, not split
+        self.assertEqual(strategy(12, True, 11, 6, True, True), SPLIT)  # Pair of Aces
+        self.assertEqual(strategy(16, False, 8, 6, True, True), SPLIT)  # Pair of 8s
+        self.assertEqual(strategy(16, False, 8, 10, False, False), strategy(16, False, 0, 10, False, False))
+
+    def test_no_split(self):
+        strategy = generate_strategy(allow_split=False, allow_dd=False)
+        self.assertEqual(strategy(12, True, 11, 6, True, True), HIT)  # Pair of Aces without splits
+        for actions in strategy.table.values():
+            self.assertEqual(sorted(actions), [HIT, STAND])
+
+    def test_surrender_and_insurance(self):
+        strategy = generate_strategy(decks=6, allow_surrender=True, allow_insurance=True)
+        # Both bust being a push makes hitting a stiff hand worth more than surrendering it
+        self.assertEqual(strategy.surrenders, frozenset())
+        self.assertGreater(max(strategy.evs[(16, False, 0, 10)]), -0.5)
+        self.assertFalse(strategy.insurance(20, False, 10, None))  # Less than a third of the cards are tens
+        strategy = generate_strategy(allow_split=False, allow_surrender=True)
+        strategy.surrenders = frozenset([(16, False, 0, 10)])
+        self.assertTrue(strategy.surrender(16, False, 8, 10))  # Pairs are looked up as totals without splits
+        self.assertFalse(strategy.surrender(16, False, 0, 9))
+        loaded = BasicStrategy.from_json(strategy.to_json())
+        self.assertEqual((loaded.surrenders, loaded.insure), (strategy.surrenders, strategy.insure))
+
+    def test_disk_cache(self):
+        strategy = basic_strategy(dealer_min=16, decks=2, cache_dir=self.cache_dir)
+        files = os.listdir(self.cache_dir)
+        self.assertEqual(len(files), 1)
+        self.assertIs(basic_strategy(dealer_min=16, decks=2, cache_dir=self.cache_dir), strategy)
+        with open(os.path.join(self.cache_dir, files[0])) as cache_file:
+            self.assertIn('"dealer_min": 16', cache_file.read())
+        basic_strategy(dealer_min=15, decks=2, cache_dir=self.cache_dir)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)  # One table per rule set
+
+    def test_for_game(self):
+        strategy = strategy_for_game(BlackJack(dealer_min=16, allow_split=False), cache_dir=self.cache_dir)
+        self.assertEqual(strategy.rules['dealer_min'], 16)
+        self.assertFalse(strategy.rules['allow_split'])
+
+    def test_for_game_rules(self):
+        stands = strategy_for_game(BlackJack(), cache_dir=None)
+        hits = strategy_for_game(BlackJack(rules=RuleSet(dealer_hits_soft_17=True)), cache_dir=None)
+        short_payout = strategy_for_game(BlackJack(rules=RuleSet(blackjack_payout=1.2)), cache_dir=None)
+        self.assertIsNot(hits, stands)
+        self.assertTrue(hits.rules['dealer_hits_soft_17'])
+        self.assertNotEqual(hits.evs[(16, False, 0, 11)], stands.evs[(16, False, 0, 11)])
+        self.assertEqual(short_payout.rules['blackjack_payout'], 1.2)
+        # A split Ace making 21 pays the BlackJack payout
+        self.assertLess(short_payout.evs[(12, True, 11, 6)][0], stands.evs[(12, True, 11, 6)][0])
+        self.assertRaises(ValueError, strategy_for_game, BlackJack(rules=RuleSet(max_hands=3)), cache_dir=None)
+
+    def test_beats_mimic_dealer(self):
+        random.seed(11)
+        strategy = generate_strategy(decks=6)
+        rounds = 100000
+        played = simulate(rounds, strategy, wager=1, max_wager=4, decks=6)
+        baseline = simulate(rounds, mimic_dealer, wager=1, max_wager=4, decks=6)
+        self.assertGreater(played.ev, baseline.ev)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+"""
+Test code for the multi seat table.  Test can be run from command line: python test_table.py
+"""
+from __future__ import print_function
+import random
+import unittest
+from blackjack import SPLIT
+from rules import RuleSet
+from shoe import Shoe, EVERY_ROUND
+from shufflers import StackedShuffler
+from simulation import mimic_dealer, always_stand, simulate
+from table import Seat, Table, simulate_table
+
+
+def stacked_table(faces, seats=2, **rules):
+    """Returns a Table dealing from one deck stacked with cards of these faces, in deal order:
+    one card per seat then the Dealer, twice, then the cards drawn while playing
+    """
+    suits = {}
+    cards = []
+    for face in faces:
+        suits[face] = suits.get(face, -1) + 1
+        cards.append((face, ['Spade', 'Heart', 'Diamond', 'Club'][suits[face]]))
+    shoe = Shoe(reshuffle=EVERY_ROUND, shuffler=StackedShuffler([cards]))
+    return Table(seats, shoe=shoe, **rules)
+
+
+class TestTable(unittest.TestCase):
+
+    def test_deal_order(self):
+        table = stacked_table(['2', '3', '4', '5', '6', '7'])
+        table.deal()
+        self.assertEqual(table.seats[0].players[0].hand[:], [('2', 'Spade'), ('5', 'Spade')])
+        self.assertEqual(table.seats[1].players[0].hand[:], [('3', 'Spade'), ('6', 'Spade')])
+        self.assertEqual(table.dealer_hand[:], [('4', 'Spade'), ('7', 'Spade')])
+
+    def test_dealer_draws_once_all_seats_finish(self):
+        # Seat 0: 10, 6.  Seat 1: 10, 7.  Dealer: 9, 5.  Seat 0 hits a 4, then the Dealer draws a 3
+        table = stacked_table(['10', '10', '9', '6', '7', '5', '4', '3'])
+        table.deal()
+        table.hit(0)
+        self.assertEqual(len(table.dealer_hand), 2)  # The Dealer doesn't draw on a Player hit
+        table.stand(0)
+        self.assertEqual(len(table.dealer_hand), 2)  # Seat 1 still playing
+        table.stand(1)
+        self.assertEqual(table.dealer_hand_value(), 17)
+        self.assertEqual([seat.players[0].result for seat in table.seats], ['won', 'push'])
+        self.assertEqual([seat.wager_earned for seat in table.seats], [1, 0])
+
+    def test_blackjack_and_bust(self):
+        # Seat 0: Ace, king is a BlackJack.  Seat 1: 10, 6 hits a 10 and busts.  Dealer: 10, 6 draws a 10 and busts
+        table = stacked_table(['ace', '10', '10', 'king', '6', '6', '10', '10'])
+        table.deal()
+        self.assertFalse(table.seats[0].is_active())
+        table.hit(1)
+        self.assertTrue(table.settled)
+        self.assertEqual([seat.players[0].result for seat in table.seats], ['blackjack', 'push'])  # Both bust
+        self.assertEqual([seat.wager_earned for seat in table.seats], [1.5, 0])
+
+    def test_rules(self):
+        # Seat 0: Ace, king is a BlackJack.  Seat 1: 10, 7.  Dealer: Ace, 6 is a soft 17, draws a 2 to 19
+        rules = RuleSet(dealer_hits_soft_17=True, blackjack_payout=1.2)
+        table = stacked_table(['ace', '10', 'ace', 'king', '7', '6', '2'], rules=rules)
+        table.deal()
+        table.stand(1)
+        self.assertEqual(table.dealer_hand_value(), 19)
+        self.assertEqual([seat.wager_earned for seat in table.seats], [1.2, -1])
+        self.assertEqual(table.seat_rules(table.seats[0]), rules)
+        self.assertRaises(ValueError, Table, rules=RuleSet(allow_surrender=True))
+
+    def test_seat_rules(self):
+        seats = [Seat(wager=2, max_wager=4), Seat(wager=2, max_wager=2)]
+        table = stacked_table(['8', '8', '10', '8', '8', '7', '3', '4'], seats=seats)
+        table.deal()
+        self.assertTrue(seats[0].can_split())
+        self.assertFalse(seats[1].can_split())  # Not enough max wager
+        self.assertTrue(table.split(0))
+        self.assertEqual([player.hand.value() for player in seats[0].players], [11, 12])
+        self.assertFalse(table.split(1))
+
+    def test_play_round(self):
+        random.seed(11)
+        table = Table(3, decks=6)
+        for _ in range(200):
+            earned = table.play_round([mimic_dealer, always_stand, mimic_dealer])
+            self.assertTrue(table.settled)
+            self.assertTrue(17 <= table.dealer_hand_value() or len(table.shoe) == 0)
+            self.assertEqual(earned, [seat.wager_earned for seat in table.seats])
+
+    def test_policy_errors(self):
+        def split_always(total, soft, pair, upcard, can_double, can_split):
+            return SPLIT
+        table = Table(1, decks=1)
+        random.seed(5)
+        with self.assertRaises(ValueError):
+            for _ in range(50):
+                table.play_round([split_always])
+
+    def test_simulate_table(self):
+        random.seed(3)
+        stats = simulate_table(20000, [mimic_dealer] * 4, decks=6)
+        self.assertEqual(len(stats), 4)
+        for seat_stats in stats:
+            self.assertEqual(seat_stats.rounds, 20000)
+            self.assertEqual(sum(seat_stats.counts.values()), seat_stats.hands)
+        # The Dealer draws at a different time than in BlackJack, but the cards are as random:
+        # the EVs agree with the Simulator within noise
+        single = simulate(200000, mimic_dealer, decks=6, rng=random.Random(3))
+        for seat_stats in stats:
+            self.assertLess(abs(seat_stats.ev - single.ev), 4 * (seat_stats.std_error + single.std_error))
+
+if __name__ == '__main__':
+    unittest.main()